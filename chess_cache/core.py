@@ -9,28 +9,29 @@ Menggabungkan kemampuan mesin catur dengan database hasil analisa posisi.
 # Spesifikasi protokol UCI: https://wbec-ridderkerk.nl/html/UCIProtocol.html
 
 import sqlite3
+import struct
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from functools import lru_cache
-from itertools import product
-from os import F_OK, X_OK
-from os import access as os_access
+from hashlib import blake2b
+from itertools import batched, product
+from math import ceil, log
+from os import F_OK, X_OK, access as os_access, remove as os_remove, replace
+from os.path import exists, getsize
 from queue import PriorityQueue
+from random import Random, randint
 from re import compile as regex_compile
 from select import select
 from subprocess import PIPE, Popen
-from threading import Event, Thread
-from typing import Any
-
-from chess import Board, IllegalMoveError
+from threading import Event, Lock, RLock, Thread, local
+from time import monotonic, sleep, time
+from typing import Any, Callable, Iterable, Iterator
 
 from .logger import get_logger
+from .position import Position, move_uci
 
 # from line_profiler import profile
 
-# TODO: tidak usah gunakan module chess, kita kurang lebih hanya butuh atribut
-# berikut: fen, set_fen, push_uci, dan legal_moves. Ide, buat representasi papan
-# dalam bentuk bitboard. Empat atribut tersebut seharusnya mudah dibuat, dan
-# itu juga akan meringkas kode di encode_fen()
-
 # TODO: ketika Ctrl+C di AnalysisEngine, akan muncul "Exception ignored in" yang
 # saya tidak tahu cara mengatasinya. Kode berikut akan mensuppress pesan tersebut
 # https://stackoverflow.com/questions/16314321
@@ -46,6 +47,19 @@ Config = dict[str, str | int]
 
 STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
 MATE_SCORE = 2**12
+LOOKUP_BATCH = 500  # banyak posisi per query `IN (...)`
+WRITE_BEHIND = 1000  # nilai write_behind yang disarankan untuk Engine
+SELECT_CACHE = 32 * 2**20  # perkiraan ukuran maksimum singgahan select (byte)
+EVICT_BATCH = 1000  # banyak baris yang dibuang per transaksi oleh evictor
+QUIZ_DEPTH = 35  # depth posisi yang dipakai sebagai kuis
+QUIZ_SAMPLE = 10_000  # banyak posisi maksimum di sampel kuis per depth
+QUIZ_CHUNK = 10_000  # banyak baris board yang dibaca per query refresh_quiz
+NORMALIZE_CHUNK = 10_000  # banyak baris per transaksi normalize_old_data
+MAINTENANCE = 1.0  # selang waktu (detik) pemeliharaan yang disarankan
+TIMINGS = 1000  # banyak durasi terakhir yang disimpan untuk setiap pekerjaan
+BLOOM_ERROR = 0.01  # target peluang positif palsu Bloom filter
+BLOOM_MIN = 2**20  # kapasitas minimum Bloom filter (banyak posisi)
+ADMIT_BATCH = 10_000  # banyak posisi yang diperiksa sekaligus oleh `put_many`
 
 UCI_REGEX = regex_compile(r"^[a-h][1-8][a-h][1-8][pnbrqk]?|[PNBRQK]@[a-h][1-8]|0000\Z")
 CHESS_FILE = {c: [8 * r + f for r in range(8)] for f, c in enumerate("abcdefgh")}
@@ -103,10 +117,8 @@ def encode_fen(fen: str) -> bytes:
     # Didasarkan oleh kode oleh Tomasz Sobczyk
     # https://github.com/official-stockfiPiecesh/nnue-pytorch/blob/master/lib/nnue_training_data_formats.h#L4615
 
-    # Kode bisa diringkas dengan membuat fungsi sebagai atribut dari Board,
-    # dan daripada menggunakan self.fen().split(), ambil informasi dari
-    # self.castling_xfen(), self.ep_square(), self.piece_type_at() dan
-    # sebagainya. Cuma masalahnya, cukup fucked up untuk me-LRUCache-nya.
+    # Versi yang dihitung langsung dari bitboard ada di Position.encode();
+    # fungsi ini tetap dipertahankan untuk input berupa string FEN.
 
     splitted = fen.split()
 
@@ -241,6 +253,38 @@ def decode_fen(encoded: bytes) -> str:
     return f"{fen_final} {turn} {castling} {en_passant}"
 
 
+# tabel Zobrist untuk setiap pasangan (nibble, petak); seed tetap agar hash
+# yang tersimpan di database tidak berubah antar versi program
+_rng = Random(0x636865737363)
+ZOBRIST_TABLE = {
+    c: [_rng.getrandbits(64) for _ in range(64)] for c in "0123456789abcdef"
+}
+
+
+def zobrist_hash(encoded: bytes) -> int:
+    """Menghasilkan hash Zobrist 64-bit (bertanda, cocok untuk INTEGER SQLite)
+    dari posisi terenkode.
+
+    Hash dihitung dari pasangan (nibble, petak) di kunci `encode_fen`, sehingga
+    hak rokade, en passant, dan giliran ikut terwakili oleh nibble khususnya.
+    """
+
+    num = int.from_bytes(encoded, byteorder="big")
+    occupancy = num & 0xFFFF_FFFF_FFFF_FFFF
+    nibbles = f"{num >> 64:0{occupancy.bit_count()}x}"
+
+    result = 0
+    for char in nibbles:
+        # bit paling signifikan dari okupansi adalah petak a1
+        bit = occupancy.bit_length() - 1
+        occupancy ^= 1 << bit
+        result ^= ZOBRIST_TABLE[char][63 - bit]
+
+    if result >> 63:
+        result -= 1 << 64
+    return result
+
+
 def _parse_uci_info(text_info: str) -> Info:
     # modifikasi dari kode chess.engine._parse_uci_info
     # oleh Niklas Fiekas <niklas.fiekas@backscattering.de>
@@ -340,14 +384,560 @@ def _unparse_uci_info(info: Info) -> str:
     return " ".join(text)
 
 
-class Database:
+_BOARD_BLOB = """CREATE TABLE IF NOT EXISTS board(
+                    fen         BLOB    NOT NULL,
+                    depth       INTEGER NOT NULL,
+                    score       INTEGER NOT NULL,
+                    move        INTEGER,
+                    PRIMARY KEY (fen)
+                    ) WITHOUT ROWID"""
+_BOARD_ZOBRIST = """CREATE TABLE IF NOT EXISTS board(
+                    key         INTEGER PRIMARY KEY,
+                    fen         BLOB    NOT NULL,
+                    depth       INTEGER NOT NULL,
+                    score       INTEGER NOT NULL,
+                    move        INTEGER
+                    )"""
+
+
+# banyak baris board untuk setiap depth, diperbarui oleh trigger
+_DEPTH_STATS = [
+    """CREATE TABLE IF NOT EXISTS depth_stats(
+                    depth       INTEGER PRIMARY KEY,
+                    rows        INTEGER NOT NULL
+                    )""",
+    """CREATE TRIGGER IF NOT EXISTS depth_stats_insert AFTER INSERT ON board
+    BEGIN
+        INSERT INTO depth_stats VALUES (new.depth, 1)
+        ON CONFLICT DO UPDATE SET rows = rows + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS depth_stats_update AFTER UPDATE OF depth ON board
+    WHEN old.depth != new.depth
+    BEGIN
+        UPDATE depth_stats SET rows = rows - 1 WHERE depth = old.depth;
+        INSERT INTO depth_stats VALUES (new.depth, 1)
+        ON CONFLICT DO UPDATE SET rows = rows + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS depth_stats_delete AFTER DELETE ON board
+    BEGIN
+        UPDATE depth_stats SET rows = rows - 1 WHERE depth = old.depth;
+    END""",
+]
+
+SelectKey = tuple[bytes, bool, int]
+
+
+class _SelectCache:
+    """Singgahan hasil `Database.select` di memori, dengan batas ukuran.
+
+    Setiap entri mencatat semua posisi yang dibaca untuk menyusunnya (posisi
+    itu sendiri, semua anaknya, dan posisi di sepanjang PV), sehingga penulisan
+    ke suatu posisi hanya membuang entri yang bergantung padanya. Jika ukuran
+    perkiraan melebihi `budget` byte, entri yang paling lama tidak dipakai
+    dibuang terlebih dahulu.
+    """
+
+    def __init__(self, budget: int) -> None:
+        self.budget = budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0  # bertambah setiap kali ada invalidasi
+
+        self._entries: OrderedDict[SelectKey, tuple[list[Info], set[bytes], int]]
+        self._entries = OrderedDict()
+        self._index: dict[bytes, set[SelectKey]] = {}
+        self._lock = Lock()
+        # [hits, misses] untuk setiap jenis panggilan (only_best, max_depth)
+        self.kinds: dict[tuple[bool, int], list[int]] = {}
+
+    def get(self, key: SelectKey) -> tuple[list[Info], set[bytes]] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            kind = self.kinds.setdefault(key[1:], [0, 0])
+            if entry is None:
+                self.misses += 1
+                kind[1] += 1
+                return None
+            self.hits += 1
+            kind[0] += 1
+            self._entries.move_to_end(key)
+        results, reads, _ = entry
+        return [dict(info, pv=info["pv"].copy()) for info in results], reads
+
+    def put(
+        self,
+        key: SelectKey,
+        results: list[Info],
+        reads: set[bytes],
+        generation: int,
+    ) -> None:
+        # perkiraan kasar: kunci posisi, dict info, dan string move di PV
+        size = 64 * len(reads) + sum(256 + 64 * len(info["pv"]) for info in results)
+        results = [dict(info, pv=info["pv"].copy()) for info in results]
+
+        with self._lock:
+            if generation != self.generation or size > self.budget:
+                # ada penulisan selama hasil disusun; hasilnya mungkin usang
+                return
+            self._remove(key)
+            self._entries[key] = (results, reads, size)
+            self.size += size
+            for efen in reads:
+                self._index.setdefault(efen, set()).add(key)
+
+            while self.size > self.budget:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, efens: Iterable[bytes]) -> None:
+        with self._lock:
+            self.generation += 1
+            for efen in efens:
+                for key in self._index.pop(efen, ()):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._index.clear()
+            self.size = 0
+
+    def _remove(self, key: SelectKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, reads, size = entry
+        self.size -= size
+        for efen in reads:
+            keys = self._index.get(efen)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[efen]
+
+
+class _BloomFilter:
+    """Bloom filter atas posisi terenkode.
+
+    Jika `efen not in bloom`, posisi tersebut pasti tidak ada di database,
+    sehingga pencariannya ke SQLite dapat dilewati. Sebaliknya, `efen in bloom`
+    dapat salah (positif palsu) dengan peluang sekitar `error` selama banyak
+    posisi tidak melebihi `capacity`. Posisi tidak dapat dihapus dari filter;
+    posisi yang dihapus dari database hanya menjadi positif palsu.
+    """
+
+    MAGIC = b"CCBLOOM1"
+    HEADER = struct.Struct("<8sQQQ")  # MAGIC, bits, hashes, banyak baris board
+
+    def __init__(self, capacity: int, error: float = BLOOM_ERROR) -> None:
+        self.capacity = capacity
+        self.error = error
+        self.bits = max(8, ceil(-capacity * log(error) / log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * log(2)))
+        self.added = 0  # banyak penambahan sejak pemeriksaan `saturated` terakhir
+        self._array = bytearray(ceil(self.bits / 8))
+        self._lock = Lock()  # `|=` pada byte yang sama tidak atomik
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._array)
+
+    def _indexes(self, efen: bytes) -> list[int]:
+        # double hashing dari satu digest 128-bit
+        digest = blake2b(efen, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, efens: Iterable[bytes]) -> None:
+        indexes = [self._indexes(efen) for efen in efens]
+        with self._lock:
+            for index in indexes:
+                for i in index:
+                    self._array[i >> 3] |= 1 << (i & 7)
+            self.added += len(indexes)
+
+    def __contains__(self, efen: bytes) -> bool:
+        array = self._array
+        return all(array[i >> 3] >> (i & 7) & 1 for i in self._indexes(efen))
+
+    def false_positive_rate(self) -> float:
+        "Perkiraan peluang positif palsu, dari proporsi bit yang menyala."
+        ones = int.from_bytes(self._array, "little").bit_count()
+        return (ones / self.bits) ** self.hashes
+
+    def saturated(self) -> bool:
+        """Apakah peluang positif palsu sudah jauh di atas `error`.
+
+        Menghitung bit yang menyala cukup mahal, sehingga hanya benar-benar
+        diperiksa setelah sekitar `capacity / 8` penambahan.
+        """
+
+        if self.added < self.capacity // 8:
+            return False
+        self.added = 0
+        return self.false_positive_rate() > 2 * self.error
+
+    def save(self, path: str, rows: int) -> None:
+        "Menyimpan filter ke berkas `path`, bersama banyak baris board saat ini."
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f, self._lock:
+            f.write(self.HEADER.pack(self.MAGIC, self.bits, self.hashes, rows))
+            f.write(self._array)
+        replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, rows: int) -> "_BloomFilter | None":
+        """Membaca filter dari berkas `path`.
+
+        Menghasilkan None jika berkas tidak ada, rusak, atau disimpan ketika
+        banyak baris board bukan `rows` (ada penulisan yang tidak tercatat).
+        """
+
+        try:
+            with open(path, "rb") as f:
+                magic, bits, hashes, saved = cls.HEADER.unpack(f.read(cls.HEADER.size))
+                array = bytearray(f.read())
+        except (OSError, struct.error):
+            return None
+        if magic != cls.MAGIC or saved != rows or len(array) != ceil(bits / 8):
+            return None
+
+        bloom = cls.__new__(cls)
+        bloom.capacity = max(1, round(bits * log(2) / hashes))
+        bloom.error = BLOOM_ERROR
+        bloom.bits, bloom.hashes, bloom.added = bits, hashes, 0
+        bloom._array = array
+        bloom._lock = Lock()
+        return bloom
+
+
+class _Timings:
+    """Durasi terakhir dari beberapa jenis pekerjaan database.
+
+    Dipakai untuk melihat jeda, misalnya penulisan yang tertahan oleh
+    checkpoint. Untuk setiap jenis pekerjaan, hanya `size` durasi terakhir
+    yang disimpan.
+    """
+
+    def __init__(self, size: int = TIMINGS) -> None:
+        self.size = size
+        self._samples: dict[str, deque[float]] = {}
+        self._runs: dict[str, int] = {}
+        self._total: dict[str, float] = {}
+        self._lock = Lock()
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        start = monotonic()
+        try:
+            yield
+        finally:
+            elapsed = monotonic() - start
+            with self._lock:
+                self._samples.setdefault(name, deque(maxlen=self.size)).append(elapsed)
+                self._runs[name] = self._runs.get(name, 0) + 1
+                self._total[name] = self._total.get(name, 0.0) + elapsed
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        "Banyak pekerjaan, dan rerata, median, p99, serta maksimum durasi (detik)."
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+            runs = self._runs.copy()
+            total = self._total.copy()
+
+        results = {}
+        for name, values in samples.items():
+            results[name] = {
+                "runs": runs[name],
+                "mean": total[name] / runs[name],
+                "p50": values[len(values) // 2],
+                "p99": values[min(len(values) - 1, len(values) * 99 // 100)],
+                "max": values[-1],
+            }
+        return results
+
+
+class _BaseDatabase:
+    """Bagian dari `Database` yang hanya membutuhkan `_lookup` dan `_cache`.
+
+    Dipakai bersama oleh `Database` dan backend lain, misalnya
+    `chess_cache.sharded.ShardedDatabase`.
+    """
+
+    _cache: _SelectCache
+    minimal_depth: int
+
+    def _lookup(self, efens: list[bytes]) -> dict[bytes, dict[str, Any]]:
+        raise NotImplementedError
+
+    def _touch(self, efens: Iterable[bytes]) -> None:
+        "Mencatat bahwa posisi-posisi `efens` baru saja dibaca atau ditulis."
+
+    def _data_changed(self) -> bool:
+        "Apakah ada penulisan oleh koneksi lain sejak pemeriksaan terakhir."
+        return False
+
+    def cache_info(self) -> dict[str, int]:
+        "Statistik singgahan hasil `select`."
+        cache = self._cache
+        return {
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "entries": len(cache._entries),
+            "size": cache.size,
+            "budget": cache.budget,
+        }
+
+    def _get_moves(
+        self,
+        boards: list[Position],
+        depths: list[int],
+        visited: list[set[bytes]] | None = None,
+        reads: set[bytes] | None = None,
+    ) -> list[list[str]]:
+        """Menyusun PV dari banyak posisi sekaligus.
+
+        Semua PV dimajukan bersama, satu `_lookup` untuk setiap ply. Sebuah PV
+        berhenti jika panjangnya mencapai `depths`, posisinya tidak disinggah,
+        atau kembali ke posisi yang sudah dilalui (siklus transposisi).
+
+        Args:
+            boards: Posisi awal tiap PV; akan diubah oleh fungsi ini.
+            depths: Panjang maksimum tiap PV.
+            visited: Posisi yang sudah dilalui sebelum tiap posisi awal.
+            reads: Jika diberikan, diisi dengan semua posisi yang dicari.
+        """
+
+        move_stacks: list[list[str]] = [[] for _ in boards]
+        efens = [board.encode() for board in boards]
+        seen = [{efen} for efen in efens]
+        if visited is not None:
+            for keys, previous in zip(seen, visited):
+                keys.update(previous)
+        active = [i for i, depth in enumerate(depths) if depth > 0]
+
+        while active:
+            keys = list(dict.fromkeys(efens[i] for i in active))
+            if reads is not None:
+                reads.update(keys)
+            rows = self._lookup(keys)
+            remaining = []
+            for i in active:
+                row = rows.get(efens[i])
+                if not row or row["move"] not in NUM_TO_UCI:
+                    continue
+
+                pv = NUM_TO_UCI[row["move"]]
+                try:
+                    boards[i].push_uci(pv)
+                except ValueError:
+                    # move singgahan tidak legal; anggap PV berakhir di sini
+                    continue
+                move_stacks[i].append(pv)
+
+                efens[i] = boards[i].encode()
+                if efens[i] in seen[i] or len(move_stacks[i]) >= depths[i]:
+                    continue
+                seen[i].add(efens[i])
+                remaining.append(i)
+            active = remaining
+
+        return move_stacks
+
+    def select(
+        self,
+        fen: str,
+        only_best: bool = False,
+        max_depth: int = 1,
+    ) -> list[Info]:
+        """Mendapatkan info dari suatu posisi catur.
+
+        Args:
+            fen: Posisi catur dalam notasi FEN.
+            with_move: Pilihan untuk hanya menghasilkan PV terbaik.
+            max_depth: Banyak maksimum rangkaian move yang perlu disertakan
+                di masing-masing PV.
+        """
+
+        board = Position(fen)
+        efen = board.encode()
+
+        if self._data_changed():
+            # tidak diketahui posisi mana yang ditulis; buang semuanya
+            self._cache.clear()
+
+        key = (efen, only_best, max_depth)
+        cached = self._cache.get(key)
+        if cached is not None:
+            results, reads = cached
+            self._touch(reads)
+            return results
+
+        generation = self._cache.generation
+        reads = set()
+        results = self._select(board, efen, only_best, max_depth, reads)
+        self._cache.put(key, results, reads, generation)
+        self._touch(reads)
+        return results
+
+    def _select(
+        self,
+        board: Position,
+        efen: bytes,
+        only_best: bool,
+        max_depth: int,
+        reads: set[bytes],
+    ) -> list[Info]:
+        "Isi dari `select`; semua posisi yang dicari dicatat di `reads`."
+
+        results = []
+
+        # hitung kunci semua anak terlebih dahulu, lalu ambil info posisi
+        # dan semua anaknya dengan satu query
+        children = []
+        if not only_best:
+            for move in board.legal_moves:
+                child = board.copy()
+                child.push(move)
+                children.append((move_uci(move), child, child.encode()))
+        keys = [efen] + [_ for _, _, _ in children]
+        reads.update(keys)
+        rows = self._lookup(keys)
+
+        # PV dari posisi dan anak-anaknya disusun bersamaan
+        lines: list[tuple[Position, int, set[bytes]]] = []
+        best_pv = None
+        if efen in rows:
+            results.append({"depth": rows[efen]["depth"], "score": rows[efen]["score"]})
+            lines.append((board.copy(), max_depth, set()))
+            if max_depth > 0:
+                best_pv = NUM_TO_UCI.get(rows[efen]["move"])
+        elif only_best:
+            return []
+
+        for uci, child, child_efen in children:
+            # dapatkan info semua anak
+            row = rows.get(child_efen)
+            if uci == best_pv or not row or row["depth"] <= 0:
+                continue
+
+            info = {"depth": row["depth"] + 1, "score": -row["score"], "pv": [uci]}
+            results.append(info)
+            lines.append((child, max_depth - 1, {efen}))
+
+        boards, depths, visited = zip(*lines) if lines else ((), (), ())
+        move_stacks = self._get_moves(list(boards), list(depths), list(visited), reads)
+        for info, move_stack in zip(results, move_stacks):
+            info["pv"] = info.get("pv", []) + move_stack
+
+        # sort
+        results[1:] = sorted(
+            results[1:],
+            key=lambda d: (d["depth"], d["score"]),
+            reverse=True,
+        )
+        for _, info in enumerate(results, start=1):
+            info["multipv"] = _
+
+        return results
+
+    def _extrapolate(
+        self, fen: str, info: Info
+    ) -> tuple[Info, list[tuple[bytes, int]], int]:
+        """Memecah `info` menjadi pasangan (posisi terenkode, move) di sepanjang PV.
+
+        Menghasilkan salinan info untuk ply pertama yang disinggah, daftar
+        pasangan tersebut, dan nomor ply pertama.
+        """
+
+        info_ = info.copy()
+        iters = []
+
+        try:
+            board = Position(fen)
+            for uci in info_["pv"]:
+                # simpan posisi saat ini dan next uci
+                _ = board.encode(), UCI_TO_NUM[uci]
+                iters.append(_)
+
+                board.push_uci(uci)
+
+        except (ValueError, KeyError):
+            # posisi/analisa catur non-standard
+            raise ValueError("Bukan posisi/analisa catur standar")
+
+        start = 0
+        if info_["multipv"] != 1:
+            iters.pop(0)  # jangan update multipv 1 di db dengan multipv!=1
+            info_["score"] *= -1  # ubah sudut pandang score
+            info_["depth"] -= 1  # kurangi depth
+            start += 1
+
+        return info_, iters, start
+
+    def _plan(self, fen: str, info: Info) -> dict[bytes, dict[str, Any]]:
+        """Baris board yang akan ditulis oleh `upsert`, tanpa menulisnya.
+
+        Aturannya sama dengan `upsert`, tetapi depth singgahan dibaca sekaligus
+        lewat `_lookup`.
+        """
+
+        return self._plan_rows(*self._extrapolate(fen, info))
+
+    def _plan_rows(
+        self, info_: Info, iters: list[tuple[bytes, int]], start: int
+    ) -> dict[bytes, dict[str, Any]]:
+        "`_plan` untuk hasil `_extrapolate`."
+
+        depth, score = info_["depth"], info_["score"]
+        olds = self._lookup(list(dict.fromkeys(efen for efen, _ in iters)))
+        rows = {}
+        for num, (efen, move) in enumerate(iters, start=start):
+            if depth < self.minimal_depth:
+                break
+
+            # aturan berhenti sama dengan `upsert`
+            old_depth = olds.get(efen, {"depth": 0})["depth"]
+            if old_depth > depth or (old_depth == depth and num != 0):
+                break
+
+            # PV bisa melewati posisi yang sama lebih dari sekali
+            olds[efen] = rows[efen] = {"depth": depth, "score": score, "move": move}
+
+            score *= -1  # ubah sudut pandang score
+            depth -= 1  # kurangi depth
+
+        return rows
+
+
+class Database(_BaseDatabase):
     """Database singgahan hasil analisis mesin catur.
 
     Attributes:
         db: koneksi ke database SQLite
     """
 
-    def __init__(self, uri: str = ":memory:", minimal_depth: int = 1) -> None:
+    def __init__(
+        self,
+        uri: str = ":memory:",
+        minimal_depth: int = 1,
+        zobrist: bool = False,
+        write_behind: int = 0,
+        flush_interval: float = 1.0,
+        select_cache: int = SELECT_CACHE,
+        max_rows: int = 0,
+        max_bytes: int = 0,
+        epoch_seconds: int = 3600,
+        evict_interval: float = 60.0,
+        bloom: bool = False,
+        maintenance: float = 0.0,
+        checkpoint_pages: int = 1000,
+        idle_seconds: float = 1.0,
+        optimize_interval: float = 3600.0,
+        vacuum_pages: int = 100,
+    ) -> None:
         """Membuat koneksi ke database dengan URI `database`.
 
         Membuat instance `sqlite3.Connection`, yang dapat diakses oleh
@@ -363,9 +953,81 @@ class Database:
         Kolom `fen` berisi posisi catur dalam notasi FEN yang terenkode.
         Kolom `move` berisi langkah bidak dalam notasi UCI yang terenkode.
 
+        Pada mode Zobrist, PRIMARY KEY adalah kolom `key` bertipe INTEGER berisi
+        `zobrist_hash` dari `fen`, sehingga B-tree berisi kunci 8 byte yang
+        seragam. Kolom `fen` tetap disimpan untuk memeriksa tabrakan hash. Mode
+        ditentukan oleh skema tabel yang sudah ada; argumen `zobrist` hanya
+        berlaku ketika tabel board baru dibuat. Lihat juga `migrate_zobrist`.
+
+        Jika `write_behind` positif, `upsert` tidak langsung menulis ke database.
+        Baris hasilnya ditampung di memori (satu baris per posisi, yang terdalam
+        yang dipertahankan) dan ditulis dalam satu transaksi oleh `flush`, yaitu
+        ketika tampungan berisi `write_behind` baris atau `flush_interval` detik
+        telah berlalu sejak penulisan terakhir. Selang waktu tersebut juga
+        diperiksa oleh thread latar belakang, sehingga baris tertunda tetap
+        ditulis walaupun tidak ada `upsert` baru. `select` tetap melihat baris
+        yang belum ditulis. `close` menulis semua baris tertunda; baris yang
+        belum ditulis hilang jika proses berhenti mendadak.
+
+        Koneksi `sql` adalah satu-satunya koneksi penulis. Pembacaan oleh
+        `select` memakai `reader`, yaitu koneksi read-only milik tiap thread,
+        sehingga dapat berjalan bersamaan dengan penulisan.
+
+        Hasil `select` disinggah di memori sampai perkiraan ukuran
+        `select_cache` byte. Penulisan ke suatu posisi membuang semua hasil
+        yang bergantung pada posisi tersebut, termasuk hasil milik posisi
+        induknya. Penulisan oleh koneksi lain, misalnya importer atau
+        `merge_database` di proses lain, dideteksi dengan `PRAGMA data_version`
+        pada setiap `select`, lalu seluruh singgahan dibuang. Lihat `cache_info`.
+
+        Jika `max_rows` atau `max_bytes` positif, database berjalan dalam mode
+        eviksi (LRU). Kolom `epoch` di tabel board mencatat kapan terakhir suatu
+        posisi dibaca atau ditulis, dalam satuan `epoch_seconds` detik. Akses
+        hanya dicatat di memori lalu ditulis bertahap, sehingga `select` tetap
+        tidak menulis ke database. Thread latar belakang menjalankan `evict`
+        setiap `evict_interval` detik, membuang posisi yang paling lama tidak
+        diakses (dan yang depthnya paling kecil) dalam transaksi-transaksi
+        kecil sampai database kembali di bawah batas.
+
+        Jika `bloom` True, Bloom filter di memori atas semua posisi di tabel
+        board diperiksa sebelum setiap pencarian, sehingga posisi yang pasti
+        tidak disinggah tidak perlu dicari ke SQLite. Filter dibaca dari berkas
+        `<database>.bloom` yang disimpan oleh `close`, atau dibangun ulang dari
+        tabel board jika berkas tersebut tidak ada atau usang. Penulisan oleh
+        proses lain tidak tercatat di filter. Lihat `bloom_info`.
+
+        Jika `maintenance` positif, checkpoint otomatis SQLite dimatikan dan
+        diganti oleh thread pemeliharaan dengan koneksinya sendiri, yang
+        diperiksa setiap `maintenance` detik. Selama ada penulisan, WAL
+        di-checkpoint PASSIVE (tanpa menahan penulis) setelah mencapai
+        `checkpoint_pages` halaman. Setelah tidak ada penulisan selama
+        `idle_seconds` detik, WAL di-checkpoint RESTART agar penulisan
+        berikutnya dimulai dari awal berkas WAL, lalu paling banyak
+        `vacuum_pages` halaman kosong dikembalikan ke sistem berkas. Bagian
+        terakhir ini hanya berlaku untuk database dalam mode auto_vacuum
+        incremental, yaitu database yang dibuat oleh versi ini; database lama
+        perlu diubah sekali dengan `migrate_incremental_vacuum`. `PRAGMA
+        optimize` dijalankan setiap `optimize_interval` detik. Durasi semua
+        pekerjaan ini, dan durasi penulisan, dapat dilihat di
+        `maintenance_info`. Tidak berlaku untuk database di memori.
+
         Args:
             uri: URI lokasi database.
             minimal_depth: Nilai depth minimal agar analisa dapat disinggah.
+            zobrist: Membuat tabel board baru dalam mode Zobrist.
+            write_behind: Banyak baris tertunda maksimum; 0 untuk menulis langsung.
+            flush_interval: Selang waktu maksimum (detik) antar penulisan.
+            select_cache: Ukuran singgahan hasil select (byte); 0 untuk mematikan.
+            max_rows: Batas banyak baris tabel board; 0 tanpa batas.
+            max_bytes: Batas ukuran data (byte) di database; 0 tanpa batas.
+            epoch_seconds: Resolusi waktu akses (detik) pada mode eviksi.
+            evict_interval: Selang waktu (detik) antar eviksi otomatis.
+            bloom: Memakai Bloom filter untuk pencarian posisi.
+            maintenance: Selang waktu (detik) pemeliharaan; 0 untuk mematikan.
+            checkpoint_pages: Ukuran WAL (halaman) sebelum checkpoint PASSIVE.
+            idle_seconds: Lama tanpa penulisan (detik) sebelum checkpoint RESTART.
+            optimize_interval: Selang waktu (detik) antar `PRAGMA optimize`.
+            vacuum_pages: Banyak halaman per incremental vacuum.
         """
 
         # TODO: bikin tabel version di database; jika < program, program raise Error
@@ -391,6 +1053,7 @@ class Database:
         self.sql.autocommit = sqlite3.LEGACY_TRANSACTION_CONTROL
         self.sql.row_factory = dict_factory
         script = """
+                PRAGMA auto_vacuum = incremental;
                 PRAGMA journal_mode = wal;
                 PRAGMA synchronous = off;
                 PRAGMA temp_store = memory;
@@ -399,17 +1062,21 @@ class Database:
 
                 PRAGMA wal_autocheckpoint;
 
-                CREATE TABLE IF NOT EXISTS board(
-                    fen         BLOB    NOT NULL,
-                    depth       INTEGER NOT NULL,
-                    score       INTEGER NOT NULL,
-                    move        INTEGER,
-                    PRIMARY KEY (fen)
-                    ) WITHOUT ROWID;
+                {board};
 
                 CREATE INDEX IF NOT EXISTS ix_covering
                     ON board (depth, score);
+
+                CREATE TABLE IF NOT EXISTS quiz(
+                    rank        INTEGER PRIMARY KEY,
+                    depth       INTEGER NOT NULL,
+                    score       INTEGER NOT NULL,
+                    fen         BLOB    NOT NULL
+                    );
+                CREATE INDEX IF NOT EXISTS ix_quiz
+                    ON quiz (depth, score);
                 """
+        script = script.replace("{board}", _BOARD_ZOBRIST if zobrist else _BOARD_BLOB)
         # PRAGMA cache_size = -4096000;
 
         # https://stackoverflow.com/questions/15856976
@@ -426,95 +1093,226 @@ class Database:
         cur = self.sql.execute(
             'SELECT file FROM pragma_database_list WHERE name="main"'
         )
-        self._is_memory = not cur.fetchone()["file"]
+        file = cur.fetchone()["file"]
+        self._file = file
+        self._is_memory = not file
+        self._uri = uri
+        self._readers: list[sqlite3.Connection] = []
+        self._readers_lock = Lock()
+        self._local = local()
         self.minimal_depth = minimal_depth
 
+        self.sql.create_function("zobrist", 1, zobrist_hash, deterministic=True)
+        cur = self.sql.execute("SELECT name FROM pragma_table_info('board')")
+        self._set_zobrist("key" in [row["name"] for row in cur.fetchall()])
+
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self._pending: dict[bytes, dict[str, Any]] = {}
+        self._pending_lock = Lock()
+        self._flushed_at = monotonic()
+        self._cache = _SelectCache(select_cache)
+        self._data_version = self._read_data_version()
+        self._timings = _Timings()
+        self._upsert_stats = {"calls": 0, "plies": 0, "written": 0}
+        self._write_lock = RLock()  # koneksi `sql` dipakai bersama oleh banyak thread
+        self._add_depth_stats()
+
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.epoch_seconds = epoch_seconds
+        self._touched: set[bytes] = set()
+        self._touched_lock = Lock()
+        self._evictor_stop = Event()
+        self._evictor: Thread | None = None
+        if max_rows > 0 or max_bytes > 0:
+            self._add_epoch()
+            self._evictor = Thread(
+                target=self._evict_loop, args=(evict_interval,), daemon=True
+            )
+            self._evictor.start()
+
+        self._bloom: _BloomFilter | None = None
+        self._bloom_path = f"{file}.bloom" if file else None
+        self._bloom_skipped = 0  # posisi yang tidak dicari karena filter
+        self._bloom_false = 0  # posisi yang lolos filter tetapi tidak ada
+        if bloom:
+            self._load_bloom()
+
+        self._written_at = monotonic()
+        self._maintenance_stop = Event()
+        self._maintenance: Thread | None = None
+        if maintenance > 0 and not self._is_memory:
+            page_size = self.sql.execute("PRAGMA page_size").fetchone()["page_size"]
+            self.checkpoint_bytes = checkpoint_pages * page_size
+            self.idle_seconds = idle_seconds
+            self.optimize_interval = optimize_interval
+            self.vacuum_pages = vacuum_pages
+            # checkpoint tidak lagi terjadi di tengah penulisan, dan berkas WAL
+            # dipotong kembali setelah checkpoint
+            self.sql.execute("PRAGMA wal_autocheckpoint = 0")
+            self.sql.execute(f"PRAGMA journal_size_limit = {self.checkpoint_bytes}")
+            if self.sql.execute("PRAGMA auto_vacuum").fetchone()["auto_vacuum"] != 2:
+                logger_db.warning(
+                    "auto_vacuum incremental belum aktif; "
+                    "jalankan migrate_incremental_vacuum"
+                )
+            self._maintenance = Thread(
+                target=self._maintenance_loop, args=(maintenance,), daemon=True
+            )
+            self._maintenance.start()
+
+        self._flusher_stop = Event()
+        self._flusher: Thread | None = None
+        if write_behind > 0 and flush_interval < float("inf"):
+            self._flusher = Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def _set_zobrist(self, zobrist: bool) -> None:
+        self.zobrist = zobrist
+        if zobrist:
+            self._match = "key=:key AND fen=:fen"
+            self._conflict = "ON CONFLICT (key)"
+            self._columns = "key, fen"
+        else:
+            self._match = "fen=:fen"
+            self._conflict = "ON CONFLICT (fen)"
+            self._columns = "fen"
+
+    def _key(self, efen: bytes) -> dict[str, Any]:
+        "Parameter SQL untuk mencari posisi terenkode `efen` di tabel board."
+        if self.zobrist:
+            return {"fen": efen, "key": zobrist_hash(efen)}
+        return {"fen": efen}
+
+    def reader(self) -> sqlite3.Connection:
+        """Koneksi read-only milik thread pemanggil.
+
+        Koneksi dibuat saat pertama kali diminta oleh suatu thread, lalu dipakai
+        ulang oleh thread tersebut. Database di memori tidak dapat dibuka oleh
+        koneksi lain, sehingga memakai koneksi `sql`.
+        """
+
+        if self._is_memory:
+            return self.sql
+
+        conn = getattr(self._local, "sql", None)
+        if conn is None:
+            conn = self._connect("query_only = 1")
+            with self._readers_lock:
+                self._readers.append(conn)
+            self._local.sql = conn
+        return conn
+
+    def _read_data_version(self) -> int:
+        # tidak berubah oleh penulisan melalui `sql` sendiri
+        return self.sql.execute("PRAGMA data_version").fetchone()["data_version"]
+
+    def _data_changed(self) -> bool:
+        if self._is_memory:
+            return False
+        version = self._read_data_version()
+        if version == self._data_version:
+            return False
+        self._data_version = version
+        return True
+
+    def _connect(self, *pragmas: str) -> sqlite3.Connection:
+        "Membuka koneksi lain ke database yang sama."
+        conn = sqlite3.connect(
+            self._uri,
+            uri=True,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.autocommit = sqlite3.LEGACY_TRANSACTION_CONTROL
+        conn.row_factory = self.sql.row_factory
+        conn.create_function("zobrist", 1, zobrist_hash, deterministic=True)
+        for pragma in (
+            *pragmas,
+            "temp_store = memory",
+            "mmap_size = 30000000000",
+            "busy_timeout = 10000",
+        ):
+            conn.execute(f"PRAGMA {pragma}")
+        return conn
+
     def close(self) -> None:
         "Menutup koneksi ke database."
+        if self._flusher is not None:
+            self._flusher_stop.set()
+            self._flusher.join()
+        if self._maintenance is not None:
+            self._maintenance_stop.set()
+            self._maintenance.join()
+        if self._evictor is not None:
+            self._evictor_stop.set()
+            self._evictor.join()
+            self._flush_touched()
+        self.flush()
+        if self._bloom is not None and self._bloom_path:
+            self._bloom.save(self._bloom_path, self._count())
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+
         logger_db.info("Mengoptimasi database sebelum menutupnya")
         self.sql.execute("PRAGMA optimize")
 
         self.sql.close()
         logger_db.info("Database ditutup")
 
-    def _get_moves(self, board: Board, depth: int) -> list[str]:
-        stt = "SELECT move FROM board WHERE fen=?"
-        move_stack = []
-
-        for _ in range(depth):
-            efen = encode_fen(board.epd())
-            result = self.sql.execute(stt, (efen,)).fetchone()
-            if not result or result["move"] not in NUM_TO_UCI:
-                break
-
-            pv = NUM_TO_UCI[result["move"]]
-            move_stack.append(pv)
-            board.push_uci(pv)
-
-        return move_stack
-
-    def select(
-        self,
-        fen: str,
-        only_best: bool = False,
-        max_depth: int = 1,
-    ) -> list[Info]:
-        """Mendapatkan info dari suatu posisi catur.
+    def _lookup(self, efens: list[bytes]) -> dict[bytes, dict[str, Any]]:
+        """Mengambil baris board dari banyak posisi terenkode sekaligus.
 
-        Args:
-            fen: Posisi catur dalam notasi FEN.
-            with_move: Pilihan untuk hanya menghasilkan PV terbaik.
-            max_depth: Banyak maksimum rangkaian move yang perlu disertakan
-                di masing-masing PV.
+        Menghasilkan dict `{fen: {"depth", "score", "move"}}`; posisi yang tidak
+        ada di database tidak disertakan.
         """
 
-        stt = "SELECT depth, score FROM board WHERE fen=?"
-
-        board = Board(fen)
-        results = []
-
-        efen = encode_fen(board.epd())
-        info = self.sql.execute(stt, (efen,)).fetchone()
-        if info:
-            info["pv"] = self._get_moves(board, max_depth)
-            board.set_fen(fen)
-            results.append(info)
-        elif only_best:
-            return []
+        results = {}
+        if self._pending:
+            # baris yang belum ditulis lebih baru daripada isi database
+            with self._pending_lock:
+                for efen in efens:
+                    if efen in self._pending:
+                        results[efen] = self._pending[efen].copy()
+            efens = [efen for efen in efens if efen not in results]
+
+        with self._timings.measure("lookup"):
+            self._lookup_rows(efens, results)
+        return results
 
-        if not only_best:
-            # dapatkan info semua anak
-            if info and info["pv"]:
-                best_pv = info["pv"][0]
+    def _lookup_rows(self, efens: list[bytes], results: dict[bytes, Any]) -> None:
+        bloom = self._bloom
+        if bloom is not None:
+            candidates = [efen for efen in efens if efen in bloom]
+            self._bloom_skipped += len(efens) - len(candidates)
+            self._bloom_false += len(candidates)  # dikurangi yang ditemukan
+            efens = candidates
+
+        for i in range(0, len(efens), LOOKUP_BATCH):
+            chunk = efens[i : i + LOOKUP_BATCH]
+            marks = ",".join("?" * len(chunk))
+            if self.zobrist:
+                stt = (
+                    f"SELECT fen, depth, score, move FROM board WHERE key IN ({marks})"
+                )
+                params = [zobrist_hash(efen) for efen in chunk]
             else:
-                best_pv = None
-
-            for move in board.legal_moves:
-                uci = move.uci()
-                if uci == best_pv:
-                    continue
-
-                board.push(move)
-                efen = encode_fen(board.epd())
-                info = self.sql.execute(stt, (efen,)).fetchone()
-                if info and info["depth"] > 0:
-                    info["score"] *= -1
-                    info["depth"] += 1
-                    info["pv"] = self._get_moves(board, max_depth - 1)
-                    info["pv"].insert(0, uci)
-                    results.append(info)
-                board.set_fen(fen)
-
-        # sort
-        results[1:] = sorted(
-            results[1:],
-            key=lambda d: (d["depth"], d["score"]),
-            reverse=True,
-        )
-        for _, info in enumerate(results, start=1):
-            info["multipv"] = _
+                stt = (
+                    f"SELECT fen, depth, score, move FROM board WHERE fen IN ({marks})"
+                )
+                params = chunk
 
-        return results
+            wanted = set(chunk)
+            for row in self.reader().execute(stt, params):
+                efen = row.pop("fen")
+                if efen in wanted:
+                    # pada mode Zobrist, abaikan posisi lain yang hashnya sama
+                    results[efen] = row
+                    if bloom is not None:
+                        self._bloom_false -= 1
 
     # @profile
     def upsert(self, fen: str, info: Info) -> None:
@@ -524,70 +1322,643 @@ class Database:
         Kondisi IGNORE terjadi ketika move yang sudah ada di database memiliki
         nilai `depth` yang lebih besar, atau ada child yang pernah dianalisis
         dan memiliki data yang lebih baik daripada hasil ekstrapolasi info.
+        Seluruh PV ditulis dengan satu statement; perbandingan depth dilakukan
+        oleh SQLite, tanpa membaca tiap ply terlebih dahulu.
 
         Args:
             fen: Posisi catur dalam notasi FEN.
             info: Hasil analisa dari posisi.
         """
 
-        stt_info = "SELECT depth FROM board WHERE fen=?"
-        stt_upsert = """
-            INSERT INTO board (fen, depth, score, move)
-            VALUES (:fen, :depth, :score, :move)
-            ON CONFLICT (fen) DO UPDATE SET
+        if self.write_behind > 0:
+            self._upsert_pending(fen, info)
+            return
+
+        info_, iters, start = self._extrapolate(fen, info)
+        with self._write_lock:
+            self._upsert_stats["calls"] += 1
+            self._upsert_stats["plies"] += len(iters)
+
+        rows = []
+        seen = set()
+        depth, score = info_["depth"], info_["score"]
+        for num, (efen, move) in enumerate(iters, start=start):
+            if depth < self.minimal_depth or efen in seen:
+                # posisi yang berulang di PV pasti berhenti: ply sebelumnya
+                # sudah menyinggahnya dengan depth yang lebih besar
+                break
+            seen.add(efen)
+            rows.append((num, efen, depth, score, move))
+
+            score *= -1  # ubah sudut pandang score
+            depth -= 1  # kurangi depth
+
+        if not rows:
+            return
+        self._touch(efen for _, efen, _, _, _ in rows)
+
+        # Semua ply dikirim dalam satu statement. Aturan perbandingan depth:
+        # ply pertama (num = 0) boleh menimpa depth yang sama, sedangkan ply
+        # hasil taksiran/ekstrapolasi hanya menimpa depth yang lebih kecil.
+        # Ply pertama adalah satu-satunya ply dengan depth :root, karena depth
+        # berkurang satu per ply. Penyinggahan berhenti di ply pertama yang
+        # melanggar aturan tersebut (`stop`); ply setelahnya tidak ditulis.
+        values, params = [], {"root": info_["depth"] if start == 0 else None}
+        for num, efen, depth, score, move in rows:
+            names = [f":{c}{num}" for c in ("key", "fen", "depth", "score", "move")]
+            if not self.zobrist:
+                names.pop(0)
+            values.append(f"({num}, {', '.join(names)})")
+            params.update(
+                {
+                    f"fen{num}": efen,
+                    f"depth{num}": depth,
+                    f"score{num}": score,
+                    f"move{num}": move,
+                }
+            )
+            if self.zobrist:
+                params[f"key{num}"] = zobrist_hash(efen)
+
+        join = " AND ".join(f"board.{c} = pv.{c}" for c in self._columns.split(", "))
+        stt_upsert = f"""
+            WITH pv (num, {self._columns}, depth, score, move) AS (
+                VALUES {", ".join(values)}
+            ), stop AS (
+                SELECT MIN(pv.num) AS num FROM pv JOIN board ON {join}
+                WHERE board.depth > pv.depth
+                    OR (board.depth = pv.depth AND pv.depth IS NOT :root)
+            )
+            INSERT INTO board ({self._columns}, depth, score, move)
+            SELECT {self._columns}, depth, score, move FROM pv
+            WHERE pv.num < COALESCE((SELECT num FROM stop), {rows[-1][0] + 1})
+            {self._conflict} DO UPDATE SET
                 depth = excluded.depth,
                 score = excluded.score,
                 move  = excluded.move
+            WHERE fen = excluded.fen AND (
+                board.depth < excluded.depth
+                OR (board.depth = excluded.depth AND excluded.depth IS :root)
+            )
+        """
+        with self._timings.measure("write"), self._write_lock:
+            self._bloom_add(efen for _, efen, _, _, _ in rows)
+            self.sql.execute(stt_upsert, params)
+            # rowcount bernilai -1 untuk statement yang diawali WITH
+            changes = self.sql.execute("SELECT changes() AS n").fetchone()["n"]
+            self._upsert_stats["written"] += changes
+            self._bloom_check()
+            self._written_at = monotonic()
+        # singgahan dibuang setelah penulisan selesai, agar `select` yang
+        # berjalan di antaranya tidak menyinggahkan baris lama
+        self._cache.invalidate(efen for _, efen, _, _, _ in rows)
+
+    def _upsert_pending(self, fen: str, info: Info) -> None:
+        """Versi tertunda dari `upsert`.
+
+        Baris dari `_plan` (yang juga membaca baris yang belum ditulis) hanya
+        ditampung di `_pending`.
         """
 
-        board = Board(fen)
-        info_ = info.copy()
-        iters = []
+        rows = self._plan(fen, info)
+        with self._pending_lock:
+            self._upsert_stats["calls"] += 1
+            # ply pertama analisa multipv != 1 tidak pernah ditulis;
+            # banyak baris yang ditulis dihitung oleh `flush`
+            self._upsert_stats["plies"] += len(info["pv"]) - (info["multipv"] != 1)
+            self._pending.update(rows)
+            full = len(self._pending) >= self.write_behind
+        # `select` membaca `_pending`, jadi baris baru sudah terlihat di sini
+        self._cache.invalidate(rows)
+        self._touch(rows)
+
+        if full or monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Menulis semua baris tertunda dari `upsert` dalam satu transaksi.
+
+        Baris di database yang depthnya lebih besar tidak ditimpa. Baris tetap
+        terlihat oleh `select` sampai transaksi selesai.
+        """
+
+        self._flushed_at = monotonic()
+        with self._pending_lock:
+            pending = list(self._pending.items())
+        if not pending:
+            return
+
+        written = self.write_rows(pending)
+        with self._write_lock:
+            self._upsert_stats["written"] += written
+        with self._pending_lock:
+            for efen, row in pending:
+                # jangan buang baris yang diperbarui selama transaksi
+                if self._pending.get(efen) is row:
+                    del self._pending[efen]
+        logger_db.debug("Menulis baris tertunda", extra={"rows": len(pending)})
+
+    def _flush_loop(self) -> None:
+        while not self._flusher_stop.wait(self.flush_interval):
+            if monotonic() - self._flushed_at < self.flush_interval:
+                continue
+            try:
+                self.flush()
+            except sqlite3.Error:
+                logger_db.exception("Penulisan baris tertunda gagal")
+
+    def write_rows(
+        self, rows: Iterable[tuple[bytes, dict[str, Any]]], deeper: bool = False
+    ) -> int:
+        """Menulis pasangan (posisi terenkode, baris) dalam satu transaksi.
+
+        Baris di database yang depthnya lebih besar tidak ditimpa; jika `deeper`,
+        baris yang depthnya sama juga tidak ditimpa. Singgahan hasil `select`
+        untuk posisi tersebut dibuang setelah transaksi selesai. Menghasilkan
+        banyak baris yang benar-benar ditulis.
+        """
+
+        op = "<" if deeper else "<="
+        stt_upsert = f"""
+            INSERT INTO board ({self._columns}, depth, score, move)
+            VALUES ({':key, ' if self.zobrist else ''}:fen, :depth, :score, :move)
+            {self._conflict} DO UPDATE SET
+                depth = excluded.depth,
+                score = excluded.score,
+                move  = excluded.move
+            WHERE fen = excluded.fen AND board.depth {op} excluded.depth
+        """
+        rows = list(rows)
+        with self._timings.measure("write"), self._write_lock:
+            self._bloom_add(efen for efen, _ in rows)
+            with self.sql as conn:
+                conn.execute("BEGIN")
+                # rowcount executemany adalah jumlah baris yang diubah semua
+                # statement, tanpa perubahan oleh trigger
+                written = conn.executemany(
+                    stt_upsert,
+                    (self._key(efen) | row for efen, row in rows),
+                ).rowcount
+            self._bloom_check()
+            self._written_at = monotonic()
+        self._cache.invalidate(efen for efen, _ in rows)
+        return max(0, written)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transaksi `BEGIN IMMEDIATE` di koneksi `sql`, di bawah kunci tulis.
+
+        Untuk tabel lain di berkas database yang sama (misalnya catatan
+        pekerjaan impor); baris board ditulis dengan `write_rows` atau
+        `merge_staged`, yang juga memperbarui Bloom filter dan singgahan.
+        """
+
+        with self._write_lock, self.sql as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+    @contextmanager
+    def bulk_load(self, pragmas: dict[str, Any] | None = None) -> Iterator[None]:
+        """Menyiapkan pemuatan massal melalui tabel sementara.
+
+        Di dalam blok ini baris dapat ditampung dengan `stage_rows` lalu
+        digabungkan ke board dengan `merge_staged`. PRAGMA di `pragmas` disetel
+        selama pemuatan lalu dikembalikan; setelahnya tabel sementara dibuang
+        dan WAL di-checkpoint.
 
+        Args:
+            pragmas: Nilai PRAGMA selama pemuatan, misalnya `cache_size`.
+        """
+
+        pragmas = pragmas or {}
+        self.flush()
+        with self._write_lock:
+            tuned = {
+                pragma: self.sql.execute(f"PRAGMA {pragma}").fetchone()[pragma]
+                for pragma in pragmas
+            }
+            for pragma, value in pragmas.items():
+                self.sql.execute(f"PRAGMA {pragma} = {value}")
+            self.sql.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS board_staging ({self._columns}, score)"
+            )
         try:
-            for uci in info_["pv"]:
-                # simpan posisi saat ini dan next uci
-                _ = encode_fen(board.fen()), UCI_TO_NUM[uci]
-                iters.append(_)
+            yield
+        finally:
+            with self._write_lock:
+                self.sql.execute("DROP TABLE IF EXISTS temp.board_staging")
+                for pragma, value in tuned.items():
+                    self.sql.execute(f"PRAGMA {pragma} = {value}")
+                self.sql.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def stage_rows(self, rows: Iterable[tuple[Any, ...]]) -> None:
+        """Menampung baris di tabel sementara `bulk_load` dalam satu transaksi.
+
+        Setiap baris berupa `(key, posisi terenkode, score)` pada mode Zobrist,
+        atau `(posisi terenkode, score)`.
+        """
 
-                board.push_uci(uci)
+        marks = "?, ?, ?" if self.zobrist else "?, ?"
+        with self.transaction() as conn:
+            conn.executemany(f"INSERT INTO temp.board_staging VALUES ({marks})", rows)
 
-        except (IllegalMoveError, KeyError):
-            # posisi/analisa catur non-standard
-            raise ValueError("Bukan posisi/analisa catur standar")
+    def merge_staged(self, depth: int) -> None:
+        """Menggabungkan isi tabel sementara `bulk_load` ke board.
 
-        start = 0
-        if info_["multipv"] != 1:
-            iters.pop(0)  # jangan update multipv 1 di db dengan multipv!=1
-            info_["score"] *= -1  # ubah sudut pandang score
-            info_["depth"] -= 1  # kurangi depth
-            start += 1
+        Baris ditulis dengan `depth` dan tanpa move, terurut menurut PRIMARY KEY
+        dengan satu `INSERT ... SELECT`; baris board hanya ditimpa oleh depth
+        yang lebih besar. Tabel sementara dikosongkan setelahnya.
+        """
 
-        with self.sql as conn:
-            for num, (efen, move) in enumerate(iters, start=start):
-                if info_["depth"] < self.minimal_depth:
-                    break
-
-                # bandingkan dengan hasil singgahan
-                _ = self.sql.execute(stt_info, (efen,)).fetchone() or {"depth": 0}
-                old_depth = _["depth"]
-
-                if old_depth > info_["depth"]:
-                    # hentikan menyinggah karena posisi ini pernah dianalisa
-                    # dan depthnya lebih besar daripada depth hasil taksiran
-                    break
-                elif old_depth == info_["depth"] and num != 0:
-                    # hentikan menyinggah karena posisi ini pernah dianalisa
-                    # walau depthnya sama, posisi ini lebih baik karena data
-                    # yang kita akan update hanyalah taksiran/ekstrapolasi
-                    break
-
-                info_["fen"], info_["move"] = efen, move
-                conn.execute(stt_upsert, info_)
-
-                # khusus untuk semua iterasi berikutnya; keturunannya
-                info_["score"] *= -1  # ubah sudut pandang score
-                info_["depth"] -= 1  # kurangi depth
+        stt_merge = f"""
+            INSERT INTO main.board ({self._columns}, depth, score, move)
+            SELECT {self._columns}, :depth, score, NULL FROM temp.board_staging
+            WHERE TRUE ORDER BY {self._columns}
+            {self._conflict} DO UPDATE SET
+                depth = excluded.depth,
+                score = excluded.score,
+                move  = excluded.move
+            WHERE fen = excluded.fen AND excluded.depth > board.depth
+        """
+        with self._timings.measure("write"), self._write_lock:
+            if self._bloom is not None:
+                cur = self.sql.execute("SELECT fen FROM temp.board_staging")
+                self._bloom_add(row["fen"] for row in cur.fetchall())
+            with self.sql as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(stt_merge, {"depth": depth})
+                conn.execute("DELETE FROM temp.board_staging")
+            self._bloom_check()
+            self._written_at = monotonic()
+        self._cache.clear()
+
+    def _count(self) -> int:
+        "Banyak baris di tabel board, dari depth_stats (dijaga trigger)."
+        with self._write_lock:
+            cur = self.sql.execute(
+                "SELECT COALESCE(SUM(rows), 0) AS n FROM depth_stats"
+            )
+            return cur.fetchone()["n"]
+
+    def _load_bloom(self) -> None:
+        rows = self._count()
+        if self._bloom_path:
+            bloom = _BloomFilter.load(self._bloom_path, rows)
+            if bloom is not None:
+                # berkas dihapus agar tidak dipakai lagi jika program mati mendadak
+                os_remove(self._bloom_path)
+                self._bloom = bloom
+                logger_db.info("Bloom filter dibaca", extra={"path": self._bloom_path})
+                return
+        self._build_bloom(rows)
+
+    def _build_bloom(self, rows: int) -> None:
+        # kapasitas dua kali banyak baris, agar tidak segera dibangun ulang
+        with self._write_lock:
+            bloom = _BloomFilter(max(2 * rows, BLOOM_MIN))
+            cur = self.sql.execute("SELECT fen FROM board")
+            while batch := cur.fetchmany(10 * LOOKUP_BATCH):
+                bloom.add(row["fen"] for row in batch)
+            bloom.added = 0
+            self._bloom = bloom
+        logger_db.info(
+            "Bloom filter dibangun", extra={"rows": rows, "bytes": bloom.nbytes}
+        )
+
+    def _bloom_add(self, efens: Iterable[bytes]) -> None:
+        # dipanggil sebelum menulis, agar pembaca tidak melewatkan posisi baru
+        if self._bloom is not None:
+            self._bloom.add(efens)
+
+    def _bloom_check(self) -> None:
+        # dipanggil setelah menulis, agar pembangunan ulang melihat posisi baru
+        if self._bloom is not None and self._bloom.saturated():
+            self._build_bloom(self._count())
+
+    def bloom_info(self) -> dict[str, Any]:
+        """Statistik Bloom filter; dict kosong jika filter tidak dipakai.
+
+        `false_positive_rate` adalah perkiraan dari isi filter, sedangkan
+        `observed_false_positive_rate` adalah proporsi posisi tidak disinggah
+        yang tetap dicari ke SQLite sejak database dibuka.
+        """
+
+        bloom = self._bloom
+        if bloom is None:
+            return {}
+        absent = self._bloom_skipped + self._bloom_false
+        return {
+            "bytes": bloom.nbytes,
+            "hashes": bloom.hashes,
+            "capacity": bloom.capacity,
+            "false_positive_rate": bloom.false_positive_rate(),
+            "observed_false_positive_rate": (
+                self._bloom_false / absent if absent else 0.0
+            ),
+            "skipped": self._bloom_skipped,
+            "false_positives": self._bloom_false,
+        }
+
+    def _add_epoch(self) -> None:
+        # kolom dan indeks untuk mode eviksi; baris lama dianggap paling dingin
+        cur = self.sql.execute("SELECT name FROM pragma_table_info('board')")
+        if "epoch" not in [row["name"] for row in cur.fetchall()]:
+            with self._write_lock:
+                self.sql.execute(
+                    "ALTER TABLE board ADD COLUMN epoch INTEGER NOT NULL DEFAULT 0"
+                )
+        self.sql.execute(
+            "CREATE INDEX IF NOT EXISTS ix_eviction ON board (epoch, depth)"
+        )
+
+    def _touch(self, efens: Iterable[bytes]) -> None:
+        if self._evictor is not None:
+            with self._touched_lock:
+                self._touched.update(efens)
+
+    def _flush_touched(self) -> None:
+        # tulis waktu akses yang tercatat di memori, satu transaksi
+        with self._touched_lock:
+            touched, self._touched = self._touched, set()
+        if not touched:
+            return
+
+        epoch = int(time() // self.epoch_seconds)
+        stt = f"UPDATE board SET epoch = :epoch WHERE {self._match} AND epoch < :epoch"
+        with self._write_lock, self.sql as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                stt, (self._key(efen) | {"epoch": epoch} for efen in touched)
+            )
+
+    def _excess(self) -> int:
+        "Perkiraan banyak baris yang perlu dibuang agar di bawah batas."
+
+        excess = 0
+        with self._write_lock:
+            if self.max_rows > 0:
+                excess = max(excess, self._count() - self.max_rows)
+            if self.max_bytes > 0:
+                pages = self.sql.execute(
+                    """
+                    SELECT page_count - freelist_count AS used, page_size
+                    FROM pragma_page_count, pragma_freelist_count, pragma_page_size
+                    """
+                ).fetchone()
+                if pages["used"] * pages["page_size"] > self.max_bytes:
+                    # ukuran baris tidak diketahui; buang satu batch lalu periksa lagi
+                    excess = max(excess, EVICT_BATCH)
+        return excess
+
+    def evict(self) -> int:
+        """Membuang posisi yang paling lama tidak diakses sampai di bawah batas.
+
+        Posisi diurutkan menurut `epoch` lalu `depth`, sehingga di antara posisi
+        yang sama dinginnya, posisi yang paling dangkal dibuang terlebih dahulu.
+        Setiap transaksi membuang paling banyak `EVICT_BATCH` baris. Menghasilkan
+        banyak baris yang dibuang.
+        """
+
+        self.flush()  # baris tertunda juga harus tercatat waktu aksesnya
+        self._flush_touched()
+        key = "key" if self.zobrist else "fen"
+        stt = f"""
+            DELETE FROM board WHERE {key} IN (
+                SELECT {key} FROM board ORDER BY epoch, depth LIMIT :limit
+            )
+            RETURNING fen
+        """
+
+        total = 0
+        while (excess := self._excess()) > 0:
+            with self._write_lock, self.sql as conn:
+                conn.execute("BEGIN")
+                rows = conn.execute(stt, {"limit": min(excess, EVICT_BATCH)}).fetchall()
+            if not rows:
+                break
+            self._cache.invalidate(row["fen"] for row in rows)
+            total += len(rows)
+
+        if total:
+            logger_db.info("Eviksi selesai", extra={"rows": total})
+        return total
+
+    def _evict_loop(self, interval: float) -> None:
+        while not self._evictor_stop.wait(interval):
+            try:
+                self.evict()
+            except sqlite3.Error:
+                logger_db.exception("Eviksi gagal")
+
+    def refresh_quiz(
+        self,
+        depth: int = QUIZ_DEPTH,
+        limit: int = QUIZ_SAMPLE,
+        chunk: int = QUIZ_CHUNK,
+    ) -> int:
+        """Membangun ulang sampel kuis untuk posisi-posisi dengan depth `depth`.
+
+        Tabel quiz menyimpan salinan (depth, score, fen) yang diberi nomor urut
+        `rank` menurut (depth, score). Dengan begitu, posisi-posisi dalam satu
+        rentang score menempati rentang `rank` yang bersambung, dan `sample`
+        cukup memilih satu bilangan acak tanpa memindai seluruh rentang.
+
+        Posisi dibaca per `chunk` baris menurut urutan ix_covering, tanpa kunci
+        tulis, dan hanya setiap posisi ke-k (dengan awal acak) yang diambil
+        sehingga sampel berisi paling banyak `limit` posisi. Sampel lama diganti
+        dalam satu transaksi pendek. Menghasilkan banyak posisi di sampel.
+        """
+
+        self.flush()
+        conn = self.reader()
+        total = conn.execute(
+            "SELECT rows FROM depth_stats WHERE depth = ?", (depth,)
+        ).fetchone()
+        stride = max(1, -(-(total["rows"] if total else 0) // limit))
+
+        # urutan (score, kunci) di ix_covering; kunci mengurutkan score yang sama
+        key = "key" if self.zobrist else "fen"
+        stt = f"""
+            SELECT score, {key} AS key, fen FROM board
+            WHERE depth = :depth AND (score, {key}) > (:score, :key)
+            ORDER BY score, {key} LIMIT :chunk
+        """
+        params = {"depth": depth, "score": -(2**63), "key": 0, "chunk": chunk}
+        rows: list[tuple[int, int, bytes]] = []
+        skip = randint(0, stride - 1)
+        while True:
+            found = conn.execute(stt, params).fetchall()
+            for row in found:
+                if skip == 0 and len(rows) < limit:
+                    rows.append((depth, row["score"], row["fen"]))
+                    skip = stride
+                skip -= 1
+            if len(found) < chunk:
+                break
+            params.update(score=found[-1]["score"], key=found[-1]["key"])
+
+        with self._write_lock, self.sql as conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM quiz WHERE depth = ?", (depth,))
+            conn.executemany(
+                "INSERT INTO quiz (depth, score, fen) VALUES (?, ?, ?)", rows
+            )
+        logger_db.info("Sampel kuis diperbarui", extra={"rows": len(rows)})
+        return len(rows)
+
+    def sample(
+        self, min_score: int, max_score: int, depth: int = QUIZ_DEPTH
+    ) -> str | None:
+        """Memilih satu posisi acak dari sampel kuis secara seragam.
+
+        Posisi dipilih dari posisi dengan depth `depth` dan score di antara
+        `min_score` dan `max_score` (inklusif), menurut isi tabel quiz saat
+        `refresh_quiz` terakhir dijalankan. Menghasilkan None jika tidak ada.
+        """
+
+        conn = self.reader()
+        params = {"depth": depth, "min": min_score, "max": max_score}
+        lo = conn.execute(
+            """
+            SELECT rank FROM quiz WHERE depth = :depth AND score >= :min
+            ORDER BY score, rank LIMIT 1
+            """,
+            params,
+        ).fetchone()
+        hi = conn.execute(
+            """
+            SELECT rank FROM quiz WHERE depth = :depth AND score <= :max
+            ORDER BY score DESC, rank DESC LIMIT 1
+            """,
+            params,
+        ).fetchone()
+        if not lo or not hi or lo["rank"] > hi["rank"]:
+            return None
+
+        rank = randint(lo["rank"], hi["rank"])
+        row = conn.execute("SELECT fen FROM quiz WHERE rank = ?", (rank,)).fetchone()
+        return decode_fen(row["fen"])
+
+    def _maintenance_loop(self, interval: float) -> None:
+        conn = self._connect()
+        wal = f"{self._file}-wal"
+        checkpointed_at = restarted_at = optimized_at = monotonic()
+        try:
+            while not self._maintenance_stop.wait(interval):
+                try:
+                    now = monotonic()
+                    idle = now - self._written_at >= self.idle_seconds
+                    if idle and self._written_at > restarted_at:
+                        with self._timings.measure("checkpoint_restart"):
+                            conn.execute("PRAGMA wal_checkpoint(RESTART)")
+                        checkpointed_at = restarted_at = now
+                        self._incremental_vacuum(conn)
+                    elif (
+                        self._written_at > checkpointed_at
+                        and exists(wal)
+                        and getsize(wal) >= self.checkpoint_bytes
+                    ):
+                        with self._timings.measure("checkpoint_passive"):
+                            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                        checkpointed_at = now
+
+                    if now - optimized_at >= self.optimize_interval:
+                        with self._timings.measure("optimize"):
+                            conn.execute("PRAGMA optimize")
+                        optimized_at = now
+                except (sqlite3.Error, OSError):
+                    logger_db.exception("Pemeliharaan database gagal")
+        finally:
+            conn.close()
+
+    def _incremental_vacuum(self, conn: sqlite3.Connection) -> None:
+        # hanya berlaku untuk database yang dibuat dengan auto_vacuum incremental
+        if conn.execute("PRAGMA auto_vacuum").fetchone()["auto_vacuum"] != 2:
+            return
+        if not conn.execute("PRAGMA freelist_count").fetchone()["freelist_count"]:
+            return
+        with self._timings.measure("incremental_vacuum"):
+            conn.execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})").fetchall()
+
+    def _add_depth_stats(self, rebuild: bool = False) -> None:
+        # tabel depth_stats diisi sekali dari ix_covering, lalu dijaga oleh trigger
+        with self._write_lock, self.sql as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='depth_stats'"
+            )
+            rebuild = rebuild or cur.fetchone() is None
+            for stt in _DEPTH_STATS:
+                conn.execute(stt)
+            if rebuild:
+                conn.execute("DELETE FROM depth_stats")
+                conn.execute(
+                    """
+                    INSERT INTO depth_stats (depth, rows)
+                    SELECT depth, COUNT(*) FROM board GROUP BY depth
+                    """
+                )
+
+    def stats(self) -> dict[str, Any]:
+        """Statistik penyimpanan dan efektivitas singgahan.
+
+        Semua angka dicatat bertahap (banyak baris per depth oleh trigger di
+        tabel board, sisanya di memori sejak database dibuka), sehingga fungsi
+        ini cukup murah untuk dipanggil berkala. Isinya:
+
+        - `rows` dan `depths`: banyak baris board, total dan per depth.
+        - `files`: ukuran berkas database dan WAL (byte).
+        - `select`: hit dan miss singgahan `select` per jenis panggilan,
+          dengan kunci `"<best|all>/<max_depth>"`.
+        - `upsert`: banyak panggilan, banyak ply di PV, dan banyak baris yang
+          ditulis atau dilewati karena sudah ada analisa yang lebih dalam.
+          Pada mode write-behind baris dihitung saat `flush` menulisnya.
+        - `timings`: durasi pencarian (`lookup`), penulisan, dan pemeliharaan.
+        - `cache` dan `bloom`: lihat `cache_info` dan `bloom_info`.
+        """
+
+        cur = self.reader().execute(
+            "SELECT depth, rows FROM depth_stats WHERE rows > 0 ORDER BY depth"
+        )
+        depths = {row["depth"]: row["rows"] for row in cur.fetchall()}
+
+        files = {"database": 0, "wal": 0}
+        if not self._is_memory:
+            for name, path in (("database", self._file), ("wal", f"{self._file}-wal")):
+                files[name] = getsize(path) if exists(path) else 0
+
+        with self._cache._lock:
+            kinds = {
+                f"{'best' if only_best else 'all'}/{max_depth}": {
+                    "hits": hits,
+                    "misses": misses,
+                }
+                for (only_best, max_depth), (hits, misses) in self._cache.kinds.items()
+            }
+
+        upsert = self._upsert_stats.copy()
+        upsert["skipped"] = max(0, upsert["plies"] - upsert["written"])
+
+        return {
+            "rows": sum(depths.values()),
+            "depths": depths,
+            "files": files,
+            "select": kinds,
+            "upsert": upsert,
+            "timings": self._timings.summary(),
+            "cache": self.cache_info(),
+            "bloom": self.bloom_info(),
+        }
+
+    def maintenance_info(self) -> dict[str, dict[str, float]]:
+        """Statistik durasi penulisan dan pekerjaan pemeliharaan (detik).
+
+        Kunci hasilnya adalah jenis pekerjaan, misalnya `write` (termasuk waktu
+        menunggu kunci tulis), `checkpoint_passive`, `checkpoint_restart`,
+        `optimize`, dan `incremental_vacuum`.
+        """
+
+        return self._timings.summary()
 
     def reset_db(self) -> None:
         "Hapus seisi tabel board"
@@ -596,13 +1967,85 @@ class Database:
             # too dangerous
             raise RuntimeError
 
-        with self.sql as conn:
+        with self._pending_lock:
+            self._pending.clear()
+        self._cache.clear()
+        with self._write_lock, self.sql as conn:
             logger_db.info("Menghapus konten board")
             conn.execute("DELETE FROM board")
+            conn.execute("DELETE FROM quiz")
             conn.execute("VACUUM")
             logger_db.info("Hapus selesai")
+        if self._bloom is not None:
+            self._build_bloom(0)
+
+    def migrate_zobrist(self) -> None:
+        """Mengubah tabel board ke mode Zobrist, di tempat.
+
+        Seluruh isi tabel disalin ke tabel baru berkunci `zobrist_hash(fen)`
+        dalam satu transaksi, lalu tabel lama dihapus. Jika ada tabrakan hash,
+        hanya satu posisi yang dipertahankan. Jalankan VACUUM setelahnya untuk
+        mengembalikan ruang kosong ke sistem berkas.
+        """
+
+        if self.zobrist:
+            return
+
+        self.flush()
+        with self._write_lock, self.sql as conn:
+            logger_db.info("Memigrasi tabel board ke mode Zobrist")
+            conn.execute("BEGIN")
+            conn.execute(_BOARD_ZOBRIST.replace("board(", "board_zobrist(", 1))
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO board_zobrist (key, fen, depth, score, move)
+                SELECT zobrist(fen), fen, depth, score, move FROM board
+                """
+            )
+            total = conn.execute("SELECT COUNT(*) AS n FROM board").fetchone()["n"]
+            kept = conn.execute("SELECT COUNT(*) AS n FROM board_zobrist").fetchone()
+            conn.execute("DROP TABLE board")
+            conn.execute("ALTER TABLE board_zobrist RENAME TO board")
+            conn.execute("CREATE INDEX ix_covering ON board (depth, score)")
+            logger_db.info(
+                "Migrasi selesai",
+                extra={"rows": total, "collisions": total - kept["n"]},
+            )
+
+        self._set_zobrist(True)
+        self._cache.clear()  # posisi yang bertabrakan hilang
+        self._add_depth_stats(rebuild=True)  # trigger ikut terhapus bersama tabel
+        if self._evictor is not None:
+            self._add_epoch()  # waktu akses tidak ikut dimigrasi
+
+    def migrate_incremental_vacuum(self) -> None:
+        """Mengubah database ke mode auto_vacuum incremental, di tempat.
+
+        Mode auto_vacuum database yang sudah berisi tabel hanya dapat diubah
+        dengan VACUUM, yang menyalin ulang seluruh database dan menahan semua
+        penulisan selama berjalan. Jalankan sekali, ketika database tidak
+        sedang dipakai. Setelahnya, pemeliharaan (lihat argumen `maintenance`)
+        dapat mengembalikan halaman kosong ke sistem berkas.
+        """
 
-    def normalize_old_data(self, cutoff_score: int, new_score: int) -> None:
+        if self.sql.execute("PRAGMA auto_vacuum").fetchone()["auto_vacuum"] == 2:
+            return
+
+        self.flush()
+        with self._write_lock:
+            logger_db.info("Mengubah database ke mode auto_vacuum incremental")
+            self.sql.execute("PRAGMA auto_vacuum = incremental")
+            self.sql.execute("VACUUM")
+            logger_db.info("Migrasi selesai")
+
+    def normalize_old_data(
+        self,
+        cutoff_score: int,
+        new_score: int,
+        chunk: int = NORMALIZE_CHUNK,
+        pause: float = 0.0,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> int:
         """
         Mengubah depth semua analisa yang bernilai lebih dari cutoff_score
         menjadi new_score.
@@ -611,17 +2054,64 @@ class Database:
         beberapa versi mesin yang dianggap lawas, atau setelah memperbarui versi
         mesin catur. Proses ini memungkinkan untuk memperbarui analisa yang
         'usang' tetapi sulit untuk diperbarui karena nilai depth yang besar.
+
+        Baris diubah dalam potongan-potongan sebanyak `chunk`, masing-masing
+        dalam satu transaksi pendek, dengan berjalan di indeks ix_covering dari
+        depth terkecil yang melebihi cutoff_score. Baris yang sudah diubah
+        tidak lagi memenuhi syarat, sehingga proses yang terhenti dapat diulang
+        dengan argumen yang sama dan dilanjutkan dari sisa baris. Di akhir,
+        WAL di-checkpoint agar berkasnya tidak terus membesar. Menghasilkan
+        banyak baris yang diubah.
+
+        Args:
+            cutoff_score: Batas depth analisa yang dianggap lawas.
+            new_score: Depth baru untuk analisa lawas.
+            chunk: Banyak baris per transaksi; membatasi lama kunci tulis.
+            pause: Jeda (detik) antar transaksi, memberi kesempatan penulis lain.
+            progress: Dipanggil setelah setiap transaksi dengan banyak baris yang
+                sudah diubah dan banyak seluruh baris yang perlu diubah.
         """
 
         if cutoff_score < 10 or new_score < 10 or new_score > cutoff_score:
             # sanity check
             raise ValueError
 
-        stt = "UPDATE board SET depth = :new_score WHERE depth > :cutoff_score"
-        with self.sql as conn:
-            logger_db.info("Menormalisasi data lawas")
-            conn.execute(stt, {"new_score": new_score, "cutoff_score": cutoff_score})
-            logger_db.info("Normalisasi selesai")
+        key = "key" if self.zobrist else "fen"
+        stt = f"""
+            UPDATE board SET depth = :new_score WHERE {key} IN (
+                SELECT {key} FROM board WHERE depth > :cutoff_score
+                ORDER BY depth, score LIMIT :chunk
+            )
+            RETURNING fen
+        """
+        params = {"new_score": new_score, "cutoff_score": cutoff_score, "chunk": chunk}
+        self.flush()
+
+        total = self.sql.execute(
+            "SELECT COUNT(*) AS n FROM board WHERE depth > :cutoff_score", params
+        ).fetchone()["n"]
+        logger_db.info("Menormalisasi data lawas", extra={"total": total})
+
+        done = 0
+        while True:
+            with self._write_lock, self.sql as conn:
+                conn.execute("BEGIN")
+                rows = conn.execute(stt, params).fetchall()
+            if not rows:
+                break
+            self._cache.invalidate(row["fen"] for row in rows)
+
+            done += len(rows)
+            logger_db.info("Menormalisasi data lawas", extra={"rows": done})
+            if progress is not None:
+                progress(done, total)
+            # lepaskan kunci tulis sebelum potongan berikutnya
+            sleep(pause)
+
+        with self._write_lock:
+            self.sql.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        logger_db.info("Normalisasi selesai", extra={"rows": done})
+        return done
 
 
 class Engine:
@@ -646,7 +2136,10 @@ class Engine:
             engine_path: Alamat dari mesin catur.
             database_path: Alamat dari berkas database SQLite.
             debug: Opsi untuk menampilkan I/O ke/dari mesin catur
-            **kwargs: Argumen tambahan untuk Database
+            **kwargs: Argumen tambahan untuk Database, misalnya
+                `write_behind=WRITE_BEHIND` untuk menampung hasil analisa
+                sebelum ditulis, atau `maintenance=MAINTENANCE` untuk
+                menjalankan thread pemeliharaan.
         """
 
         # set mesin catur
@@ -735,10 +2228,18 @@ class Engine:
         # self._std_write("stop\n")
         self._stop.set()
         self._thread.join(timeout=1)
+        self.db.flush()  # hasil analisa yang terpotong
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Menunggu sampai heap antrian analisa kosong.
 
-    def wait(self) -> None:
-        "Menunggu sampai heap antrian analisa kosong."
-        self.heap.join()
+        Menghasilkan False jika heap belum kosong setelah `timeout` detik.
+        """
+        heap = self.heap
+        with heap.all_tasks_done:
+            return heap.all_tasks_done.wait_for(
+                lambda: not heap.unfinished_tasks, timeout
+            )
 
     def put(self, fen: str, depth: int, config: Config = {}, priority: int = 0) -> None:
         """
@@ -757,6 +2258,61 @@ class Engine:
         item = (-priority, fen, depth, config)
         self.heap.put(item, block=False)
 
+    def put_many(
+        self,
+        fens: Iterable[str],
+        depth: int,
+        config: Config = {},
+        priority: int = 0,
+        batch: int = ADMIT_BATCH,
+    ) -> int:
+        """
+        Menambah banyak posisi catur ke dalam antrian analisa.
+
+        Posisi diperiksa ke database per `batch` posisi sebelum dimasukkan ke
+        antrian. Posisi yang analisanya sudah cukup (aturannya sama dengan
+        pemeriksaan sebelum analisa dimulai) tidak dimasukkan, sehingga antrian
+        tidak dipenuhi posisi yang sudah disinggah. FEN yang tidak valid juga
+        dilewati, tanpa menghentikan posisi lainnya. Menghasilkan banyak posisi
+        yang dilewati, termasuk yang tidak valid.
+
+        Args:
+            fens: Posisi-posisi catur dalam notasi FEN.
+            depth: Nilai `depth` yang ingin dicari.
+            config: Dict berisi UCI setoptions, seperti pada `put`.
+            priority: Tingkat prioritas analisa dalam antrian.
+            batch: Banyak posisi yang diperiksa sekaligus.
+        """
+        assert depth > 0
+
+        queued, skipped, invalid = 0, 0, 0
+        for chunk in batched(fens, batch):
+            valid = []
+            for fen in chunk:
+                try:
+                    valid.append((fen, Position(fen).encode()))
+                except ValueError:
+                    invalid += 1
+            if config.get("MultiPV", 1) > 1:
+                # hanya analisa terbaik yang diperiksa; lihat `_process`
+                rows = {}
+            else:
+                rows = self.db._lookup(list(dict.fromkeys(efen for _, efen in valid)))
+
+            for fen, efen in valid:
+                row = rows.get(efen)
+                if row is not None and row["depth"] >= depth:
+                    skipped += 1
+                else:
+                    self.put(fen, depth, config, priority)
+                    queued += 1
+
+        logger_engine.info(
+            "positions queued",
+            extra={"queued": queued, "skipped": skipped, "invalid": invalid},
+        )
+        return skipped + invalid
+
     def _process(self) -> None:
         "Menganalisa posisi catur dalam antrian"
 
@@ -815,6 +2371,8 @@ class Engine:
                     )
                     self.db.upsert(fen, info)
 
+                # analisa selesai; tulis semua hasil yang masih tertunda
+                self.db.flush()
                 self.heap.task_done()
 
         except BrokenPipeError:
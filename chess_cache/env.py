@@ -56,3 +56,4 @@ ENGINE_IMPORT_CONFIG = env.get("ENGINE_IMPORT_CONFIG", ENGINE_MAIN_CONFIG)
 ANALYSIS_DEPTH = env.get("MAXIMAL_DEPTH", 35)
 MINIMAL_DEPTH = env.get("MINIMAL_DEPTH", 20)
 IMPORTER_PGN_DEPTH = env.get("IMPORTER_PGN_DEPTH", 50)
+QUIZ_REFRESH = env.get("QUIZ_REFRESH", 600)  # detik
@@ -1,60 +1,796 @@
-from io import StringIO
+import bz2
+import csv
+import gzip
+import re
+import sqlite3
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from io import SEEK_CUR, SEEK_SET, BufferedReader, TextIOWrapper
+from itertools import batched
 from json import loads
-
-from chess.pgn import read_game
-
-from .core import MATE_SCORE, STARTING_FEN, Database, Engine
+from multiprocessing import get_context
+from os import PathLike, cpu_count, getpid, kill
+from os.path import abspath
+from threading import Event
+from time import monotonic, time
+from typing import IO, Any, TextIO, TypeVar
+
+from .core import (
+    MATE_SCORE,
+    STARTING_FEN,
+    UCI_TO_NUM,
+    Database,
+    Engine,
+    zobrist_hash,
+)
 from .logger import get_logger
+from .position import BLACK, Position
 
 logger = get_logger("importer")
 
+DUMP_BATCH = 10_000  # banyak baris JSON dump per pekerjaan worker
+CSV_BATCH = 50_000  # banyak baris CSV per pekerjaan worker
+STAGING_ROWS = 2_000_000  # banyak baris tabel staging sebelum digabung ke board
+
+# PRAGMA selama `load_csv`; nilai semula dikembalikan setelahnya
+LOAD_PRAGMAS = {
+    "cache_size": -(2**20),  # 1 GiB cache halaman untuk B-tree board
+    "wal_autocheckpoint": 0,  # checkpoint sekali di akhir pemuatan
+}
+PGN_CHUNK = 2**20  # perkiraan ukuran potongan PGN (byte) per pekerjaan worker
+PGN_SEEN = 2**18  # banyak FEN terakhir yang diingat untuk menyaring duplikat
+
+# token PGN: komentar, awal/akhir variasi, NAG, atau langkah (mungkin diawali
+# nomor langkah, misalnya `1.e4`)
+PGN_TOKEN = re.compile(r"\{[^}]*\}|;[^\n]*|[()]|\$\d+|[^\s(){};]+")
+PGN_HEADER = re.compile(r'\[(\w+)\s+"(.*)"\]')
+PGN_TAG = re.compile(rb'\[\w+\s+"')  # awal baris tag pair, bukan `[%clk ...]`
+PGN_MOVE_NUMBER = re.compile(r"^\d+\.*")
+PGN_RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+
+K = TypeVar("K")
+R = TypeVar("R")
+
+# byte awal berkas terkompresi
+GZIP_MAGIC = b"\x1f\x8b"
+BZIP2_MAGIC = b"BZh"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_WINDOW = 2**31  # dump Lichess dikompresi dengan `zstd --long`
+
+
+@contextmanager
+def _open_binary(
+    source: str | PathLike[str] | IO[bytes], offset: int = 0
+) -> Iterator[IO[bytes]]:
+    # lihat `open_stream`; menghasilkan berkas biner yang sudah didekompresi,
+    # mulai dari byte ke-`offset` (setelah dekompresi)
+    with ExitStack() as stack:
+        if isinstance(source, (str, PathLike)):
+            raw: IO[bytes] = stack.enter_context(open(source, "rb"))
+        else:
+            raw = source
+        magic = raw.read(4)
+        raw.seek(-len(magic), 1)
+
+        stream: IO[bytes]
+        if magic.startswith(GZIP_MAGIC):
+            stream = stack.enter_context(gzip.GzipFile(fileobj=raw))
+        elif magic.startswith(BZIP2_MAGIC):
+            stream = stack.enter_context(bz2.BZ2File(raw))
+        elif magic.startswith(ZSTD_MAGIC):
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("Dekompresi zstd membutuhkan paket zstandard")
+            decompressor = zstandard.ZstdDecompressor(max_window_size=ZSTD_WINDOW)
+            reader = decompressor.stream_reader(raw, closefd=False)
+            if offset:
+                reader.seek(offset)  # hanya maju, dengan membaca sampai offset
+                offset = 0
+            # stream_reader tidak mendukung readline
+            stream = stack.enter_context(BufferedReader(reader))
+        else:
+            stream = raw
+        if offset:
+            # berkas terkompresi dibaca (dan dibuang) sampai offset
+            stream.seek(offset, SEEK_CUR if stream is raw else SEEK_SET)
+        yield stream
+
+
+@contextmanager
+def open_stream(source: str | PathLike[str] | IO[bytes]) -> Iterator[TextIO]:
+    """Membuka berkas teks, yang mungkin terkompresi, untuk dibaca bertahap.
+
+    Kompresi zstd, bzip2, atau gzip dikenali dari byte awal berkas, lalu
+    berkas didekompresi sedikit demi sedikit selama dibaca, tanpa berkas
+    sementara. Dekompresi zstd membutuhkan paket `zstandard`.
+
+    Args:
+        source: Alamat berkas, atau berkas biner yang dapat di-seek (misalnya
+            berkas unggahan); berkas biner milik pemanggil tidak ditutup.
+    """
 
-def extract_fens(pgn: str, max_depth: int) -> list[str]:
+    with _open_binary(source) as stream:
+        text = TextIOWrapper(stream, encoding="utf-8")  # type: ignore[arg-type]
+        try:
+            yield text
+        finally:
+            # stream di bawahnya ditutup oleh `_open_binary`, atau milik pemanggil
+            text.detach()
+
+
+def _split_games(lines: Iterable[str]) -> Iterator[tuple[dict[str, str], str]]:
+    # memecah teks PGN menjadi (header, movetext) per permainan
+    headers: dict[str, str] = {}
+    movetext: list[str] = []
+    for line in lines:
+        # baris movetext yang terpotong bisa diawali `[`, misalnya `[%clk ...]`
+        if match := PGN_HEADER.match(line):
+            if movetext:
+                yield headers, " ".join(movetext)
+                headers, movetext = {}, []
+            headers[match[1]] = match[2]
+        elif line.strip():
+            movetext.append(line)
+    if headers or movetext:
+        yield headers, " ".join(movetext)
+
+
+def _mainline_epds(headers: dict[str, str], movetext: str, max_depth: int) -> list[str]:
+    # EPD sepanjang jalur utama sampai max_depth ply; kosong jika tidak memenuhi
+    # syarat. Komentar, NAG, dan variasi dilewati tanpa membuat pohon GameNode.
+
+    # hanya sertakan varian standar yang dimulai dari posisi awal
+    if headers.get("Variant") not in ["Rapid", "Standard"]:
+        return []
+    if headers.get("FEN", STARTING_FEN) != STARTING_FEN:
+        return []
+
+    board = Position()
+    epds: list[str] = []
+    variation = 0
+    for token in PGN_TOKEN.findall(movetext):
+        if len(epds) >= max_depth:
+            break
+        if token == "(":
+            variation += 1
+        elif token == ")":
+            variation -= 1
+        elif variation or token[0] in "{;$" or token in PGN_RESULTS:
+            continue
+        elif san := PGN_MOVE_NUMBER.sub("", token):
+            try:
+                # pastikan semua move valid dari sudut
+                # pandang permainan varian standar
+                board.push_san(san)
+            except ValueError:
+                return []
+            epds.append(board.epd())
+    return epds
+
+
+def extract_fens(pgn: str | TextIO, max_depth: int) -> list[str]:
     """
     Mencatat semua FEN unik sampai kedalaman max_depth di teks PGN
 
+    Untuk berkas besar, gunakan `iter_fens` yang memakai memori terbatas dan
+    banyak proses.
+
     Args:
-        pgn: Teks PGN.
+        pgn: Teks PGN, atau berkas teks PGN (misalnya dari `open_stream`).
         max_depth: kedalaman maksimum proses ekstraksi.
     """
 
-    _pgn = StringIO(pgn)
-    boards = []
-    while True:
-        game = read_game(_pgn)
-        if game is None:
-            break
+    lines = pgn.splitlines() if isinstance(pgn, str) else pgn
+    fens: dict[str, None] = {}
+    for headers, movetext in _split_games(lines):
+        for epd in reversed(_mainline_epds(headers, movetext, max_depth)):
+            fens.setdefault(epd)
+    return list(fens)
+
+
+def parse_pgn_chunk(data: bytes, max_depth: int) -> list[str]:
+    """Mengubah potongan teks PGN menjadi daftar FEN unik di potongan itu.
+
+    Potongan harus dimulai dan diakhiri di batas permainan (lihat
+    `_pgn_chunks`). Urutannya sama dengan `extract_fens`. Dijalankan oleh
+    proses worker.
+
+    Args:
+        data: Potongan teks PGN dalam UTF-8.
+        max_depth: kedalaman maksimum proses ekstraksi.
+    """
+
+    return extract_fens(data.decode("utf-8"), max_depth)
+
+
+def _pgn_chunks(
+    stream: IO[bytes], size: int, offset: int = 0
+) -> Iterator[tuple[int, bytes]]:
+    # potongan sekitar `size` byte yang selalu dipotong di awal permainan,
+    # bersama offset akhirnya (offset awal permainan berikutnya)
+    chunk: list[bytes] = []
+    length, in_movetext = 0, False
+    for line in stream:
+        if PGN_TAG.match(line):
+            if in_movetext and length >= size:
+                offset += length
+                yield offset, b"".join(chunk)
+                chunk, length = [], 0
+            in_movetext = False
+        elif line.strip():
+            in_movetext = True
+        chunk.append(line)
+        length += len(line)
+    if chunk:
+        yield offset + length, b"".join(chunk)
+
+
+class _RecentSet:
+    """Himpunan `capacity` kunci yang terakhir dilihat.
+
+    Kunci terlama dilupakan saat penuh, sehingga memori yang dipakai terbatas;
+    kunci yang sudah dilupakan dianggap baru lagi.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._keys: OrderedDict[int, None] = OrderedDict()
+
+    def add(self, key: str) -> bool:
+        "Menambah `key`; True jika `key` belum ada."
+        _key = hash(key)
+        if _key in self._keys:
+            self._keys.move_to_end(_key)
+            return False
+        self._keys[_key] = None
+        if len(self._keys) > self.capacity:
+            self._keys.popitem(last=False)
+        return True
+
+
+def _imap(
+    func: Callable[..., R],
+    items: Iterable[tuple[K, Any]],
+    workers: int | None,
+    *args: Any,
+) -> Iterator[tuple[K, R]]:
+    # untuk setiap (tag, item), menjalankan func(item, *args) di proses worker
+    # dan menghasilkan (tag, hasil) berurutan; paling banyak `2 * workers` item
+    # diproses bersamaan, sehingga memori tidak bergantung pada banyaknya item
+    if workers == 0:
+        for tag, item in items:
+            yield tag, func(item, *args)
+        return
+
+    workers = workers or cpu_count() or 1
+    # fork dari proses multi-thread (misalnya server web) dapat deadlock
+    with ProcessPoolExecutor(workers, get_context("forkserver")) as pool:
+        pending: deque[tuple[K, Future[R]]] = deque()
+        for tag, item in items:
+            pending.append((tag, pool.submit(func, item, *args)))
+            if len(pending) >= 2 * workers:
+                tag, future = pending.popleft()
+                yield tag, future.result()
+        while pending:
+            tag, future = pending.popleft()
+            yield tag, future.result()
+
+
+def iter_fen_chunks(
+    source: str | PathLike[str] | IO[bytes],
+    max_depth: int,
+    workers: int | None = None,
+    chunk: int = PGN_CHUNK,
+    seen: int = PGN_SEEN,
+    offset: int = 0,
+) -> Iterator[tuple[int, list[str]]]:
+    """Seperti `iter_fens`, tetapi per potongan berkas.
+
+    Menghasilkan `(offset, fens)`: FEN unik baru di suatu potongan, dan offset
+    byte (di teks yang sudah didekompresi) tempat potongan berikutnya dimulai.
+    Offset ini dapat dipakai untuk melanjutkan pembacaan dari batas permainan.
+
+    Args:
+        offset: Offset byte awal pembacaan; harus di batas permainan.
+        lainnya: Lihat `iter_fens`.
+    """
+
+    recent = _RecentSet(seen)
+    with _open_binary(source, offset) as stream:
+        chunks = _pgn_chunks(stream, chunk, offset)
+        for end, fens in _imap(parse_pgn_chunk, chunks, workers, max_depth):
+            yield end, [fen for fen in fens if recent.add(fen)]
+
+
+def iter_fens(
+    source: str | PathLike[str] | IO[bytes],
+    max_depth: int,
+    workers: int | None = None,
+    chunk: int = PGN_CHUNK,
+    seen: int = PGN_SEEN,
+) -> Iterator[str]:
+    """Menghasilkan FEN unik sampai kedalaman max_depth dari berkas PGN.
+
+    Berkas, yang boleh terkompresi (lihat `open_stream`), dibaca bertahap dan
+    dipotong di batas permainan menjadi potongan sekitar `chunk` byte. Setiap
+    potongan diurai oleh proses worker (`parse_pgn_chunk`) hanya sepanjang
+    jalur utamanya. FEN dihasilkan segera setelah potongannya selesai diurai,
+    sehingga memori yang dipakai tidak bergantung pada ukuran berkas.
+
+    Duplikat disaring dengan `seen` FEN yang terakhir dihasilkan; FEN yang
+    sudah lama tidak muncul dapat dihasilkan lagi.
+
+    Args:
+        source: Alamat berkas PGN, atau berkas biner yang dapat di-seek.
+        max_depth: kedalaman maksimum proses ekstraksi.
+        workers: Banyak proses worker; None untuk banyak CPU, 0 untuk mengurai
+            di proses utama.
+        chunk: Perkiraan ukuran potongan (byte) per pekerjaan worker.
+        seen: Banyak FEN terakhir yang diingat untuk menyaring duplikat.
+    """
+
+    for _, fens in iter_fen_chunks(source, max_depth, workers, chunk, seen):
+        yield from fens
+
+
+def _score(pv: dict[str, Any]) -> int:
+    # score dump Lichess: centipawn, atau mate dalam n langkah
+    if "cp" in pv:
+        return pv["cp"]
+    value = pv["mate"]
+    if value > 0:
+        return MATE_SCORE - value
+    return -MATE_SCORE - value
+
+
+def parse_dump_lines(
+    lines: Sequence[str | bytes],
+    minimal_depth: int = 1,
+    maximum_depth: int = 100,
+) -> list[tuple[bytes, int, int, int | None]]:
+    """Mengubah baris-baris JSON dump Lichess menjadi baris-baris board.
+
+    Setiap PV dipecah menjadi (posisi terenkode, depth, score, move) di
+    sepanjang PV; depth berkurang satu per ply, dan ply pertama dari PV selain
+    PV terbaik dilewati. Berbeda dengan `Database.upsert`, PV tidak berhenti di
+    ply pertama yang kalah dalam dari baris yang sudah ada: untuk setiap
+    posisi, baris terdalam dari semua PV dipertahankan, sehingga hasilnya tidak
+    bergantung pada urutan baris dump. Pada depth yang sama, ply pertama dari PV
+    terbaik yang didahulukan. Depth yang lebih dari `maximum_depth` diubah
+    menjadi `maximum_depth - 2` sebelum dibandingkan. Dijalankan oleh proses
+    worker.
+
+    Args:
+        lines: Baris-baris JSON dump Lichess.
+        minimal_depth: Nilai depth minimal agar analisa dapat disinggah.
+        maximum_depth: Depth maksimum yang dianggap masih mutakhir.
+    """
+
+    best: dict[bytes, tuple[int, bool, int, int | None]] = {}
+    for line in lines:
+        raw = loads(line)
+        for eval in raw["evals"]:
+            # urutkan untuk dapat multipv
+            pvs = sorted(eval["pvs"], key=_score, reverse=True)
+            for multipv, pv in enumerate(pvs, start=1):
+                plies = []
+                try:
+                    board = Position(raw["fen"])
+                    for uci in pv["line"].split(" "):
+                        plies.append((board.encode(), UCI_TO_NUM[uci]))
+                        board.push_uci(uci)
+                except (ValueError, KeyError):
+                    # bukan analisa posisi catur standar
+                    continue
+
+                depth, score = eval["depth"], _score(pv)
+                if multipv != 1:
+                    # jangan update multipv 1 di db dengan multipv!=1
+                    plies.pop(0)
+                    depth, score = depth - 1, -score
+
+                for num, (efen, move) in enumerate(plies):
+                    if depth < minimal_depth:
+                        break
+                    rank = (
+                        maximum_depth - 2 if depth > maximum_depth else depth,
+                        multipv == 1 and num == 0,
+                    )
+                    old = best.get(efen)
+                    if old is None or rank > old[:2]:
+                        best[efen] = (*rank, score, move)
+
+                    score *= -1  # ubah sudut pandang score
+                    depth -= 1  # kurangi depth
+
+    return [
+        (efen, depth, score, move) for efen, (depth, _, score, move) in best.items()
+    ]
+
+
+_JOBS = """CREATE TABLE IF NOT EXISTS import_job(
+                    id          INTEGER PRIMARY KEY,
+                    kind        TEXT    NOT NULL,   -- 'dump' atau 'pgn'
+                    source      TEXT    NOT NULL,
+                    byte_offset INTEGER NOT NULL,   -- teks yang sudah selesai diproses
+                    positions   INTEGER NOT NULL,   -- baris board atau posisi PGN
+                    status      TEXT    NOT NULL,   -- lihat JOB_STATUS
+                    updated     REAL    NOT NULL,
+                    pid         INTEGER             -- proses yang terakhir menjalankan
+                    )"""
+
+# running: sedang (atau terakhir) berjalan; stopping: diminta berhenti;
+# stopped: berhenti di suatu checkpoint; done: selesai
+JOB_STATUS = ("running", "stopping", "stopped", "done")
+
+
+def _create_jobs(conn: sqlite3.Connection) -> None:
+    # dipanggil di dalam `Database.transaction`; tabel lama belum punya kolom pid
+    conn.execute(_JOBS)
+    cur = conn.execute("SELECT name FROM pragma_table_info('import_job')")
+    if "pid" not in [row["name"] for row in cur.fetchall()]:
+        conn.execute("ALTER TABLE import_job ADD COLUMN pid INTEGER")
+
+
+def create_job(db: Database, kind: str, source: str | PathLike[str]) -> int:
+    """Mencatat pekerjaan impor baru di `db` dan menghasilkan id-nya.
+
+    Args:
+        db: Database tujuan impor, tempat tabel `import_job` disimpan.
+        kind: "dump" untuk `import_dump`, atau "pgn" untuk `queue_pgn`.
+        source: Alamat berkas sumber.
+    """
+
+    if kind not in ("dump", "pgn"):
+        raise ValueError(f"Jenis pekerjaan tidak dikenal: {kind}")
+    with db.transaction() as conn:
+        _create_jobs(conn)
+        cur = conn.execute(
+            """
+            INSERT INTO import_job (kind, source, byte_offset, positions, status, updated)
+            VALUES (?, ?, 0, 0, 'stopped', ?)
+            """,
+            (kind, abspath(source), time()),
+        )
+    assert cur.lastrowid is not None
+    return cur.lastrowid
+
+
+def list_jobs(db: Database) -> list[dict[str, Any]]:
+    "Semua pekerjaan impor yang tercatat di `db`."
+    with db.transaction() as conn:
+        _create_jobs(conn)
+    return db.sql.execute("SELECT * FROM import_job ORDER BY id").fetchall()
+
+
+def stop_job(db: Database, job: int) -> None:
+    """Meminta pekerjaan impor yang sedang berjalan untuk berhenti.
+
+    Pekerjaan berhenti di checkpoint berikutnya, sehingga dapat dilanjutkan
+    dengan memanggil `import_dump` atau `queue_pgn` lagi dengan `job` yang
+    sama. Dapat dipanggil dari proses lain.
+    """
+    with db.transaction() as conn:
+        _create_jobs(conn)
+        conn.execute(
+            "UPDATE import_job SET status = 'stopping' WHERE id = ? AND status = 'running'",
+            (job,),
+        )
+
+
+def _alive(pid: int | None) -> bool:
+    # apakah proses `pid` (di mesin ini) masih berjalan
+    if pid is None:
+        return False
+    try:
+        kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # proses milik pengguna lain
+    return True
+
+
+def _start_job(db: Database, job: int, kind: str) -> dict[str, Any]:
+    # Pekerjaan diklaim secara atomik: UPDATE hanya berhasil jika status dan
+    # pid masih sama dengan yang dibaca, sehingga dari beberapa proses yang
+    # melanjutkan pekerjaan yang sama hanya satu yang menjalankannya. Status
+    # running/stopping dari proses yang sudah mati (misalnya di-kill) boleh
+    # diambil alih.
+    with db.transaction() as conn:
+        _create_jobs(conn)
+        row = conn.execute("SELECT * FROM import_job WHERE id = ?", (job,)).fetchone()
+        if row is None or row["kind"] != kind:
+            raise ValueError(f"Pekerjaan {kind} tidak ditemukan: {job}")
+        if row["status"] != "done":
+            claimed = row["status"] == "stopped" or not _alive(row["pid"])
+            if claimed:
+                cur = conn.execute(
+                    """
+                    UPDATE import_job SET status = 'running', pid = ?, updated = ?
+                    WHERE id = ? AND status = ? AND pid IS ?
+                    """,
+                    (getpid(), time(), job, row["status"], row["pid"]),
+                )
+                claimed = cur.rowcount == 1
+            if not claimed:
+                raise RuntimeError(f"Pekerjaan {job} sedang dijalankan proses lain")
+    logger.info("Melanjutkan pekerjaan impor", extra=row)
+    return row
+
+
+def _checkpoint(db: Database, job: int, offset: int, positions: int) -> None:
+    # mencatat kemajuan pekerjaan; semua sebelum `offset` sudah selesai
+    with db.transaction() as conn:
+        conn.execute(
+            """
+            UPDATE import_job SET
+                byte_offset = ?, positions = positions + ?, updated = ?
+            WHERE id = ?
+            """,
+            (offset, positions, time(), job),
+        )
+
+
+def _stopping(db: Database, job: int | None, stop: Event | None) -> bool:
+    # apakah `stop` di-set, atau pekerjaan diminta berhenti lewat `stop_job`
+    if stop is not None and stop.is_set():
+        return True
+    if job is None:
+        return False
+    row = (
+        db.reader()
+        .execute("SELECT status FROM import_job WHERE id = ?", (job,))
+        .fetchone()
+    )
+    return row["status"] == "stopping"
+
+
+def _finish_job(db: Database, job: int, done: bool) -> None:
+    status = "done" if done else "stopped"
+    with db.transaction() as conn:
+        conn.execute(
+            "UPDATE import_job SET status = ?, updated = ? WHERE id = ? AND pid = ?",
+            (status, time(), job, getpid()),
+        )
+    logger.info("Pekerjaan impor berhenti", extra={"job": job, "status": status})
 
-        # hanya sertakan varian standar
-        if game.headers.get("Variant") not in ["Rapid", "Standard"]:
-            continue
-        board = game.board()
-        if game.board().fen() != STARTING_FEN:
-            continue
-        try:
-            # pastikan semua move valid dari sudut
-            # pandang permainan varian standar
-            for move in list(game.mainline_moves()):
-                board.push(move)
-        except:
-            continue
 
-        boards.append(board)
+def _dump_batches(
+    stream: IO[bytes], batch: int, offset: int = 0
+) -> Iterator[tuple[tuple[int, int], list[bytes]]]:
+    # potongan `batch` baris, bersama offset akhir dan banyak barisnya
+    for lines in batched(stream, batch):
+        offset += sum(map(len, lines))
+        yield (offset, len(lines)), list(lines)
 
-    fens, count_fen = {}, 0
-    for board in boards:
-        _over = len(board.move_stack) - max_depth
-        for _ in range(max(_over, 0)):
-            board.pop()
 
-        while board.move_stack:
-            epd = board.epd()
-            if epd not in fens:
-                count_fen += 1
-                fens[epd] = count_fen
-            board.pop()
+def import_dump(
+    filename: str | PathLike[str],
+    db: Database,
+    workers: int | None = None,
+    batch: int = DUMP_BATCH,
+    minimal_depth: int = 1,
+    maximum_depth: int = 100,
+    progress: Callable[[int, int], None] | None = None,
+    job: int | None = None,
+    stop: Event | None = None,
+) -> int:
+    """Mengimpor berkas JSON dump Lichess ke `db` secara bertahap.
+
+    Berkas, yang boleh terkompresi (lihat `open_stream`), dibaca per `batch`
+    baris. Setiap potongan diurai dan dienkode oleh
+    proses worker (`parse_dump_lines`), sedangkan proses utama menulis hasilnya
+    ke `db` dalam satu transaksi per potongan. Baris di `db` hanya ditimpa oleh
+    analisa yang lebih dalam. Aturan penyinggahannya tidak sama dengan
+    `Database.upsert` (lihat `parse_dump_lines`). Paling banyak `2 * workers` potongan diproses
+    bersamaan, sehingga memori yang dipakai tidak bergantung pada ukuran
+    berkas. Menghasilkan banyak baris board yang ditulis.
+
+    Jika `job` diberikan (lihat `create_job`), pembacaan dimulai dari offset
+    terakhir yang tercatat, dan offset dicatat setelah setiap potongan ditulis.
+    Impor berhenti di checkpoint jika `stop` di-set atau `stop_job` dipanggil;
+    memanggil fungsi ini lagi dengan `job` yang sama melanjutkannya.
+
+    Args:
+        filename: Alamat berkas dump, boleh terkompresi zstd, bzip2, atau gzip.
+        db: Database tujuan.
+        workers: Banyak proses worker; None untuk banyak CPU, 0 untuk mengurai
+            di proses utama.
+        batch: Banyak baris JSON per potongan.
+        minimal_depth: Nilai depth minimal agar analisa dapat disinggah.
+        maximum_depth: Depth maksimum yang dianggap masih mutakhir.
+        progress: Dipanggil setelah setiap potongan ditulis dengan banyak baris
+            JSON yang sudah dibaca dan banyak baris board yang sudah ditulis.
+        job: Id pekerjaan impor yang dilanjutkan dan dicatat kemajuannya.
+        stop: Jika di-set, impor berhenti setelah potongan yang sedang ditulis.
+    """
+
+    lines_done, rows_done, started = 0, 0, monotonic()
+
+    def write(lines: int, rows: list[tuple[bytes, int, int, int | None]]) -> None:
+        nonlocal lines_done, rows_done
+        if not db.zobrist:
+            rows.sort()  # tulis berurutan menurut PRIMARY KEY
+        db.write_rows(
+            (
+                (efen, {"depth": depth, "score": score, "move": move})
+                for efen, depth, score, move in rows
+            ),
+            deeper=True,
+        )
+
+        lines_done += lines
+        rows_done += len(rows)
+        elapsed = monotonic() - started
+        logger.info(
+            "Mengimpor dump",
+            extra={
+                "lines": lines_done,
+                "rows": rows_done,
+                "lines_per_second": round(lines_done / elapsed),
+                "rows_per_second": round(rows_done / elapsed),
+            },
+        )
+        if progress is not None:
+            progress(lines_done, rows_done)
+
+    db.flush()
+    offset = 0 if job is None else _start_job(db, job, "dump")["byte_offset"]
+    done = False
+    try:
+        with _open_binary(filename, offset) as f:
+            batches = _dump_batches(f, batch, offset)
+            for (offset, lines), rows in _imap(
+                parse_dump_lines, batches, workers, minimal_depth, maximum_depth
+            ):
+                write(lines, rows)
+                if job is not None:
+                    _checkpoint(db, job, offset, len(rows))
+                if _stopping(db, job, stop):
+                    break
+            else:
+                done = True
+    finally:
+        # juga saat gagal, agar pekerjaan dapat dilanjutkan
+        if job is not None:
+            _finish_job(db, job, done)
+    logger.info("Impor dump selesai", extra={"lines": lines_done, "rows": rows_done})
+    return rows_done
+
+
+def _csv_score(text: str) -> int:
+    # score CSV: centipawn (`+56`, `-10`) atau mate dalam n langkah (`#+3`, `#-2`)
+    text = text.strip().strip("\ufeff")
+    if text.startswith("#"):
+        return _score({"mate": int(text[1:])})
+    return _score({"cp": int(text)})
+
+
+def parse_csv_rows(
+    rows: Sequence[tuple[str, str]], white_pov: bool = True, zobrist: bool = False
+) -> list[tuple[Any, ...]]:
+    """Mengubah pasangan (FEN, evaluasi) dari CSV menjadi baris tabel staging.
+
+    Setiap baris berupa `(key, fen, score)` pada mode Zobrist, atau
+    `(fen, score)`; score dari sudut pandang pihak yang melangkah. Baris yang
+    tidak valid dilewati. Dijalankan oleh proses worker.
+
+    Args:
+        rows: Pasangan FEN dan evaluasi (lihat `_csv_score`).
+        white_pov: Evaluasi di CSV dari sudut pandang putih.
+        zobrist: Sertakan `zobrist_hash` posisi sebagai kolom pertama.
+    """
+
+    staged = []
+    for fen, evaluation in rows:
+        try:
+            board = Position(fen)
+            score = _csv_score(evaluation)
+        except ValueError:
+            continue
+        if white_pov and board.turn == BLACK:
+            score = -score
+        efen = board.encode()
+        if zobrist:
+            staged.append((zobrist_hash(efen), efen, score))
+        else:
+            staged.append((efen, score))
+    return staged
+
+
+def load_csv(
+    filename: str | PathLike[str],
+    db: Database,
+    depth: int,
+    fen_column: str = "FEN",
+    score_column: str = "Evaluation",
+    white_pov: bool = True,
+    workers: int | None = None,
+    batch: int = CSV_BATCH,
+    staging: int = STAGING_ROWS,
+    progress: Callable[[int, int], None] | None = None,
+) -> int:
+    """Memuat berkas CSV berisi FEN dan evaluasi ke `db` secara massal.
+
+    Format yang didukung seperti dataset Kaggle/ChessData di README: satu
+    kolom FEN dan satu kolom evaluasi (centipawn atau `#n`), tanpa PV. Setiap
+    `batch` baris dienkode oleh proses worker (`parse_csv_rows`) lalu
+    dimasukkan ke tabel sementara. Setiap `staging` baris, isi tabel sementara
+    digabungkan ke board dengan satu `INSERT ... SELECT` yang terurut menurut
+    PRIMARY KEY; baris board hanya ditimpa oleh depth yang lebih besar.
+    Selama pemuatan, cache halaman SQLite diperbesar dan checkpoint otomatis
+    WAL ditunda. Menghasilkan banyak baris CSV yang valid.
+
+    Args:
+        filename: Alamat berkas CSV, boleh terkompresi (lihat `open_stream`).
+        db: Database tujuan.
+        depth: Depth analisa di dataset, misalnya 22 untuk dataset Kaggle.
+        fen_column: Nama kolom FEN.
+        score_column: Nama kolom evaluasi.
+        white_pov: Evaluasi di CSV dari sudut pandang putih.
+        workers: Banyak proses worker; None untuk banyak CPU, 0 untuk mengenkode
+            di proses utama.
+        batch: Banyak baris CSV per pekerjaan worker.
+        staging: Banyak baris di tabel sementara sebelum digabungkan.
+        progress: Dipanggil setelah setiap potongan dengan banyak baris CSV
+            yang sudah dibaca dan banyak baris yang valid.
+    """
 
-    return [k for (k, v) in sorted(fens.items(), key=lambda tup: tup[1])]
+    if depth < db.minimal_depth:
+        raise ValueError(f"depth {depth} kurang dari minimal_depth")
+
+    lines_done, rows_done, staged, started = 0, 0, 0, monotonic()
+    with db.bulk_load(LOAD_PRAGMAS), open_stream(filename) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        for column in (fen_column, score_column):
+            if column not in header:
+                raise ValueError(
+                    f"Kolom {column!r} tidak ada di header CSV {filename}: {header}"
+                )
+        fen_index = header.index(fen_column)
+        score_index = header.index(score_column)
+        width = max(fen_index, score_index)
+        batches = (
+            (
+                len(rows),
+                [
+                    (row[fen_index], row[score_index])
+                    for row in rows
+                    if len(row) > width
+                ],
+            )
+            for rows in batched(reader, batch)
+        )
+        for lines, rows in _imap(
+            parse_csv_rows, batches, workers, white_pov, db.zobrist
+        ):
+            db.stage_rows(rows)
+            staged += len(rows)
+            if staged >= staging:
+                db.merge_staged(depth)
+                staged = 0
+
+            lines_done += lines
+            rows_done += len(rows)
+            logger.info(
+                "Memuat CSV",
+                extra={
+                    "lines": lines_done,
+                    "rows": rows_done,
+                    "rows_per_second": round(rows_done / (monotonic() - started)),
+                },
+            )
+            if progress is not None:
+                progress(lines_done, rows_done)
+        db.merge_staged(depth)
+
+    logger.info("Pemuatan CSV selesai", extra={"lines": lines_done, "rows": rows_done})
+    return rows_done
 
 
 def extract_dump(
@@ -66,47 +802,35 @@ def extract_dump(
     Mengekstrak berkas JSON dump Lichess.
 
     Dump Lichess akan diekstraksi ke memori utama, sehingga
-    ada baiknya ukuran berkas dibatasi.
+    ada baiknya ukuran berkas dibatasi. Setiap PV disinggah dengan
+    `Database.upsert`, berurutan sesuai isi berkas. Untuk berkas besar,
+    gunakan `import_dump` langsung ke berkas database; aturan penyinggahannya
+    sedikit berbeda (lihat `parse_dump_lines`).
 
     Args:
-        pgn: Teks PGN.
-        max_depth: kedalaman maksimum proses ekstraksi.
+        filename: Alamat berkas dump, boleh terkompresi.
+        minimal_depth: Nilai depth minimal agar analisa dapat disinggah.
+        maximum_depth: Depth maksimum yang dianggap masih mutakhir.
     """
 
     db = Database(":memory:", minimal_depth=minimal_depth)
 
-    with open(filename) as f:
+    with open_stream(filename) as f:
         for line in f:
             raw = loads(line)
 
             for eval in raw["evals"]:
-                data = []
-
-                # tambahkan data eval
-                for pv in eval["pvs"]:
-                    if "cp" in pv:
-                        score = pv["cp"]
-                    else:
-                        value = pv["mate"]
-                        if value > 0:
-                            score = MATE_SCORE - value
-                        else:
-                            score = -MATE_SCORE - value
-                    data.append(
-                        {
-                            "fen": raw["fen"],
-                            "depth": eval["depth"],
-                            "score": score,
-                            "pv": pv["line"].split(" "),
-                        }
-                    )
-
                 # urutkan untuk dapat multipv; lalu upsert
-                data.sort(key=lambda d: d["score"], reverse=True)
-                for i, info in enumerate(data, start=1):
-                    info["multipv"] = i
+                pvs = sorted(eval["pvs"], key=_score, reverse=True)
+                for multipv, pv in enumerate(pvs, start=1):
+                    info = {
+                        "multipv": multipv,
+                        "depth": eval["depth"],
+                        "score": _score(pv),
+                        "pv": pv["line"].split(" "),
+                    }
                     try:
-                        db.upsert(info["fen"], info)
+                        db.upsert(raw["fen"], info)
                     except ValueError:
                         # bukan analisa posisi catur standar
                         continue
@@ -120,70 +844,73 @@ def extract_dump(
     return db
 
 
-# import os
-# from itertools import batched
-# from multiprocessing import Pool
-# from tqdm import tqdm
-
-# CPU_COUNT = env.get("IMPORTER_THREAD", 1)
-# BATCH_SIZE = env.get("IMPORTER_BATCH", 1)
-# DUMP_DIR = env.get("LICHESS_DUMP_DIR", "dump")
-# MAXIMUM_DEPTH = env.get("ANALYSIS_DEPTH", 35)
-
-# IMPORT_STT = """
-#     INSERT INTO master.board AS mas
-#             (fen, depth, score, move)
-#     SELECT   fen, depth, score, move
-#         FROM board AS mem
-#         WHERE TRUE
-#     ON CONFLICT (fen) DO
-#         UPDATE SET
-#             depth = excluded.depth,
-#             score = excluded.score,
-#             move  = excluded.move
-#         WHERE excluded.depth > mas.depth
-# """
-
-
-# if __name__ == "__main__":
-#     if "fish.exit" in os.listdir():
-#         os.remove("fish.exit")
+def queue_pgn(
+    source: str | PathLike[str],
+    engine: Engine,
+    max_depth: int,
+    depth: int,
+    workers: int | None = None,
+    chunk: int = PGN_CHUNK,
+    job: int | None = None,
+    stop: Event | None = None,
+    poll: float = 1.0,
+) -> int:
+    """Menganalisa semua posisi unik di berkas PGN dengan `engine`.
+
+    Posisi dari setiap potongan berkas (lihat `iter_fen_chunks`) dimasukkan ke
+    antrian dengan `Engine.put_many`, lalu ditunggu sampai selesai dianalisa
+    sebelum potongan berikutnya, sehingga antrian tetap kecil. Menghasilkan
+    banyak posisi yang diproses.
+
+    Jika `job` diberikan (lihat `create_job`), pembacaan dimulai dari offset
+    terakhir yang tercatat, dan offset dicatat setelah semua posisi suatu
+    potongan selesai. Analisa berhenti dalam `poll` detik jika `stop` di-set
+    atau `stop_job` dipanggil; posisi yang sudah dianalisa di potongan yang
+    belum selesai akan dilewati saat dilanjutkan.
 
-#     FILENAMES = [os.path.join(DUMP_DIR, _) for _ in os.listdir(DUMP_DIR)]
-
-#     for filenames in batched(FILENAMES, BATCH_SIZE):
-#         if "fish.exit" in os.listdir():
-#             logger.info("soft exit")
-#             break
-
-#         logger.info("reading dumps")
-#         db = Database(":memory:")
-#         with Pool(processes=CPU_COUNT) as pool:
-#             iter_ = pool.imap_unordered(process, filenames[::-1])
-#             for data in tqdm(iter_, total=BATCH_SIZE, ncols=0):
-#                 db.from_json(data)
-
-#         # UPSERT isi database :memory: dengan berkas database
-#         logger.info("upserting")
-#         db.sql.execute(f"ATTACH DATABASE 'lichess.sqlite' AS master")
-#         db.sql.execute(IMPORT_STT)
-
-#         logger.info("optimizing")
-#         db.sql.execute("ANALYZE master")
-#         db.sql.execute("DETACH master")
-#         db.close()
+    Args:
+        source: Alamat berkas PGN, boleh terkompresi.
+        engine: Mesin catur yang menganalisa.
+        max_depth: kedalaman maksimum proses ekstraksi.
+        depth: Nilai `depth` analisa.
+        workers: Banyak proses worker; lihat `iter_fens`.
+        chunk: Perkiraan ukuran potongan (byte); lihat `iter_fens`.
+        job: Id pekerjaan impor yang dilanjutkan dan dicatat kemajuannya.
+        stop: Jika di-set, analisa berhenti.
+        poll: Selang waktu (detik) pemeriksaan permintaan berhenti.
+    """
 
-#         # Delete setelah upsert berhasil
-#         logger.info("deleting dumps")
-#         for fname in filenames:
-#             os.remove(fname)
+    db = engine.db
+    offset = 0 if job is None else _start_job(db, job, "pgn")["byte_offset"]
+    positions, done = 0, False
+    try:
+        chunks = iter_fen_chunks(source, max_depth, workers, chunk, offset=offset)
+        for offset, fens in chunks:
+            engine.put_many(fens, depth)
+            finished = engine.wait(poll)
+            while not finished and not _stopping(db, job, stop):
+                finished = engine.wait(poll)
+
+            if finished:
+                positions += len(fens)
+                if job is not None:
+                    _checkpoint(db, job, offset, len(fens))
+            if not finished or _stopping(db, job, stop):
+                break
+        else:
+            done = True
+    finally:
+        if job is not None:
+            _finish_job(db, job, done)
+    return positions
 
-#         logger.info("iteration complete")
 
+def main() -> None:
+    "Antarmuka baris perintah importer."
 
-if __name__ == "__main__":
     import argparse
     import pathlib
+    import signal
 
     from .env import (
         ANALYSIS_DEPTH,
@@ -195,25 +922,93 @@ if __name__ == "__main__":
         MINIMAL_DEPTH,
     )
 
-    ENGINE_CONFIG = ENGINE_BASE_CONFIG.copy()
-    ENGINE_CONFIG.update(ENGINE_MAIN_CONFIG)
+    engine_config = ENGINE_BASE_CONFIG.copy()
+    engine_config.update(ENGINE_MAIN_CONFIG)
 
     parser = argparse.ArgumentParser(prog="importer")
-    parser.add_argument("--pgn", type=pathlib.Path)
+    parser.add_argument(
+        "--pgn", type=pathlib.Path, help="berkas PGN, boleh terkompresi"
+    )
+    parser.add_argument(
+        "--dump", type=pathlib.Path, help="berkas JSON dump Lichess, boleh terkompresi"
+    )
+    parser.add_argument(
+        "--csv",
+        type=pathlib.Path,
+        help="berkas CSV FEN dan evaluasi, boleh terkompresi",
+    )
+    parser.add_argument(
+        "--csv-depth", type=int, default=22, help="depth analisa dataset CSV"
+    )
+    parser.add_argument("--resume", type=int, help="id pekerjaan yang dilanjutkan")
+    parser.add_argument("--stop", type=int, help="id pekerjaan yang dihentikan")
+    parser.add_argument("--jobs", action="store_true", help="daftar pekerjaan impor")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=DUMP_BATCH)
     args = parser.parse_args()
 
-    with args.pgn.open("r") as f:
-        fens = extract_fens(f.read(), max_depth=IMPORTER_PGN_DEPTH)
+    db = Database(DATABASE_URI, minimal_depth=MINIMAL_DEPTH)
+    try:
+        if args.stop is not None:
+            stop_job(db, args.stop)
+        if args.jobs or args.stop is not None:
+            for row in list_jobs(db):
+                print(row)
+            return
+        if args.csv:
+            load_csv(args.csv, db, args.csv_depth, workers=args.workers)
+            return
+
+        if args.resume is not None:
+            job = args.resume
+            rows = [row for row in list_jobs(db) if row["id"] == job]
+            if not rows:
+                parser.error(f"pekerjaan {job} tidak ditemukan")
+            kind, source = rows[0]["kind"], rows[0]["source"]
+        elif args.dump or args.pgn:
+            kind = "dump" if args.dump else "pgn"
+            source = args.dump or args.pgn
+            job = create_job(db, kind, source)
+            logger.info("Pekerjaan impor dibuat", extra={"job": job})
+        else:
+            parser.error("butuh --pgn, --dump, --csv, atau --resume")
+
+        # Ctrl+C atau SIGTERM: berhenti di checkpoint berikutnya, lalu
+        # lanjutkan nanti dengan --resume
+        stop = Event()
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        if kind == "dump":
+            import_dump(
+                source,
+                db,
+                workers=args.workers,
+                batch=args.batch,
+                minimal_depth=MINIMAL_DEPTH,
+                maximum_depth=ANALYSIS_DEPTH,
+                job=job,
+                stop=stop,
+            )
+            return
+    finally:
+        db.close()
 
     engine = Engine(ENGINE_PATH, DATABASE_URI, minimal_depth=MINIMAL_DEPTH)
     try:
-        engine.set_options(ENGINE_CONFIG)
-        while fens:
-            engine.put(fens.pop(), ANALYSIS_DEPTH)
-        engine.wait()
-
-    except KeyboardInterrupt:
-        logger.info("Interrupted by user")
-
+        engine.set_options(engine_config)
+        queue_pgn(
+            source,
+            engine,
+            IMPORTER_PGN_DEPTH,
+            ANALYSIS_DEPTH,
+            workers=args.workers,
+            job=job,
+            stop=stop,
+        )
     finally:
         engine.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Menggabungkan database singgahan lain (incoming) ke database utama (master).
+
+Isi incoming dibaca berurutan menurut PRIMARY KEY-nya dalam potongan-potongan
+kecil. Setiap potongan ditulis dalam satu transaksi pendek, bersama dengan
+posisi terakhir yang sudah digabungkan (tabel `merge_progress` di master),
+sehingga penggabungan dapat dilanjutkan setelah terhenti dan penulis lain
+(misalnya server web) tidak perlu menunggu lama.
+"""
+
+from collections.abc import Callable
+from os import stat
+from os.path import abspath
+from time import sleep
+from typing import Any
+
+from .core import Database
+from .logger import get_logger
+
+logger = get_logger("merge")
+
+MERGE_CHUNK = 10_000  # banyak baris per transaksi
+
+# kapan baris incoming menimpa baris master yang posisinya sama
+MERGE_RULES = {
+    "deeper": "excluded.depth > board.depth",
+    "deeper_or_equal": "excluded.depth >= board.depth",
+    "incoming": "TRUE",  # incoming selalu lebih dipercaya, misal versi mesin lebih baru
+    "missing": "FALSE",  # hanya tambahkan posisi yang belum ada di master
+}
+
+_PROGRESS = """CREATE TABLE IF NOT EXISTS merge_progress(
+                    source      TEXT    PRIMARY KEY,
+                    last        BLOB,   -- atau INTEGER jika incoming mode Zobrist
+                    rows        INTEGER NOT NULL,
+                    done        INTEGER NOT NULL,
+                    size        INTEGER,  -- identitas berkas incoming saat
+                    mtime       INTEGER   -- penggabungan dimulai
+                    )"""
+
+
+def merge_database(
+    master: Database,
+    incoming: str,
+    rule: str = "deeper",
+    chunk: int = MERGE_CHUNK,
+    pause: float = 0.0,
+    progress: Callable[[int, int], None] | None = None,
+    force: bool = False,
+) -> int:
+    """Menggabungkan database `incoming` ke `master`.
+
+    Jika penggabungan dari `incoming` yang sama pernah terhenti, proses
+    dilanjutkan dari posisi terakhir yang tercatat. Penggabungan yang sudah
+    selesai tidak diulang, kecuali berkas `incoming` sudah berubah (ukuran
+    atau waktu modifikasinya berbeda) atau `force` diberikan; penggabungan
+    lalu dimulai lagi dari awal. Menghasilkan banyak baris incoming yang
+    diproses oleh pemanggilan ini.
+
+    Args:
+        master: Database tujuan.
+        incoming: Alamat berkas database yang akan digabungkan.
+        rule: Aturan konflik; salah satu kunci `MERGE_RULES`.
+        chunk: Banyak baris per transaksi; membatasi lama kunci tulis.
+        pause: Jeda (detik) antar transaksi, memberi kesempatan penulis lain.
+        progress: Dipanggil setelah setiap transaksi dengan banyak baris yang
+            sudah diproses dan banyak seluruh baris incoming.
+        force: Abaikan kemajuan yang tercatat dan gabungkan dari awal.
+    """
+
+    if rule not in MERGE_RULES:
+        raise ValueError(f"Aturan tidak dikenal: {rule}")
+
+    source = abspath(incoming)
+    info = stat(source)
+    identity = {"size": info.st_size, "mtime": info.st_mtime_ns}
+    master.flush()
+    conn = master.sql
+    with master._write_lock:
+        conn.execute(_PROGRESS)
+        _add_identity(conn)
+        state = conn.execute(
+            "SELECT * FROM merge_progress WHERE source = ?", (source,)
+        ).fetchone()
+        if state is not None and (
+            force or (state["size"], state["mtime"]) != tuple(identity.values())
+        ):
+            # berkas incoming sudah diganti; posisi terakhir tidak berlaku lagi
+            logger.info("Menggabungkan ulang dari awal", extra={"source": source})
+            state = None
+        state = state or {"last": None, "rows": 0, "done": 0}
+        if state["done"]:
+            logger.info("Sudah pernah digabungkan", extra={"source": source})
+            return 0
+
+        conn.execute("ATTACH DATABASE ? AS incoming", (f"file:{source}?mode=ro",))
+    try:
+        with master._write_lock:
+            # urutkan menurut PRIMARY KEY incoming agar pembacaan memakai indeks
+            columns = conn.execute(
+                "SELECT name FROM pragma_table_info('board', 'incoming')"
+            ).fetchall()
+            order = "key" if "key" in [_["name"] for _ in columns] else "fen"
+            total = conn.execute("SELECT COUNT(*) AS n FROM incoming.board")
+            total = total.fetchone()["n"]
+
+        select = "zobrist(fen), fen" if master.zobrist else "fen"
+        stt_progress = """
+            INSERT OR REPLACE INTO merge_progress
+                (source, last, rows, done, size, mtime)
+            VALUES (:source, :until, :rows, :done, :size, :mtime)
+        """
+
+        rows, processed = state["rows"], 0
+        if state["last"] is None:
+            # semua kunci lebih besar atau sama dengan nilai awal ini
+            last, op = b"" if order == "fen" else -(2**63), ">="
+        else:
+            last, op = state["last"], ">"
+
+        logger.info(
+            "Menggabungkan database",
+            extra={"source": source, "rule": rule, "rows": rows, "total": total},
+        )
+        while True:
+            params: dict[str, Any] = {"last": last, "chunk": chunk, "source": source}
+            params.update(identity)
+            with master._write_lock, conn:
+                keys = conn.execute(
+                    f"""
+                    SELECT {order} AS k, fen FROM incoming.board
+                    WHERE {order} {op} :last ORDER BY {order} LIMIT :chunk
+                    """,
+                    params,
+                ).fetchall()
+                params.update(
+                    until=keys[-1]["k"] if keys else last,
+                    rows=rows + len(keys),
+                    done=len(keys) < chunk,
+                )
+
+                master._bloom_add(_["fen"] for _ in keys)
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    f"""
+                    INSERT INTO main.board ({master._columns}, depth, score, move)
+                    SELECT {select}, depth, score, move FROM incoming.board
+                    WHERE {order} {op} :last AND {order} <= :until
+                    {master._conflict} DO UPDATE SET
+                        depth = excluded.depth,
+                        score = excluded.score,
+                        move  = excluded.move
+                    WHERE fen = excluded.fen AND {MERGE_RULES[rule]}
+                    """,
+                    params,
+                )
+                conn.execute(stt_progress, params)
+            master._cache.invalidate(_["fen"] for _ in keys)
+
+            last, op, rows = params["until"], ">", params["rows"]
+            processed += len(keys)
+            logger.info("Menggabungkan database", extra={"rows": rows, "total": total})
+            if progress is not None:
+                progress(rows, total)
+            if params["done"]:
+                break
+            if pause:
+                sleep(pause)
+    finally:
+        with master._write_lock:
+            conn.execute("DETACH DATABASE incoming")
+
+    logger.info("Penggabungan selesai", extra={"source": source, "rows": rows})
+    return processed
+
+
+def _add_identity(conn) -> None:
+    # tabel merge_progress lama belum punya kolom identitas berkas
+    cur = conn.execute("SELECT name FROM pragma_table_info('merge_progress')")
+    names = [row["name"] for row in cur.fetchall()]
+    for column in ("size", "mtime"):
+        if column not in names:
+            conn.execute(f"ALTER TABLE merge_progress ADD COLUMN {column} INTEGER")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="merge")
+    parser.add_argument("master", help="berkas database tujuan")
+    parser.add_argument("incoming", help="berkas database yang akan digabungkan")
+    parser.add_argument("--rule", choices=list(MERGE_RULES), default="deeper")
+    parser.add_argument("--chunk", type=int, default=MERGE_CHUNK)
+    parser.add_argument("--pause", type=float, default=0.0)
+    parser.add_argument(
+        "--force", action="store_true", help="abaikan kemajuan yang tercatat"
+    )
+    args = parser.parse_args()
+
+    db = Database(args.master)
+    try:
+        merge_database(
+            db,
+            args.incoming,
+            rule=args.rule,
+            chunk=args.chunk,
+            pause=args.pause,
+            force=args.force,
+            progress=lambda rows, total: print(f"{rows}/{total}", end="\r"),
+        )
+    finally:
+        db.close()
@@ -0,0 +1,695 @@
+"""
+Representasi papan catur berbasis bitboard.
+
+Pengganti ringkas dari `chess.Board` yang hanya mencakup kebutuhan `core.py`:
+membaca FEN, menjalankan langkah dalam notasi UCI atau SAN, menghasilkan langkah legal,
+dan menghasilkan kunci posisi terenkode (lihat `core.encode_fen`) secara langsung
+tanpa membuat string FEN.
+"""
+
+# MIT License Copyright (c) 2025 Agapitus Keyka Vigiliant
+
+import re
+from collections.abc import Iterator
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+# kode bidak sama dengan nibble di encode_fen: 2 * jenis + warna
+# P=0 p=1 N=2 n=3 B=4 b=5 R=6 r=7 Q=8 q=9 K=10 k=11
+PIECE_SYMBOLS = "PpNnBbRrQqKk"
+PIECE_CODES = {symbol: code for code, symbol in enumerate(PIECE_SYMBOLS)}
+PROMOTION_TYPES = {"n": KNIGHT, "b": BISHOP, "r": ROOK, "q": QUEEN}
+FILE_NAMES = "abcdefgh"
+SQUARE_NAMES = [f + r for r in "12345678" for f in FILE_NAMES]
+SQUARES = {name: square for square, name in enumerate(SQUARE_NAMES)}
+SAN_PIECES = {"N": KNIGHT, "B": BISHOP, "R": ROOK, "Q": QUEEN, "K": KING}
+SAN_REGEX = re.compile(r"([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?")
+
+Move = tuple[int, int, int]  # (asal, tujuan, jenis promosi atau -1)
+
+BB_ALL = (1 << 64) - 1
+BB_FILE_A = 0x0101010101010101
+BB_FILE_H = BB_FILE_A << 7
+BB_RANK_1 = 0xFF
+BB_RANK_8 = BB_RANK_1 << 56
+BB_BACKRANKS = BB_RANK_1 | BB_RANK_8
+
+
+def _scan(bb: int) -> Iterator[int]:
+    "Menghasilkan indeks petak dari bitboard, terurut dari yang terkecil."
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def _step_attacks(square: int, occupied: int, deltas: tuple[int, ...]) -> int:
+    # serangan "lambat" untuk membangun tabel; berhenti di bidak pertama
+    attacks = 0
+    for delta in deltas:
+        sq = square
+        while True:
+            prev, sq = sq, sq + delta
+            if not 0 <= sq < 64 or abs((sq & 7) - (prev & 7)) > 2:
+                break
+            attacks |= 1 << sq
+            if occupied & (1 << sq):
+                break
+    return attacks
+
+
+def _leaper_attacks(deltas: tuple[int, ...]) -> list[int]:
+    return [_step_attacks(sq, BB_ALL, deltas) for sq in range(64)]
+
+
+def _edges(square: int) -> int:
+    rank = BB_RANK_1 << (8 * (square >> 3))
+    file = BB_FILE_A << (square & 7)
+    return (BB_BACKRANKS & ~rank) | ((BB_FILE_A | BB_FILE_H) & ~file)
+
+
+def _slider_tables(deltas: tuple[int, ...]) -> tuple[list[int], list[dict[int, int]]]:
+    masks, tables = [], []
+    for square in range(64):
+        mask = _step_attacks(square, 0, deltas) & ~_edges(square)
+        table = {}
+        subset = 0
+        while True:
+            # iterasi semua subset dari mask (carry-rippler)
+            table[subset] = _step_attacks(square, subset, deltas)
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+KNIGHT_ATTACKS = _leaper_attacks((-17, -15, -10, -6, 6, 10, 15, 17))
+KING_ATTACKS = _leaper_attacks((-9, -8, -7, -1, 1, 7, 8, 9))
+PAWN_ATTACKS = [
+    [_step_attacks(sq, BB_ALL, (7, 9)) for sq in range(64)],
+    [_step_attacks(sq, BB_ALL, (-7, -9)) for sq in range(64)],
+]
+DIAG_MASKS, DIAG_ATTACKS = _slider_tables((-9, -7, 7, 9))
+FILE_MASKS, FILE_ATTACKS = _slider_tables((-8, 8))
+RANK_MASKS, RANK_ATTACKS = _slider_tables((-1, 1))
+
+
+def _rays() -> tuple[list[list[int]], list[list[int]]]:
+    # RAYS[a][b]: garis penuh yang melalui a dan b (termasuk a dan b)
+    # BETWEEN[a][b]: petak-petak di antara a dan b (tanpa a dan b)
+    rays, between = [], []
+    for a in range(64):
+        rays_a, between_a = [], []
+        for b in range(64):
+            bb_b = 1 << b
+            if a == b:
+                line = 0
+            elif DIAG_ATTACKS[a][0] & bb_b:
+                line = (DIAG_ATTACKS[a][0] & DIAG_ATTACKS[b][0]) | (1 << a) | bb_b
+            elif RANK_ATTACKS[a][0] & bb_b:
+                line = RANK_ATTACKS[a][0] | (1 << a)
+            elif FILE_ATTACKS[a][0] & bb_b:
+                line = FILE_ATTACKS[a][0] | (1 << a)
+            else:
+                line = 0
+            rays_a.append(line)
+            inner = line & ((BB_ALL << a) ^ (BB_ALL << b))
+            between_a.append(inner & (inner - 1) & BB_ALL)
+        rays.append(rays_a)
+        between.append(between_a)
+    return rays, between
+
+
+RAYS, BETWEEN = _rays()
+
+_HEX = "0123456789abcdef"
+_REVERSE_16 = [int(f"{i:016b}"[::-1], 2) for i in range(1 << 16)]
+
+
+def _reverse_bits(bb: int) -> int:
+    "Membalik urutan 64 bit; petak a1 menjadi bit paling signifikan."
+    return (
+        _REVERSE_16[bb & 0xFFFF] << 48
+        | _REVERSE_16[(bb >> 16) & 0xFFFF] << 32
+        | _REVERSE_16[(bb >> 32) & 0xFFFF] << 16
+        | _REVERSE_16[bb >> 48]
+    )
+
+
+def _rook_attacks(square: int, occupied: int) -> int:
+    return (
+        RANK_ATTACKS[square][occupied & RANK_MASKS[square]]
+        | FILE_ATTACKS[square][occupied & FILE_MASKS[square]]
+    )
+
+
+def _bishop_attacks(square: int, occupied: int) -> int:
+    return DIAG_ATTACKS[square][occupied & DIAG_MASKS[square]]
+
+
+class Position:
+    """Posisi catur standar dalam bentuk bitboard.
+
+    Attributes:
+        turn: Giliran saat ini, `WHITE` (0) atau `BLACK` (1).
+        castling: Bitboard petak benteng yang masih memiliki hak rokade.
+        ep_square: Petak en passant setelah langkah pion dua petak, atau None.
+        halfmove_clock: Jumlah langkah sejak pion terakhir bergerak atau
+            bidak terakhir dimakan.
+        fullmove_number: Nomor langkah penuh.
+    """
+
+    __slots__ = (
+        "_pieces",
+        "_colors",
+        "_squares",
+        "turn",
+        "castling",
+        "ep_square",
+        "halfmove_clock",
+        "fullmove_number",
+    )
+
+    def __init__(self, fen: str | None = None) -> None:
+        """Membuat posisi dari notasi FEN, atau posisi awal jika `fen` None."""
+        if fen is None:
+            fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+        self.set_fen(fen)
+
+    def copy(self) -> "Position":
+        "Menghasilkan salinan posisi."
+        other = Position.__new__(Position)
+        other._pieces = self._pieces.copy()
+        other._colors = self._colors.copy()
+        other._squares = self._squares.copy()
+        other.turn = self.turn
+        other.castling = self.castling
+        other.ep_square = self.ep_square
+        other.halfmove_clock = self.halfmove_clock
+        other.fullmove_number = self.fullmove_number
+        return other
+
+    def _clear(self) -> None:
+        self._pieces = [0] * 12
+        self._colors = [0, 0]
+        self._squares = [-1] * 64
+
+    def _put(self, square: int, code: int) -> None:
+        bb = 1 << square
+        self._pieces[code] |= bb
+        self._colors[code & 1] |= bb
+        self._squares[square] = code
+
+    def _remove(self, square: int) -> int:
+        code = self._squares[square]
+        if code >= 0:
+            bb = 1 << square
+            self._pieces[code] ^= bb
+            self._colors[code & 1] ^= bb
+            self._squares[square] = -1
+        return code
+
+    def set_fen(self, fen: str) -> None:
+        """Mengubah posisi sesuai notasi FEN atau EPD (tanpa halfmove/fullmove).
+
+        Hak rokade yang tidak sesuai dengan letak raja dan benteng diabaikan,
+        sama seperti `chess.Board`.
+        """
+        parts = fen.split()
+        if len(parts) < 4 or len(parts) > 6:
+            raise ValueError(f"FEN tidak valid: {fen!r}")
+        rows = parts[0].split("/")
+        if len(rows) != 8:
+            raise ValueError(f"FEN tidak valid: {fen!r}")
+
+        self._clear()
+        for rank, row in zip(range(7, -1, -1), rows):
+            file = 0
+            for char in row:
+                if char in "12345678":
+                    file += int(char)
+                elif char in PIECE_CODES and file < 8:
+                    self._put(8 * rank + file, PIECE_CODES[char])
+                    file += 1
+                else:
+                    raise ValueError(f"FEN tidak valid: {fen!r}")
+            if file != 8:
+                raise ValueError(f"FEN tidak valid: {fen!r}")
+
+        if parts[1] not in ("w", "b"):
+            raise ValueError(f"FEN tidak valid: {fen!r}")
+        self.turn = WHITE if parts[1] == "w" else BLACK
+
+        castling = 0
+        if parts[2] != "-":
+            corners = {"K": 7, "Q": 0, "k": 63, "q": 56}
+            for char in parts[2]:
+                if char not in corners:
+                    raise ValueError(f"FEN tidak valid: {fen!r}")
+                castling |= 1 << corners[char]
+        self.castling = castling & self._clean_castling()
+
+        if parts[3] == "-":
+            self.ep_square = None
+        elif parts[3] in SQUARES and parts[3][1] in "36":
+            self.ep_square = SQUARES[parts[3]]
+        else:
+            raise ValueError(f"FEN tidak valid: {fen!r}")
+
+        try:
+            self.halfmove_clock = int(parts[4]) if len(parts) > 4 else 0
+            self.fullmove_number = int(parts[5]) if len(parts) > 5 else 1
+        except ValueError:
+            raise ValueError(f"FEN tidak valid: {fen!r}")
+
+    def _clean_castling(self) -> int:
+        # hak rokade hanya berlaku jika raja dan benteng di petak awalnya
+        sq = self._squares
+        clean = 0
+        if sq[4] == 10:
+            clean |= (1 if sq[0] == 6 else 0) | (1 << 7 if sq[7] == 6 else 0)
+        if sq[60] == 11:
+            clean |= (1 << 56 if sq[56] == 7 else 0) | (1 << 63 if sq[63] == 7 else 0)
+        return clean
+
+    def board_fen(self) -> str:
+        "Menghasilkan bagian penempatan bidak dari notasi FEN."
+        rows = []
+        for rank in range(7, -1, -1):
+            row, empty = "", 0
+            for code in self._squares[8 * rank : 8 * rank + 8]:
+                if code < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += PIECE_SYMBOLS[code]
+            rows.append(row + (str(empty) if empty else ""))
+        return "/".join(rows)
+
+    def epd(self) -> str:
+        "Menghasilkan notasi FEN tanpa halfmove dan fullmove."
+        castling = "".join(
+            char
+            for char, square in (("K", 7), ("Q", 0), ("k", 63), ("q", 56))
+            if self.castling >> square & 1
+        )
+        ep = self._legal_ep_square()
+        return " ".join(
+            (
+                self.board_fen(),
+                "wb"[self.turn],
+                castling or "-",
+                "-" if ep is None else SQUARE_NAMES[ep],
+            )
+        )
+
+    def fen(self) -> str:
+        "Menghasilkan notasi FEN."
+        return f"{self.epd()} {self.halfmove_clock} {self.fullmove_number}"
+
+    def encode(self) -> bytes:
+        """Menghasilkan kunci posisi terenkode.
+
+        Hasilnya identik dengan `encode_fen(self.epd())`, tetapi dihitung
+        langsung dari bitboard tanpa membuat string FEN.
+        """
+        squares = self._squares
+        occupied = self._colors[0] | self._colors[1]
+        ep = self._legal_ep_square()
+        if self.castling or ep is not None or self.turn == BLACK:
+            # ganti kode bidak dengan nibble khusus
+            squares = squares.copy()
+            for square in _scan(self.castling):
+                squares[square] = 13 if square < 8 else 14
+            if ep is not None:
+                for square in range(ep & 7, 64, 8):
+                    if squares[square] == 0 or squares[square] == 1:
+                        squares[square] = 12
+            if self.turn == BLACK and self._pieces[11]:
+                squares[self._pieces[11].bit_length() - 1] = 15
+
+        nibble = "".join([_HEX[code] for code in squares if code >= 0])
+        num = int(nibble or "0", 16) << 64 | _reverse_bits(occupied)
+        return num.to_bytes((64 + 4 * len(nibble) + 7) // 8, byteorder="big")
+
+    def _attackers(self, color: int, square: int, occupied: int) -> int:
+        # bidak-bidak `color` yang menyerang `square`
+        pieces = self._pieces
+        rooks_queens = pieces[6 + color] | pieces[8 + color]
+        bishops_queens = pieces[4 + color] | pieces[8 + color]
+        return (
+            (KNIGHT_ATTACKS[square] & pieces[2 + color])
+            | (KING_ATTACKS[square] & pieces[10 + color])
+            | (PAWN_ATTACKS[color ^ 1][square] & pieces[color])
+            | (_rook_attacks(square, occupied) & rooks_queens)
+            | (_bishop_attacks(square, occupied) & bishops_queens)
+        )
+
+    def is_check(self) -> bool:
+        "Apakah raja pihak yang melangkah sedang di-skak."
+        king = self._pieces[10 + self.turn]
+        if not king:
+            return False
+        occupied = self._colors[0] | self._colors[1]
+        return bool(self._attackers(self.turn ^ 1, king.bit_length() - 1, occupied))
+
+    def _slider_blockers(self, king: int, occupied: int) -> int:
+        # bidak milik pihak yang melangkah yang sedang di-pin ke raja
+        them = self.turn ^ 1
+        pieces = self._pieces
+        snipers = (
+            (RANK_ATTACKS[king][0] | FILE_ATTACKS[king][0])
+            & (pieces[6 + them] | pieces[8 + them])
+        ) | (DIAG_ATTACKS[king][0] & (pieces[4 + them] | pieces[8 + them]))
+
+        blockers = 0
+        for sniper in _scan(snipers):
+            between = BETWEEN[king][sniper] & occupied
+            if between and not between & (between - 1):
+                blockers |= between
+        return blockers & self._colors[self.turn]
+
+    def _generate_pseudo_legal(self, from_mask: int, to_mask: int) -> Iterator[Move]:
+        us = self.turn
+        pieces = self._pieces
+        ours = self._colors[us]
+        theirs = self._colors[us ^ 1]
+        occupied = ours | theirs
+        targets = ~ours & to_mask
+
+        # bidak selain pion
+        for code in (2 + us, 4 + us, 6 + us, 8 + us, 10 + us):
+            for square in _scan(pieces[code] & from_mask):
+                if code < 4:
+                    attacks = KNIGHT_ATTACKS[square]
+                elif code < 6:
+                    attacks = _bishop_attacks(square, occupied)
+                elif code < 8:
+                    attacks = _rook_attacks(square, occupied)
+                elif code < 10:
+                    attacks = _rook_attacks(square, occupied) | _bishop_attacks(
+                        square, occupied
+                    )
+                else:
+                    attacks = KING_ATTACKS[square]
+                for to in _scan(attacks & targets):
+                    yield square, to, -1
+
+        # rokade
+        if from_mask & pieces[10 + us]:
+            yield from self._generate_castling(to_mask)
+
+        # pion
+        pawns = pieces[us] & from_mask
+        if not pawns:
+            return
+        for square in _scan(pawns):
+            for to in _scan(PAWN_ATTACKS[us][square] & theirs & to_mask):
+                if (1 << to) & BB_BACKRANKS:
+                    for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        yield square, to, promotion
+                else:
+                    yield square, to, -1
+
+        if us == WHITE:
+            single = (pawns << 8) & ~occupied & BB_ALL
+            double = ((single & (BB_RANK_1 << 16)) << 8) & ~occupied
+            forward = -8
+        else:
+            single = (pawns >> 8) & ~occupied
+            double = ((single & (BB_RANK_1 << 40)) >> 8) & ~occupied
+            forward = 8
+        for to in _scan(single & to_mask):
+            if (1 << to) & BB_BACKRANKS:
+                for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                    yield to + forward, to, promotion
+            else:
+                yield to + forward, to, -1
+        for to in _scan(double & to_mask):
+            yield to + 2 * forward, to, -1
+
+        yield from self._generate_en_passant(from_mask, to_mask)
+
+    def _generate_en_passant(self, from_mask: int, to_mask: int) -> Iterator[Move]:
+        ep = self.ep_square
+        if ep is None or not (1 << ep) & to_mask:
+            return
+        us = self.turn
+        occupied = self._colors[0] | self._colors[1]
+        if (1 << ep) & occupied:
+            return
+        # pion lawan yang baru saja melangkah dua petak
+        victim = ep - 8 if us == WHITE else ep + 8
+        if self._squares[victim] != (us ^ 1):
+            return
+        capturers = self._pieces[us] & from_mask & PAWN_ATTACKS[us ^ 1][ep]
+        for square in _scan(capturers):
+            yield square, ep, -1
+
+    def _generate_castling(self, to_mask: int) -> Iterator[Move]:
+        us = self.turn
+        king = 4 if us == WHITE else 60
+        if self._squares[king] != 10 + us:
+            return
+        occupied = self._colors[0] | self._colors[1]
+        them = us ^ 1
+        # (benteng, petak kosong, petak yang dilalui raja, tujuan raja)
+        for rook, empty, path, to in (
+            (
+                king + 3,
+                (1 << king + 1) | (1 << king + 2),
+                (king + 1, king + 2),
+                king + 2,
+            ),
+            (
+                king - 4,
+                (1 << king - 1) | (1 << king - 2) | (1 << king - 3),
+                (king - 1, king - 2),
+                king - 2,
+            ),
+        ):
+            if not self.castling >> rook & 1 or not (1 << to) & to_mask:
+                continue
+            if occupied & empty:
+                continue
+            if any(self._attackers(them, sq, occupied) for sq in (king, *path)):
+                continue
+            yield king, to, -1
+
+    def _is_safe(self, king: int, blockers: int, move: Move) -> bool:
+        start, to, _ = move
+        occupied = self._colors[0] | self._colors[1]
+        them = self.turn ^ 1
+        if start == king:
+            if abs(to - start) == 2:
+                # rokade sudah diperiksa ketika dibuat
+                return True
+            return not self._attackers(them, to, occupied ^ (1 << king))
+        code = self._squares[start]
+        if code < 2 and to == self.ep_square and self._squares[to] < 0:
+            victim = to - 8 if self.turn == WHITE else to + 8
+            occupied ^= (1 << start) | (1 << to) | (1 << victim)
+            return not self._attackers(them, king, occupied) & ~(1 << victim)
+        return not blockers & (1 << start) or bool(RAYS[start][to] & (1 << king))
+
+    def _generate_legal(
+        self, from_mask: int = BB_ALL, to_mask: int = BB_ALL
+    ) -> Iterator[Move]:
+        king_bb = self._pieces[10 + self.turn]
+        if not king_bb:
+            yield from self._generate_pseudo_legal(from_mask, to_mask)
+            return
+
+        king = king_bb.bit_length() - 1
+        occupied = self._colors[0] | self._colors[1]
+        blockers = self._slider_blockers(king, occupied)
+        checkers = self._attackers(self.turn ^ 1, king, occupied)
+        if checkers:
+            moves = self._generate_evasions(king, checkers, from_mask, to_mask)
+        else:
+            moves = self._generate_pseudo_legal(from_mask, to_mask)
+        for move in moves:
+            if self._is_safe(king, blockers, move):
+                yield move
+
+    def _generate_evasions(
+        self, king: int, checkers: int, from_mask: int, to_mask: int
+    ) -> Iterator[Move]:
+        if (1 << king) & from_mask:
+            ours = self._colors[self.turn]
+            for to in _scan(KING_ATTACKS[king] & ~ours & to_mask):
+                yield king, to, -1
+
+        if checkers & (checkers - 1):
+            # skak ganda; hanya raja yang bisa melangkah
+            return
+        checker = checkers.bit_length() - 1
+        target = BETWEEN[king][checker] | checkers
+        yield from self._generate_pseudo_legal(
+            from_mask & ~(1 << king), to_mask & target
+        )
+
+        # en passant yang memakan pion pemberi skak
+        ep = self.ep_square
+        if ep is not None and not (1 << ep) & target:
+            victim = ep - 8 if self.turn == WHITE else ep + 8
+            if checkers == 1 << victim:
+                yield from self._generate_en_passant(from_mask, to_mask)
+
+    def _legal_ep_square(self) -> int | None:
+        # petak en passant hanya dianggap ada jika ada langkah en passant yang legal
+        ep = self.ep_square
+        if ep is None:
+            return None
+        king_bb = self._pieces[10 + self.turn]
+        for move in self._generate_en_passant(BB_ALL, 1 << ep):
+            if not king_bb or self._is_safe(king_bb.bit_length() - 1, 0, move):
+                return ep
+        return None
+
+    @property
+    def legal_moves(self) -> Iterator[Move]:
+        "Menghasilkan semua langkah legal; gunakan `move_uci` untuk notasi UCI."
+        return self._generate_legal()
+
+    def parse_uci(self, uci: str) -> Move:
+        """Mengubah notasi UCI menjadi langkah legal.
+
+        Raises:
+            ValueError: Jika notasi tidak valid atau langkah tidak legal.
+        """
+        start, to = SQUARES.get(uci[:2]), SQUARES.get(uci[2:4])
+        if start is None or to is None or len(uci) > 5:
+            raise ValueError(f"Langkah tidak valid: {uci!r}")
+        promotion = -1
+        if len(uci) == 5:
+            if uci[4] not in PROMOTION_TYPES:
+                raise ValueError(f"Langkah tidak valid: {uci!r}")
+            promotion = PROMOTION_TYPES[uci[4]]
+
+        if self._squares[start] == 10 + self.turn and start in (4, 60):
+            # raja memakan benteng sendiri; notasi rokade alternatif
+            if to == start + 3 and self._squares[to] == 6 + self.turn:
+                to = start + 2
+            elif to == start - 4 and self._squares[to] == 6 + self.turn:
+                to = start - 2
+
+        move = (start, to, promotion)
+        for legal in self._generate_legal(1 << start, 1 << to):
+            if legal == move:
+                return move
+        raise ValueError(f"Langkah ilegal: {uci!r} di posisi {self.fen()!r}")
+
+    def parse_san(self, san: str) -> Move:
+        """Mengubah notasi SAN (misalnya `Nbd7`, `exd8=Q+`, `O-O`) menjadi langkah legal.
+
+        Raises:
+            ValueError: Jika notasi tidak valid, ambigu, atau langkah tidak legal.
+        """
+        _san = san.rstrip("+#!?")
+        king = self._pieces[10 + self.turn]
+        if _san in ("O-O", "0-0", "O-O-O", "0-0-0") and king:
+            start = king.bit_length() - 1
+            to = start + 2 if len(_san) == 3 else start - 2
+            from_mask, to_mask, promotion = king, 1 << to, -1
+        else:
+            match = SAN_REGEX.fullmatch(_san)
+            if match is None:
+                raise ValueError(f"Langkah tidak valid: {san!r}")
+            piece, file, rank, square, symbol = match.groups()
+            kind = PAWN if piece is None else SAN_PIECES[piece]
+            if kind == PAWN and file is None:
+                # langkah pion tanpa makan selalu pada file yang sama
+                file = square[0]
+            from_mask = self._pieces[2 * kind + self.turn]
+            if file is not None:
+                from_mask &= BB_FILE_A << FILE_NAMES.index(file)
+            if rank is not None:
+                from_mask &= BB_RANK_1 << 8 * (int(rank) - 1)
+            to_mask = 1 << SQUARES[square]
+            promotion = -1 if symbol is None else PROMOTION_TYPES[symbol.lower()]
+
+        moves = [
+            move
+            for move in self._generate_legal(from_mask, to_mask)
+            if move[2] == promotion
+        ]
+        if len(moves) != 1:
+            raise ValueError(f"Langkah ilegal: {san!r} di posisi {self.fen()!r}")
+        return moves[0]
+
+    def push_san(self, san: str) -> None:
+        """Menjalankan langkah dalam notasi SAN.
+
+        Raises:
+            ValueError: Jika notasi tidak valid, ambigu, atau langkah tidak legal.
+        """
+        self.push(self.parse_san(san))
+
+    def push_uci(self, uci: str) -> None:
+        """Menjalankan langkah dalam notasi UCI.
+
+        Raises:
+            ValueError: Jika notasi tidak valid atau langkah tidak legal.
+        """
+        self.push(self.parse_uci(uci))
+
+    def push(self, move: Move) -> None:
+        "Menjalankan langkah tanpa memeriksa legalitasnya."
+        start, to, promotion = move
+        us = self.turn
+        code = self._remove(start)
+        captured = self._remove(to)
+        ep, self.ep_square = self.ep_square, None
+
+        self.halfmove_clock += 1
+        if captured >= 0 or code < 2:
+            self.halfmove_clock = 0
+
+        if code < 2:
+            if to == ep and captured < 0:
+                self._remove(to - 8 if us == WHITE else to + 8)
+            elif abs(to - start) == 16:
+                self.ep_square = (start + to) // 2
+            if promotion >= 0:
+                code = 2 * promotion + us
+        elif code >= 10:
+            self.castling &= ~(BB_RANK_1 if us == WHITE else BB_RANK_8)
+            if to - start == 2:
+                self._put(start + 1, self._remove(start + 3))
+            elif start - to == 2:
+                self._put(start - 1, self._remove(start - 4))
+        self.castling &= ~((1 << start) | (1 << to))
+        self._put(to, code)
+
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.turn = us ^ 1
+
+
+def move_uci(move: Move) -> str:
+    "Mengubah langkah menjadi notasi UCI."
+    start, to, promotion = move
+    if promotion < 0:
+        return SQUARE_NAMES[start] + SQUARE_NAMES[to]
+    return SQUARE_NAMES[start] + SQUARE_NAMES[to] + "pnbrqk"[promotion]
+
+
+def perft(position: Position, depth: int) -> int:
+    "Menghitung banyaknya simpul pohon langkah legal sampai kedalaman `depth`."
+    if depth < 1:
+        return 1
+    moves = list(position._generate_legal())
+    if depth == 1:
+        return len(moves)
+    total = 0
+    for move in moves:
+        child = position.copy()
+        child.push(move)
+        total += perft(child, depth - 1)
+    return total
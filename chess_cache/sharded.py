@@ -0,0 +1,240 @@
+"""
+Database singgahan yang tersebar di beberapa berkas SQLite (shard).
+
+Setiap posisi disimpan di shard ke-`zobrist_hash(fen) % N`. Setiap shard punya
+koneksi penulisnya sendiri, sehingga penulisan ke shard yang berbeda tidak
+saling menunggu, dan pencarian banyak posisi (misalnya semua anak suatu posisi)
+dijalankan paralel di semua shard.
+"""
+
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from .core import (
+    NORMALIZE_CHUNK,
+    SELECT_CACHE,
+    Database,
+    Info,
+    _BaseDatabase,
+    _SelectCache,
+    zobrist_hash,
+)
+from .logger import get_logger
+
+logger = get_logger("sharded")
+
+SPLIT_BATCH = 10_000  # banyak baris per transaksi saat membagi database
+
+Rows = list[tuple[bytes, dict[str, Any]]]
+
+
+def shard_uris(path: str, shards: int) -> list[str]:
+    "Alamat berkas shard dari `path`, misalnya `cache.sqlite` -> `cache.0.sqlite`."
+    _path = Path(path)
+    return [str(_path.with_suffix(f".{i}{_path.suffix}")) for i in range(shards)]
+
+
+class ShardedDatabase(_BaseDatabase):
+    """Database singgahan yang tersebar di beberapa `Database`.
+
+    Antarmukanya sama dengan `Database` untuk `select`, `upsert`,
+    `normalize_old_data`, `reset_db`, dan `close`. Mode tertunda
+    (`write_behind`) tidak didukung.
+
+    Attributes:
+        shards: Daftar `Database`, satu untuk setiap berkas.
+    """
+
+    def __init__(
+        self,
+        uris: list[str],
+        minimal_depth: int = 1,
+        zobrist: bool = False,
+        select_cache: int = SELECT_CACHE,
+        bloom: bool = False,
+    ) -> None:
+        """Membuka semua shard.
+
+        Urutan `uris` menentukan shard tempat suatu posisi disimpan, sehingga
+        harus selalu sama untuk kumpulan berkas yang sama.
+
+        Args:
+            uris: URI lokasi database untuk setiap shard.
+            minimal_depth: Nilai depth minimal agar analisa dapat disinggah.
+            zobrist: Membuat tabel board baru dalam mode Zobrist.
+            select_cache: Ukuran singgahan hasil select (byte); 0 untuk mematikan.
+            bloom: Memakai Bloom filter di setiap shard.
+        """
+
+        if not uris:
+            raise ValueError("Butuh minimal satu shard")
+
+        self.minimal_depth = minimal_depth
+        self.shards = [
+            Database(
+                uri,
+                minimal_depth=minimal_depth,
+                zobrist=zobrist,
+                select_cache=0,
+                bloom=bloom,
+            )
+            for uri in uris
+        ]
+        self._locks = [Lock() for _ in self.shards]  # satu penulis per shard
+        self._pool = ThreadPoolExecutor(len(self.shards), thread_name_prefix="shard")
+        self._cache = _SelectCache(select_cache)
+
+    def shard(self, efen: bytes) -> int:
+        "Nomor shard tempat posisi terenkode `efen` disimpan."
+        return zobrist_hash(efen) % len(self.shards)
+
+    def close(self) -> None:
+        "Menutup semua shard."
+        self._pool.shutdown()
+        for shard in self.shards:
+            shard.close()
+
+    def _data_changed(self) -> bool:
+        # semua shard diperiksa agar versi yang tercatat ikut diperbarui
+        return any([shard._data_changed() for shard in self.shards])
+
+    def _lookup(self, efens: list[bytes]) -> dict[bytes, dict[str, Any]]:
+        groups: dict[int, list[bytes]] = {}
+        for efen in efens:
+            groups.setdefault(self.shard(efen), []).append(efen)
+
+        if len(groups) == 1:
+            ((i, keys),) = groups.items()
+            return self.shards[i]._lookup(keys)
+
+        results = {}
+        for rows in self._pool.map(
+            lambda item: self.shards[item[0]]._lookup(item[1]), groups.items()
+        ):
+            results.update(rows)
+        return results
+
+    @contextmanager
+    def _locked(self, shards: Iterable[int]) -> Iterator[None]:
+        # kunci diambil berurutan menurut nomor shard agar tidak deadlock
+        with ExitStack() as stack:
+            for i in sorted(set(shards)):
+                stack.enter_context(self._locks[i])
+            yield
+
+    def _write(self, groups: dict[int, Rows]) -> None:
+        # setiap shard ditulis dalam transaksinya sendiri, secara paralel;
+        # pemanggil memegang `_locks` semua shard di `groups`
+        def write(item: tuple[int, Rows]) -> None:
+            i, rows = item
+            self.shards[i].write_rows(rows)
+
+        for _ in self._pool.map(write, groups.items()):
+            pass
+
+    def upsert(self, fen: str, info: Info) -> None:
+        """Menyimpan atau memperbarui info dari suatu posisi catur.
+
+        Aturannya sama dengan `Database.upsert`. Depth singgahan semua ply
+        dibaca sekaligus, lalu setiap shard yang terlibat ditulis dalam satu
+        transaksi. Kunci tulis shard-shard tersebut dipegang sejak pembacaan
+        sampai penulisan, sehingga `upsert` lain ke shard yang sama menunggu.
+        Transaksi di shard yang berbeda tidak atomik satu sama lain.
+
+        Args:
+            fen: Posisi catur dalam notasi FEN.
+            info: Hasil analisa dari posisi.
+        """
+
+        info_, iters, start = self._extrapolate(fen, info)
+        with self._locked(self.shard(efen) for efen, _ in iters):
+            rows = self._plan_rows(info_, iters, start)
+            if not rows:
+                return
+
+            groups: dict[int, Rows] = {}
+            for efen, row in rows.items():
+                groups.setdefault(self.shard(efen), []).append((efen, row))
+            self._write(groups)
+        # dibuang setelah semua shard selesai ditulis, lihat `Database.upsert`
+        self._cache.invalidate(rows)
+
+    def reset_db(self) -> None:
+        "Hapus seisi tabel board di semua shard"
+        for shard in self.shards:
+            shard.reset_db()
+        self._cache.clear()
+
+    def normalize_old_data(
+        self,
+        cutoff_score: int,
+        new_score: int,
+        chunk: int = NORMALIZE_CHUNK,
+        pause: float = 0.0,
+    ) -> int:
+        "Menjalankan `Database.normalize_old_data` di semua shard secara paralel."
+
+        # tanpa `_locks`: setiap potongan sudah ditulis di bawah kunci tulis shard
+        def normalize(shard: Database) -> int:
+            return shard.normalize_old_data(cutoff_score, new_score, chunk, pause)
+
+        # executor tersendiri: `_pool` tetap melayani `select` dan `upsert`
+        with ThreadPoolExecutor(len(self.shards), "normalize") as pool:
+            total = sum(pool.map(normalize, self.shards))
+        self._cache.clear()
+        return total
+
+
+def split_database(source: str, uris: list[str], batch: int = SPLIT_BATCH) -> int:
+    """Membagi database singgahan satu berkas ke beberapa shard.
+
+    Baris dibaca bertahap sebanyak `batch`, lalu ditulis ke shard masing-masing.
+    Jika shard sudah berisi, baris dengan depth yang lebih besar dipertahankan.
+    Mode Zobrist shard baru mengikuti database sumber. Menghasilkan banyak baris
+    yang dibaca.
+
+    Args:
+        source: URI database sumber.
+        uris: URI lokasi database untuk setiap shard.
+        batch: Banyak baris per transaksi.
+    """
+
+    src = Database(source, select_cache=0)
+    sharded = ShardedDatabase(uris, zobrist=src.zobrist, select_cache=0)
+    total = 0
+    try:
+        logger.info("Membagi database", extra={"source": source, "shards": len(uris)})
+        cur = src.reader().execute("SELECT fen, depth, score, move FROM board")
+        while rows := cur.fetchmany(batch):
+            groups: dict[int, Rows] = {}
+            for row in rows:
+                efen = row.pop("fen")
+                groups.setdefault(sharded.shard(efen), []).append((efen, row))
+            with sharded._locked(groups):
+                sharded._write(groups)
+
+            total += len(rows)
+            logger.info("Membagi database", extra={"rows": total})
+    finally:
+        sharded.close()
+        src.close()
+
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="sharded")
+    parser.add_argument("source", help="berkas database yang akan dibagi")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=SPLIT_BATCH)
+    args = parser.parse_args()
+
+    uris = shard_uris(args.source, args.shards)
+    split_database(args.source, uris, batch=args.batch)
+    print("\n".join(uris))
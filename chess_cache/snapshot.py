@@ -0,0 +1,219 @@
+"""
+Snapshot read-only dari database singgahan dalam satu berkas.
+
+Berkas snapshot berisi header 16 byte (`MAGIC` dan banyak rekaman), lalu
+rekaman-rekaman 16 byte `(key, depth, score, move)` yang terurut menurut `key`,
+yaitu `zobrist_hash` dari posisi terenkode. Berkas dibuka dengan `mmap`, dan
+pencarian dilakukan dengan binary search oleh NumPy tanpa SQLite, sehingga
+banyak proses dapat berbagi satu salinan berkas di page cache.
+
+Karena posisi hanya diwakili hash 64-bit, tabrakan hash (sangat jarang) tidak
+dapat dideteksi; pada tabrakan saat ekspor, posisi dengan depth terbesar yang
+disimpan.
+"""
+
+import mmap
+import os
+import sqlite3
+import struct
+from collections.abc import Iterator
+from tempfile import TemporaryDirectory
+from typing import Any
+
+import numpy as np
+
+from .core import SELECT_CACHE, Database, _BaseDatabase, _SelectCache, zobrist_hash
+from .logger import get_logger
+
+logger = get_logger("snapshot")
+
+MAGIC = b"CCSNAP1\x00"
+HEADER = struct.Struct("<8sQ")  # MAGIC, banyak rekaman
+RECORD = np.dtype(
+    [("key", "<i8"), ("depth", "<i2"), ("score", "<i2"), ("move", "<u2"), ("", "V2")]
+)
+NO_MOVE = 0xFFFF  # kolom move yang NULL
+EXPORT_CHUNK = 100_000  # banyak baris yang dibaca sekaligus saat ekspor
+MERGE_FAN = 64  # banyak berkas run yang digabungkan sekaligus saat ekspor
+
+
+def export_snapshot(db: Database, path: str, chunk: int = EXPORT_CHUNK) -> int:
+    """Menyimpan seluruh isi `db` sebagai berkas snapshot di `path`.
+
+    Berkas ditulis ke berkas sementara lalu diganti secara atomik, sehingga
+    proses yang sedang membuka snapshot lama tidak terganggu. Isi dibaca
+    melalui koneksi read-only (`Database.reader`), sehingga penulis lain tidak
+    tertahan. Pada mode non-Zobrist rekaman diurutkan di luar SQLite: tiap
+    potongan diurutkan dan disimpan ke berkas sementara di samping `path`,
+    lalu semua potongan digabungkan; memori yang dipakai sebanding dengan
+    `chunk`, bukan dengan besar database. Menghasilkan banyak rekaman yang
+    disimpan.
+
+    Args:
+        db: Database sumber.
+        path: Alamat berkas snapshot.
+        chunk: Banyak baris yang dibaca sekaligus.
+
+    Raises:
+        ValueError: Nilai depth, score, atau move tidak muat di rekaman.
+    """
+
+    db.flush()
+    conn = db.reader()
+
+    tmp = f"{path}.tmp"
+    count = 0
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, 0))
+        if db.zobrist:
+            # tabel sudah terurut menurut key (unik), tanpa perlu sort
+            cur = conn.execute("SELECT key, depth, score, move FROM board ORDER BY 1")
+            while rows := cur.fetchmany(chunk):
+                f.write(_records(rows).tobytes())
+                count += len(rows)
+        else:
+            with TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as d:
+                runs = _write_runs(conn, d, chunk)
+                # batasi banyak berkas yang terbuka sekaligus
+                while len(runs) > MERGE_FAN:
+                    groups = [
+                        runs[i : i + MERGE_FAN] for i in range(0, len(runs), MERGE_FAN)
+                    ]
+                    runs = []
+                    for group in groups:
+                        runs.append(f"{group[0]}m")
+                        with open(runs[-1], "wb") as run:
+                            for records in _merge_runs(group, chunk):
+                                records.tofile(run)
+                for records in _merge_runs(runs, chunk):
+                    f.write(records.tobytes())
+                    count += len(records)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, count))
+
+    os.replace(tmp, path)
+    logger.info("Snapshot disimpan", extra={"path": path, "records": count})
+    return count
+
+
+def _records(rows: list[dict[str, Any]]) -> np.ndarray:
+    # baris SQLite menjadi rekaman; nilai yang tidak muat di kolomnya ditolak,
+    # bukan dipotong diam-diam oleh NumPy
+    records = np.zeros(len(rows), RECORD)
+    records["key"] = [row["key"] for row in rows]
+    for name in ("depth", "score", "move"):
+        values = [row[name] for row in rows]
+        if name == "move":
+            values = [NO_MOVE if move is None else move for move in values]
+        values = np.array(values, np.int64)
+        limits = np.iinfo(RECORD[name])
+        if len(values) and (values.min() < limits.min or values.max() > limits.max):
+            raise ValueError(f"Nilai {name} di luar jangkauan snapshot")
+        records[name] = values
+    return records
+
+
+def _unique(records: np.ndarray) -> np.ndarray:
+    # urutkan menurut key lalu depth terbesar; pada tabrakan hash
+    # pertahankan rekaman pertama (depth terbesar)
+    records = records[np.lexsort((-records["depth"].astype(np.int32), records["key"]))]
+    keep = np.ones(len(records), bool)
+    keep[1:] = records["key"][1:] != records["key"][:-1]
+    return records[keep]
+
+
+def _write_runs(conn: sqlite3.Connection, directory: str, chunk: int) -> list[str]:
+    # setiap potongan tabel board diurutkan dan disimpan sebagai satu run
+    cur = conn.execute("SELECT zobrist(fen) AS key, depth, score, move FROM board")
+    runs = []
+    while rows := cur.fetchmany(chunk):
+        run = os.path.join(directory, f"run{len(runs)}")
+        _unique(_records(rows)).tofile(run)
+        runs.append(run)
+    return runs
+
+
+def _merge_runs(runs: list[str], chunk: int) -> Iterator[np.ndarray]:
+    # penggabungan k-arah: dari setiap run dimuat satu blok; semua rekaman
+    # dengan key sampai key terakhir terkecil di antara blok-blok itu sudah
+    # lengkap (key unik di dalam satu run), sehingga dapat ditulis
+    block = max(1, chunk // max(1, len(runs)))
+    files = [open(run, "rb") for run in runs]
+    try:
+        buffers = [np.fromfile(f, RECORD, count=block) for f in files]
+        while True:
+            active = [i for i, buf in enumerate(buffers) if len(buf)]
+            if not active:
+                return
+            bound = min(buffers[i]["key"][-1] for i in active)
+            parts = []
+            for i in active:
+                cut = int(np.searchsorted(buffers[i]["key"], bound, side="right"))
+                parts.append(buffers[i][:cut])
+                buffers[i] = buffers[i][cut:]
+                if not len(buffers[i]):
+                    buffers[i] = np.fromfile(files[i], RECORD, count=block)
+            yield _unique(np.concatenate(parts))
+    finally:
+        for f in files:
+            f.close()
+        for run in runs:
+            os.remove(run)
+
+
+class Snapshot(_BaseDatabase):
+    """Backend read-only untuk `select`, dari berkas hasil `export_snapshot`.
+
+    Attributes:
+        count: Banyak rekaman di snapshot.
+    """
+
+    def __init__(self, path: str, select_cache: int = SELECT_CACHE) -> None:
+        """Membuka berkas snapshot dengan `mmap`.
+
+        Args:
+            path: Alamat berkas snapshot.
+            select_cache: Ukuran singgahan hasil select (byte); 0 untuk mematikan.
+        """
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError("Bukan berkas snapshot")
+
+        self._records = np.frombuffer(
+            self._mmap, RECORD, count=self.count, offset=HEADER.size
+        )
+        self._keys = self._records["key"]
+        self._cache = _SelectCache(select_cache)
+
+    def close(self) -> None:
+        "Menutup berkas snapshot."
+        # view NumPy harus dilepas sebelum mmap dapat ditutup
+        del self._records, self._keys
+        self._mmap.close()
+
+    def _lookup(self, efens: list[bytes]) -> dict[bytes, dict[str, Any]]:
+        if not efens or not self.count:
+            return {}
+
+        keys = np.array([zobrist_hash(efen) for efen in efens], np.int64)
+        index = np.minimum(np.searchsorted(self._keys, keys), self.count - 1)
+        found = self._records[index]
+
+        results = {}
+        for efen, hit, depth, score, move in zip(
+            efens,
+            (found["key"] == keys).tolist(),
+            found["depth"].tolist(),
+            found["score"].tolist(),
+            found["move"].tolist(),
+        ):
+            if hit:
+                move = None if move == NO_MOVE else move
+                results[efen] = {"depth": depth, "score": score, "move": move}
+        return results
@@ -25,9 +25,9 @@ board.enableMoveInput((event) => {
             promotePawn(event, game.turn(), move);
         }
 
-        var solution = data.answers[0]
-        var submitted = move.from + move.to + (solution.length == 4 ? '' : move.promotion)
-        if (submitted != solution) {
+        var correct = data.answers.some((solution) =>
+            move.from + move.to + (solution.length == 4 ? '' : move.promotion) == solution)
+        if (!correct) {
             game.undo()
             return false
         }
@@ -1,7 +1,14 @@
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from chess_cache.core import STARTING_FEN, Database, Engine
 from chess_cache.env import Env
+from chess_cache.position import Position, move_uci
 
 env = Env()
 
@@ -77,6 +84,561 @@ def test_reset_db(db_file, db_memory_full):
     assert cur.fetchone()["total"] == 0
 
 
+def test_zobrist(tmp_path):
+    infos = [
+        {"multipv": 1, "depth": 20, "score": 30, "pv": ["e2e4", "e7e5", "g1f3"]},
+        {"multipv": 2, "depth": 20, "score": 10, "pv": ["d2d4", "d7d5"]},
+    ]
+    dbs = [
+        Database(f"file:///{tmp_path}/blob.sqlite"),
+        Database(f"file:///{tmp_path}/zobrist.sqlite", zobrist=True),
+        Database(f"file:///{tmp_path}/migrated.sqlite"),
+    ]
+    try:
+        for db in dbs:
+            for info in infos:
+                db.upsert(STARTING_FEN, info)
+        dbs[2].migrate_zobrist()
+
+        assert [db.zobrist for db in dbs] == [False, True, True]
+        results = [db.select(STARTING_FEN, max_depth=5) for db in dbs]
+        assert results[0] == results[1] == results[2]
+        assert len(results[0]) == 2
+    finally:
+        for db in dbs:
+            db.close()
+
+    # mode dibaca dari skema, bukan dari argumen
+    db = Database(f"file:///{tmp_path}/migrated.sqlite")
+    assert db.zobrist
+    db.close()
+
+
+def test_select_children(db_memory_empty):
+    db = db_memory_empty
+    infos = [
+        {"multipv": 1, "depth": 20, "score": 30, "pv": ["e2e4", "e7e5"]},
+        {"multipv": 2, "depth": 20, "score": 10, "pv": ["d2d4", "d7d5"]},
+        {"multipv": 3, "depth": 20, "score": 20, "pv": ["c2c4", "e7e5"]},
+    ]
+    for info in infos:
+        db.upsert(STARTING_FEN, info)
+
+    # posisi dan semua anaknya diambil dengan satu query
+    queries = []
+    db.sql.set_trace_callback(queries.append)
+    results = db.select(STARTING_FEN, max_depth=0)
+    db.sql.set_trace_callback(None)
+    assert len(queries) == 1
+
+    assert [info["pv"] for info in results] == [[], ["e2e4"], ["c2c4"], ["d2d4"]]
+    assert [info["multipv"] for info in results] == [1, 2, 3, 4]
+
+
+def test_select_pv_batched(db_memory_empty):
+    db = db_memory_empty
+    infos = [
+        {
+            "multipv": 1,
+            "depth": 20,
+            "score": 30,
+            "pv": ["e2e4", "e7e5", "g1f3", "b8c6"],
+        },
+        {"multipv": 2, "depth": 20, "score": 10, "pv": ["d2d4", "d7d5", "c2c4"]},
+        # kuda bolak-balik: PV harus berhenti saat posisi berulang
+        {
+            "multipv": 3,
+            "depth": 20,
+            "score": 0,
+            "pv": ["g1f3", "g8f6", "f3g1", "f6g8", "g1f3"],
+        },
+    ]
+    for info in infos:
+        db.upsert(STARTING_FEN, info)
+
+    # satu query untuk posisi dan anaknya, lalu satu query per ply
+    queries = []
+    db.sql.set_trace_callback(queries.append)
+    results = db.select(STARTING_FEN, max_depth=10)
+    db.sql.set_trace_callback(None)
+    assert len(queries) == 1 + 5
+
+    assert [info["pv"] for info in results] == [
+        ["e2e4", "e7e5", "g1f3", "b8c6"],
+        ["d2d4", "d7d5", "c2c4"],
+        ["g1f3", "g8f6", "f3g1", "f6g8"],
+    ]
+
+
+def test_reader(db_file, db_memory_empty):
+    info = {"multipv": 1, "depth": 20, "score": 30, "pv": ["e2e4", "e7e5"]}
+    db_file.upsert(STARTING_FEN, info)
+
+    # satu koneksi read-only per thread, terpisah dari koneksi penulis
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        readers = set(pool.map(lambda _: id(db_file.reader()), range(16)))
+        results = list(pool.map(lambda _: db_file.select(STARTING_FEN), range(4)))
+    assert id(db_file.sql) not in readers
+    assert 1 <= len(readers) <= 4
+    assert all(result == results[0] for result in results)
+    assert results[0][0]["pv"] == ["e2e4"]
+
+    with pytest.raises(sqlite3.OperationalError):
+        db_file.reader().execute("DELETE FROM board")
+
+    # database di memori hanya punya satu koneksi
+    assert db_memory_empty.reader() is db_memory_empty.sql
+
+
+def _random_infos(seed, games=30):
+    # info acak dari permainan acak, beserta posisi asalnya
+    rng = random.Random(seed)
+    infos = []
+    for _ in range(games):
+        board = Position()
+        for _ in range(rng.randint(1, 20)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            for multipv in range(1, rng.randint(2, 4)):
+                line, pv = board.copy(), []
+                for _ in range(rng.randint(1, 8)):
+                    replies = list(line.legal_moves)
+                    if not replies:
+                        break
+                    move = rng.choice(replies)
+                    pv.append(move_uci(move))
+                    line.push(move)
+                info = {
+                    "multipv": multipv,
+                    "depth": rng.randint(1, 25),
+                    "score": rng.randint(-300, 300),
+                    "pv": pv,
+                }
+                infos.append((board.fen(), info))
+            board.push(rng.choice(moves))
+    return infos
+
+
+def test_write_behind():
+    direct = Database(":memory:", minimal_depth=3)
+    deferred = Database(
+        ":memory:", minimal_depth=3, write_behind=10**6, flush_interval=float("inf")
+    )
+    stt = "SELECT * FROM board ORDER BY fen"
+
+    try:
+        infos = _random_infos(seed=7)
+        for fen, info in infos:
+            direct.upsert(fen, info)
+            deferred.upsert(fen, info)
+
+        # belum ada yang ditulis, tetapi select sudah melihat semuanya
+        assert deferred.sql.execute(stt).fetchall() == []
+        assert deferred.stats()["upsert"]["written"] == 0
+        for fen, _ in infos:
+            assert direct.select(fen, max_depth=5) == deferred.select(fen, max_depth=5)
+
+        deferred.flush()
+        assert not deferred._pending
+        stats = deferred.stats()
+        assert stats["upsert"]["written"] == stats["rows"] > 0
+        assert (
+            direct.sql.execute(stt).fetchall() == deferred.sql.execute(stt).fetchall()
+        )
+    finally:
+        direct.close()
+        deferred.close()
+
+
+def test_write_behind_idle_flush():
+    db = Database(":memory:", minimal_depth=3, write_behind=10**6, flush_interval=0.05)
+    info = {"multipv": 1, "depth": 20, "score": 30, "pv": ["e2e4", "e7e5"]}
+    try:
+        # tanpa upsert lagi, baris tertunda tetap ditulis oleh thread latar
+        db.upsert(STARTING_FEN, info)
+        deadline = time.monotonic() + 5
+        while db._pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not db._pending
+        assert len(db.sql.execute("SELECT * FROM board").fetchall()) == 2
+    finally:
+        db.close()
+
+
+def _upsert_loop(db, fen, info):
+    # implementasi lama `upsert`: baca depth tiap ply, lalu tulis satu per satu
+    stt_info = f"SELECT depth FROM board WHERE {db._match}"
+    stt_upsert = f"""
+        INSERT INTO board ({db._columns}, depth, score, move)
+        VALUES ({':key, ' if db.zobrist else ''}:fen, :depth, :score, :move)
+        {db._conflict} DO UPDATE SET
+            depth = excluded.depth,
+            score = excluded.score,
+            move  = excluded.move
+        WHERE fen = excluded.fen
+    """
+    info_, iters, start = db._extrapolate(fen, info)
+    for num, (efen, move) in enumerate(iters, start=start):
+        if info_["depth"] < db.minimal_depth:
+            break
+        key = db._key(efen)
+        old_depth = (db.sql.execute(stt_info, key).fetchone() or {"depth": 0})["depth"]
+        if old_depth > info_["depth"] or (old_depth == info_["depth"] and num != 0):
+            break
+        info_.update(key, move=move)
+        db.sql.execute(stt_upsert, info_)
+        info_["score"] *= -1
+        info_["depth"] -= 1
+
+
+@pytest.mark.parametrize("zobrist", [False, True])
+def test_upsert_matches_loop(zobrist):
+    expected = Database(":memory:", minimal_depth=3, zobrist=zobrist)
+    actual = Database(":memory:", minimal_depth=3, zobrist=zobrist)
+    stt = "SELECT * FROM board ORDER BY fen"
+
+    # kuda bolak-balik: PV melewati posisi yang sama dua kali
+    repetition = ["g1f3", "g8f6", "f3g1", "f6g8", "g1f3", "g8f6"]
+    infos = [(STARTING_FEN, {"multipv": 1, "depth": 20, "score": 5, "pv": repetition})]
+    infos += _random_infos(seed=3) + _random_infos(seed=5)
+    try:
+        for fen, info in infos:
+            _upsert_loop(expected, fen, info)
+            actual.upsert(fen, info)
+        assert (
+            expected.sql.execute(stt).fetchall() == actual.sql.execute(stt).fetchall()
+        )
+    finally:
+        expected.close()
+        actual.close()
+
+
+def test_select_cache(db_memory_empty):
+    db = db_memory_empty
+    info = {"multipv": 1, "depth": 20, "score": 30, "pv": ["e2e4", "e7e5"]}
+    db.upsert(STARTING_FEN, info)
+    results = db.select(STARTING_FEN)
+
+    # hasil yang sama tanpa SQL; mengubah hasil tidak mengubah singgahan
+    queries = []
+    db.sql.set_trace_callback(queries.append)
+    cached = db.select(STARTING_FEN)
+    cached[0]["pv"].append("g1f3")
+    assert db.select(STARTING_FEN) == results
+    db.sql.set_trace_callback(None)
+    assert queries == []
+    assert db.cache_info()["hits"] == 2
+
+    # menulis ke anak membuang singgahan induknya
+    after_c4 = "rnbqkbnr/pppppppp/8/8/2P5/8/PP1PPPPP/RNBQKBNR b KQkq - 0 1"
+    after_d4 = "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq - 0 1"
+    db.select(after_d4)
+    db.upsert(after_c4, {"multipv": 1, "depth": 25, "score": -10, "pv": ["e7e5"]})
+    assert db.cache_info()["entries"] == 1  # singgahan after_d4 tetap ada
+    results = db.select(STARTING_FEN)
+    assert [info["pv"] for info in results] == [["e2e4"], ["c2c4"]]
+    assert results[1]["depth"] == 26
+
+
+@pytest.mark.parametrize("write_behind", [0, 1])
+def test_select_cache_during_write(write_behind):
+    db = Database(":memory:", minimal_depth=3, write_behind=write_behind)
+    info = {"multipv": 1, "depth": 20, "score": 30, "pv": ["e2e4", "e7e5"]}
+    db.upsert(STARTING_FEN, info)
+    db.flush()
+
+    # select tepat sebelum baris ditulis, saat basis data masih berisi baris lama
+    bloom_add = db._bloom_add
+
+    def select_then_add(efens):
+        db.select(STARTING_FEN)
+        bloom_add(efens)
+
+    db._bloom_add = select_then_add
+    try:
+        db.upsert(STARTING_FEN, dict(info, depth=25))
+        db.flush()
+        db._bloom_add = bloom_add
+        assert db.select(STARTING_FEN)[0]["depth"] == 25
+    finally:
+        db.close()
+
+
+def test_select_cache_other_writer(tmp_path):
+    path = f"{tmp_path}/test.sqlite"
+    db, other = Database(path), Database(path, select_cache=0)
+    info = {"multipv": 1, "depth": 20, "score": 30, "pv": ["e2e4", "e7e5"]}
+    try:
+        # hasil kosong juga disinggah
+        assert db.select(STARTING_FEN) == []
+        other.upsert(STARTING_FEN, info)
+        assert db.select(STARTING_FEN)[0]["depth"] == 20
+
+        # penulisan sendiri tetap membuang singgahan secara tertarget
+        after_d4 = "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq - 0 1"
+        db.select(after_d4)
+        db.upsert(STARTING_FEN, dict(info, depth=22))
+        assert db.select(STARTING_FEN)[0]["depth"] == 22
+        assert db.cache_info()["entries"] == 2
+
+        other.upsert(STARTING_FEN, dict(info, depth=25))
+        assert db.select(STARTING_FEN)[0]["depth"] == 25
+        assert db.cache_info()["entries"] == 1
+    finally:
+        db.close()
+        other.close()
+
+
+def test_select_cache_matches_uncached():
+    cached = Database(":memory:", minimal_depth=3)
+    uncached = Database(":memory:", minimal_depth=3, select_cache=0)
+
+    try:
+        # select di sela-sela upsert, agar singgahan harus sering dibuang
+        fens = []
+        for fen, info in _random_infos(seed=11, games=8):
+            fens.append(fen)
+            cached.upsert(fen, info)
+            uncached.upsert(fen, info)
+            for fen in fens[-5:] + [STARTING_FEN]:
+                assert cached.select(fen, max_depth=5) == uncached.select(
+                    fen, max_depth=5
+                )
+        assert cached.cache_info()["hits"] > 0
+        assert uncached.cache_info()["hits"] == 0
+    finally:
+        cached.close()
+        uncached.close()
+
+
+def test_evict(tmp_path):
+    db = Database(f"{tmp_path}/test.sqlite", max_rows=10, evict_interval=3600)
+    try:
+        for fen, info in _random_infos(seed=3, games=3):
+            db.upsert(fen, info)
+        db._flush_touched()
+        db.sql.execute("UPDATE board SET epoch = 0")  # semuanya dingin
+
+        # posisi yang baru saja ditulis dan dibaca harus bertahan
+        board = Position()
+        info = {"multipv": 1, "depth": 30, "score": 30, "pv": ["e2e4", "e7e5"]}
+        db.upsert(board.fen(), info)
+        db.select(board.fen())
+        db._flush_touched()
+
+        stt = "SELECT fen, epoch, depth FROM board"
+        before = db.sql.execute(stt).fetchall()
+        assert len(before) > 10
+        assert db.evict() == len(before) - 10
+        assert db.evict() == 0
+
+        # di antara posisi dingin, yang paling dangkal dibuang lebih dulu
+        after = db.sql.execute(stt).fetchall()
+        evicted = [row for row in before if row not in after]
+        assert all(row["epoch"] == 0 for row in evicted)
+        kept = [row["depth"] for row in after if row["epoch"] == 0]
+        assert max(row["depth"] for row in evicted) <= min(kept, default=99)
+
+        results = db.select(board.fen(), max_depth=2)
+        assert results[0]["pv"] == ["e2e4", "e7e5"]
+    finally:
+        db.close()
+
+
+def test_sample():
+    db = Database(":memory:")
+    try:
+        assert db.sample(-100, 100) is None
+
+        board = Position()
+        fens = {}
+        for move in list(board.legal_moves)[:12]:
+            child = board.copy()
+            child.push(move)
+            score = len(fens) * 20 - 100
+            pv = [move_uci(next(iter(child.legal_moves)))]
+            info = {"multipv": 1, "depth": 35, "score": score, "pv": pv}
+            db.upsert(child.fen(), info)
+            fens[child.epd()] = score
+        db.upsert(STARTING_FEN, {"multipv": 1, "depth": 30, "score": 0, "pv": ["e2e4"]})
+
+        assert db.refresh_quiz() == 12
+        assert db.refresh_quiz(depth=30) == 1
+        assert db.sample(-100, 100, depth=30) == board.epd()
+        assert db.sample(500, 600) is None
+
+        expected = {fen for fen, score in fens.items() if -30 <= score <= 50}
+        seen = {db.sample(-30, 50) for _ in range(200)}
+        assert seen == expected
+
+        # dibaca per 5 baris; sampel dibatasi menjadi setiap posisi ke-3
+        assert db.refresh_quiz(chunk=5) == 12
+        assert {db.sample(-30, 50) for _ in range(200)} == expected
+        assert db.refresh_quiz(limit=4, chunk=5) == 4
+        cur = db.sql.execute("SELECT score FROM quiz WHERE depth = 35 ORDER BY rank")
+        scores = [row["score"] for row in cur]
+        assert [b - a for a, b in zip(scores, scores[1:])] == [60, 60, 60]
+    finally:
+        db.close()
+
+
+def test_bloom(tmp_path):
+    path = f"{tmp_path}/test.sqlite"
+    plain = Database(":memory:", select_cache=0)
+    db = Database(path, select_cache=0, bloom=True)
+    infos = _random_infos(seed=4, games=10)
+    try:
+        for fen, info in infos:
+            plain.upsert(fen, info)
+            db.upsert(fen, info)
+        for fen, _ in infos:
+            assert db.select(fen, max_depth=5) == plain.select(fen, max_depth=5)
+
+        stats = db.bloom_info()
+        assert stats["skipped"] > 0
+        assert stats["bytes"] > 0 and 0 <= stats["false_positive_rate"] < 0.01
+    finally:
+        db.close()
+
+    # filter dibaca dari berkas, lalu berkasnya dihapus
+    db = Database(path, select_cache=0, bloom=True)
+    try:
+        assert not os.path.exists(f"{path}.bloom")
+        assert db.select(STARTING_FEN, max_depth=5) == plain.select(
+            STARTING_FEN, max_depth=5
+        )
+    finally:
+        db.close()
+
+    # penulisan tanpa filter membuat berkasnya usang
+    db = Database(path, select_cache=0)
+    fen, info = _random_infos(seed=5, games=1)[0]
+    info = dict(info, depth=99)
+    db.upsert(fen, info)
+    plain.upsert(fen, info)
+    db.close()
+
+    db = Database(path, select_cache=0, bloom=True)
+    try:
+        assert db.select(fen, max_depth=5) == plain.select(fen, max_depth=5)
+    finally:
+        db.close()
+        plain.close()
+
+
+@pytest.mark.parametrize("zobrist", [False, True])
+def test_normalize_old_data_chunked(zobrist):
+    db = Database(":memory:", zobrist=zobrist)
+    try:
+        for fen, info in _random_infos(seed=6, games=10):
+            db.upsert(fen, dict(info, depth=info["depth"] + 10))
+        before = db.select(STARTING_FEN, max_depth=3)
+
+        stt = "SELECT COUNT(*) AS n FROM board WHERE depth > 20"
+        total = db.sql.execute(stt).fetchone()["n"]
+        assert total > 5
+
+        calls = []
+        done = db.normalize_old_data(
+            20, 15, chunk=5, progress=lambda *_: calls.append(_)
+        )
+        assert done == total
+        assert calls[-1] == (total, total) and len(calls) == -(-total // 5)
+        assert db.sql.execute(stt).fetchone()["n"] == 0
+
+        # hasil select yang disinggah ikut diperbarui
+        after = db.select(STARTING_FEN, max_depth=3)
+        depth = before[0]["depth"]
+        assert after[0]["depth"] == (15 if depth > 20 else depth)
+        assert db.normalize_old_data(20, 15) == 0
+    finally:
+        db.close()
+
+
+def test_maintenance(tmp_path):
+    db = Database(
+        f"{tmp_path}/test.sqlite",
+        maintenance=0.01,
+        checkpoint_pages=1,
+        idle_seconds=0.05,
+        optimize_interval=0.05,
+    )
+    try:
+        for fen, info in _random_infos(seed=7, games=5):
+            db.upsert(fen, info)
+        time.sleep(0.3)
+
+        stats = db.maintenance_info()
+        assert stats["write"]["runs"] > 0
+        assert stats["write"]["p50"] <= stats["write"]["p99"] <= stats["write"]["max"]
+        assert stats["checkpoint_restart"]["runs"] >= 1
+        assert stats["optimize"]["runs"] >= 1
+
+        # semua isi WAL sudah dipindahkan ke berkas database
+        wal = db.sql.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        assert wal["log"] == wal["checkpointed"]
+        assert db.sql.execute("PRAGMA wal_autocheckpoint").fetchone() == {
+            "wal_autocheckpoint": 0
+        }
+    finally:
+        db.close()
+
+
+def test_migrate_incremental_vacuum(tmp_path):
+    # database lama: tabel sudah dibuat sebelum auto_vacuum incremental dipakai
+    path = f"{tmp_path}/test.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE old (x)")
+    conn.close()
+
+    db = Database(path, maintenance=0.01)
+    try:
+        assert db.sql.execute("PRAGMA auto_vacuum").fetchone()["auto_vacuum"] == 0
+        for fen, info in _random_infos(seed=7, games=5):
+            db.upsert(fen, info)
+        rows = db.sql.execute("SELECT * FROM board ORDER BY fen").fetchall()
+
+        db.migrate_incremental_vacuum()
+        assert db.sql.execute("PRAGMA auto_vacuum").fetchone()["auto_vacuum"] == 2
+        assert db.sql.execute("SELECT * FROM board ORDER BY fen").fetchall() == rows
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("zobrist", [False, True])
+def test_stats(tmp_path, zobrist):
+    db = Database(f"{tmp_path}/test.sqlite", zobrist=zobrist)
+    try:
+        for fen, info in _random_infos(seed=8, games=10):
+            db.upsert(fen, info)
+        db.select(STARTING_FEN)
+        db.select(STARTING_FEN)
+        db.select(STARTING_FEN, only_best=True, max_depth=0)
+        db.normalize_old_data(cutoff_score=15, new_score=12)
+        if not zobrist:
+            db.migrate_zobrist()
+
+        def depths():
+            cur = db.sql.execute("SELECT depth, COUNT(*) AS n FROM board GROUP BY 1")
+            return {row["depth"]: row["n"] for row in cur.fetchall()}
+
+        stats = db.stats()
+        assert stats["depths"] == depths()
+        assert stats["rows"] == sum(depths().values())
+        assert stats["files"]["database"] > 0
+        assert stats["select"]["all/1"] == {"hits": 1, "misses": 1}
+        assert stats["select"]["best/0"] == {"hits": 0, "misses": 1}
+
+        upsert = stats["upsert"]
+        assert upsert["calls"] == len(_random_infos(seed=8, games=10))
+        assert upsert["written"] + upsert["skipped"] == upsert["plies"] > 0
+        assert upsert["written"] >= stats["rows"]
+        assert stats["timings"]["lookup"]["mean"] > 0
+    finally:
+        db.close()
+
+
 def test_normalize_old_data():
     DEPTH = 20
     ae = Engine(engine_path=env.get("ENGINE_PATH"), database_path=":memory:")
@@ -95,6 +95,30 @@ def test_batch_analysis(ae_file_empty):
         assert result[0]["depth"] == 10
 
 
+def test_put_many(ae_file_empty):
+    engine = ae_file_empty
+    board = Board()
+    cached = []
+    for uci in ["e2e4", "e7e5", "g1f3"]:
+        board.push_uci(uci)
+        cached.append(board.fen())
+        pv = [next(iter(board.legal_moves)).uci()]
+        info = {"multipv": 1, "depth": 12, "score": 0, "pv": pv}
+        engine.db.upsert(board.fen(), info)
+    engine.db.flush()
+
+    # posisi yang sudah dianalisa cukup dalam tidak masuk antrian
+    fens = cached + [Board().fen()]
+    assert engine.put_many(fens, depth=12, batch=2) == 3
+    assert engine.put_many(cached, depth=13) == 0
+    # FEN yang tidak valid dilewati tanpa menghentikan posisi lainnya
+    assert engine.put_many(["bukan FEN"] + cached, depth=12, batch=2) == 4
+    engine.wait()
+
+    for fen in fens:
+        assert engine.info(fen, only_best=True)[0]["depth"] >= 12
+
+
 def test_insane_config_on_empty(ae_file_empty):
     engine = ae_file_empty
     fen = Board().fen()
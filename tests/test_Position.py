@@ -0,0 +1,103 @@
+import random
+
+import pytest
+from chess import Board
+
+from chess_cache.core import STARTING_FEN, encode_fen
+from chess_cache.position import Position, move_uci, perft
+
+# https://www.chessprogramming.org/Perft_Results
+PERFT = [
+    (STARTING_FEN, [20, 400, 8902]),
+    (
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039, 97862],
+    ),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238]),
+    (
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467],
+    ),
+    ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379]),
+    (
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079, 89890],
+    ),
+]
+
+
+@pytest.mark.parametrize("fen,counts", PERFT)
+def test_perft(fen, counts):
+    position = Position(fen)
+    for depth, count in enumerate(counts, start=1):
+        assert perft(position, depth) == count
+
+
+def test_random_games():
+    # bandingkan dengan python-chess di sepanjang permainan acak
+    rng = random.Random(42)
+    for _ in range(50):
+        board, position = Board(), Position()
+        for _ in range(rng.randint(1, 150)):
+            moves = sorted(move.uci() for move in board.legal_moves)
+            assert sorted(move_uci(m) for m in position.legal_moves) == moves
+            assert position.fen() == board.fen()
+            assert position.encode() == encode_fen(board.epd())
+            if not moves:
+                break
+            uci = rng.choice(moves)
+            board.push_uci(uci)
+            position.push_uci(uci)
+
+
+def test_san():
+    # setiap langkah legal di permainan acak, dalam notasi SAN python-chess
+    rng = random.Random(7)
+    for _ in range(30):
+        board, position = Board(), Position()
+        for _ in range(rng.randint(1, 150)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            for move in moves:
+                assert move_uci(position.parse_san(board.san(move))) == move.uci()
+            san = board.san(rng.choice(moves))
+            board.push_san(san)
+            position.push_san(san)
+            assert position.fen() == board.fen()
+
+    position = Position("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    assert move_uci(position.parse_san("0-0-0+")) == "e1c1"
+    for san in ["e5", "Nd2", "e8=Q", "O-O", "Kxe2", "xyz", ""]:
+        with pytest.raises(ValueError):
+            Position().parse_san(san)
+    with pytest.raises(ValueError):
+        # ambigu: kedua kuda dapat ke d2
+        Position("4k3/8/8/8/8/8/8/1N2KN2 w - - 0 1").parse_san("Nd2")
+
+
+@pytest.mark.parametrize(
+    "fen",
+    [
+        # en passant legal, ilegal karena pin, dan tanpa pion pemakan
+        "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+        "8/8/8/K2pP2r/8/8/8/7k w - d6 0 1",
+        "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2",
+        # dua pion di file en passant (1. e4 c5 2. e5 d5)
+        "rnbqkbnr/pp2pppp/8/2ppP3/8/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 3",
+        # hak rokade yang tidak sesuai letak benteng diabaikan
+        "r3k3/8/8/8/8/8/8/4K2R w KQkq - 0 1",
+    ],
+)
+def test_epd(fen):
+    assert Position(fen).epd() == Board(fen).epd()
+    assert Position(fen).encode() == encode_fen(Board(fen).epd())
+
+
+def test_illegal_moves():
+    position = Position()
+    for uci in ["e2e5", "e1g1", "a7a6", "e2e4q", "h8h8", "z9a1", ""]:
+        with pytest.raises(ValueError):
+            position.push_uci(uci)
+    with pytest.raises(ValueError):
+        Position("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1")
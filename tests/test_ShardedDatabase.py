@@ -0,0 +1,137 @@
+import random
+from threading import Thread
+
+import pytest
+
+from chess_cache.core import STARTING_FEN, Database
+from chess_cache.position import Position, move_uci
+from chess_cache.sharded import ShardedDatabase, shard_uris, split_database
+
+
+def _random_infos(seed, games=15):
+    rng = random.Random(seed)
+    infos = []
+    for _ in range(games):
+        board = Position()
+        for _ in range(rng.randint(1, 15)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            line, pv = board.copy(), []
+            for _ in range(rng.randint(1, 8)):
+                replies = list(line.legal_moves)
+                if not replies:
+                    break
+                move = rng.choice(replies)
+                pv.append(move_uci(move))
+                line.push(move)
+            info = {
+                "multipv": rng.randint(1, 3),
+                "depth": rng.randint(1, 25),
+                "score": rng.randint(-300, 300),
+                "pv": pv,
+            }
+            infos.append((board.fen(), info))
+            board.push(rng.choice(moves))
+    return infos
+
+
+def _rows(db):
+    return db.sql.execute("SELECT fen, depth, score, move FROM board").fetchall()
+
+
+@pytest.mark.parametrize("zobrist", [False, True])
+def test_same_as_database(tmp_path, zobrist):
+    single = Database(":memory:", minimal_depth=3)
+    uris = shard_uris(f"{tmp_path}/cache.sqlite", 3)
+    sharded = ShardedDatabase(uris, minimal_depth=3, zobrist=zobrist)
+
+    try:
+        infos = _random_infos(seed=1)
+        for fen, info in infos:
+            single.upsert(fen, info)
+            sharded.upsert(fen, info)
+
+        for fen, _ in infos:
+            for only_best in (True, False):
+                expected = single.select(fen, only_best=only_best, max_depth=5)
+                assert sharded.select(fen, only_best=only_best, max_depth=5) == expected
+
+        # setiap posisi ada di tepat satu shard, yaitu shard miliknya
+        rows = [row for shard in sharded.shards for row in _rows(shard)]
+        assert sorted(map(str, rows)) == sorted(map(str, _rows(single)))
+        for i, shard in enumerate(sharded.shards):
+            assert all(sharded.shard(row["fen"]) == i for row in _rows(shard))
+        assert all(_rows(shard) for shard in sharded.shards)
+    finally:
+        single.close()
+        sharded.close()
+
+
+def test_select_cache_during_write(tmp_path):
+    sharded = ShardedDatabase(shard_uris(f"{tmp_path}/cache.sqlite", 2))
+    info = {"multipv": 1, "depth": 20, "score": 30, "pv": ["e2e4", "e7e5"]}
+    write = sharded._write
+
+    def select_then_write(groups):
+        # select saat shard masih berisi baris lama
+        sharded.select(STARTING_FEN)
+        write(groups)
+
+    try:
+        sharded.upsert(STARTING_FEN, info)
+        sharded._write = select_then_write
+        sharded.upsert(STARTING_FEN, dict(info, depth=25))
+        assert sharded.select(STARTING_FEN)[0]["depth"] == 25
+    finally:
+        sharded.close()
+
+
+def test_upsert_atomic(tmp_path):
+    sharded = ShardedDatabase(shard_uris(f"{tmp_path}/cache.sqlite", 2))
+    board = Position()
+    board.push_uci("e2e4")
+    after_e4 = board.fen()
+    lookup = sharded._lookup
+    other = Thread(
+        target=sharded.upsert,
+        args=(after_e4, {"multipv": 1, "depth": 19, "score": 0, "pv": ["e7e5"]}),
+    )
+
+    def lookup_then_upsert(efens):
+        # upsert lain ke posisi yang sama, di antara pembacaan dan penulisan
+        rows = lookup(efens)
+        if other.ident is None:
+            other.start()
+            other.join(timeout=0.2)
+        return rows
+
+    sharded._lookup = lookup_then_upsert
+    try:
+        info = {"multipv": 1, "depth": 20, "score": 30, "pv": ["e2e4", "c7c5"]}
+        sharded.upsert(STARTING_FEN, info)
+        other.join()
+        # hasilnya sama dengan kedua upsert dijalankan berurutan
+        assert sharded.select(after_e4, only_best=True)[0]["pv"] == ["e7e5"]
+    finally:
+        sharded.close()
+
+
+def test_split_database(tmp_path):
+    source = f"{tmp_path}/cache.sqlite"
+    db = Database(source)
+    for fen, info in _random_infos(seed=2):
+        db.upsert(fen, info)
+    expected = db.select(STARTING_FEN, max_depth=5)
+    total = len(_rows(db))
+    db.close()
+
+    uris = shard_uris(source, 4)
+    assert split_database(source, uris, batch=100) == total
+
+    sharded = ShardedDatabase(uris)
+    try:
+        assert sum(len(_rows(shard)) for shard in sharded.shards) == total
+        assert sharded.select(STARTING_FEN, max_depth=5) == expected
+    finally:
+        sharded.close()
@@ -0,0 +1,23 @@
+import random
+
+from chess_cache.batch import decode_fens, encode_fens
+from chess_cache.core import STARTING_FEN, decode_fen, encode_fen
+from chess_cache.position import Position
+
+
+def test_batch_matches_single():
+    rng = random.Random(3)
+    fens = [STARTING_FEN, "8/8/8/8/8/8/8/8 w - - 0 1", "4k3/8/8/8/8/8/8/4K3 b - -"]
+    for _ in range(100):
+        board = Position()
+        for _ in range(rng.randint(1, 120)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+            fens.append(board.fen())
+
+    encoded = encode_fens(fens)
+    assert encoded == [encode_fen(fen) for fen in fens]
+    assert decode_fens(encoded) == [decode_fen(efen) for efen in encoded]
+    assert encode_fens([]) == decode_fens([]) == []
@@ -0,0 +1,471 @@
+import bz2
+import gzip
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+from threading import Event
+
+import chess.pgn
+import pytest
+
+from chess_cache.core import MATE_SCORE, STARTING_FEN, Database
+from chess_cache.importer import (
+    create_job,
+    extract_dump,
+    extract_fens,
+    import_dump,
+    iter_fens,
+    list_jobs,
+    load_csv,
+    open_stream,
+    parse_dump_lines,
+    stop_job,
+)
+from chess_cache.position import Position, move_uci
+
+
+def _random_dump(seed, lines=40):
+    rng = random.Random(seed)
+    dump = []
+    for _ in range(lines):
+        board = Position()
+        for _ in range(rng.randint(0, 10)):
+            board.push(rng.choice(list(board.legal_moves)))
+
+        evals = []
+        for _ in range(rng.randint(1, 2)):
+            pvs = []
+            for move in rng.sample(list(board.legal_moves), rng.randint(1, 3)):
+                line, pv = board.copy(), [move_uci(move)]
+                line.push(move)
+                for _ in range(rng.randint(0, 6)):
+                    replies = list(line.legal_moves)
+                    if not replies:
+                        break
+                    reply = rng.choice(replies)
+                    pv.append(move_uci(reply))
+                    line.push(reply)
+                score = {"cp": rng.randint(-300, 300)}
+                if rng.random() < 0.1:
+                    score = {"mate": rng.choice([-3, 2])}
+                pvs.append(score | {"line": " ".join(pv)})
+            evals.append({"pvs": pvs, "knodes": 1000, "depth": rng.randint(5, 40)})
+        dump.append(json.dumps({"fen": board.epd(), "evals": evals}))
+    return dump
+
+
+def _write(path, lines):
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return str(path)
+
+
+def _rows(db):
+    cur = db.sql.execute("SELECT fen, depth, score, move FROM board ORDER BY fen")
+    return cur.fetchall()
+
+
+def test_workers_same_result(tmp_path):
+    path = _write(tmp_path / "dump.jsonl", _random_dump(seed=1))
+    single = Database(":memory:")
+    parallel = Database(f"{tmp_path}/cache.sqlite")
+    try:
+        progress = []
+        total = import_dump(path, single, workers=0, batch=7)
+        assert (
+            import_dump(
+                path,
+                parallel,
+                workers=2,
+                batch=7,
+                progress=lambda *_: progress.append(_),
+            )
+            == total
+        )
+        assert progress[-1] == (40, total)
+        assert _rows(single) == _rows(parallel)
+        assert max(row["depth"] for row in _rows(single)) <= 40
+    finally:
+        single.close()
+        parallel.close()
+
+
+def test_same_as_upsert():
+    # satu PV tanpa konflik: hasilnya sama dengan `upsert`
+    pv = ["e2e4", "e7e5", "g1f3", "b8c6", "f1b5"]
+    line = {
+        "fen": STARTING_FEN,
+        "evals": [{"pvs": [{"cp": 30, "line": " ".join(pv)}], "depth": 20}],
+    }
+    db = Database(":memory:")
+    try:
+        db.upsert(STARTING_FEN, {"multipv": 1, "depth": 20, "score": 30, "pv": pv})
+        expected = {row["fen"]: row for row in _rows(db)}
+        rows = parse_dump_lines([json.dumps(line)])
+        assert {
+            efen: {"fen": efen, "depth": depth, "score": score, "move": move}
+            for efen, depth, score, move in rows
+        } == expected
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("zobrist", [False, True])
+def test_deeper_only(tmp_path, zobrist):
+    pv = ["e2e4", "e7e5"]
+    line = {
+        "fen": STARTING_FEN,
+        "evals": [{"pvs": [{"cp": 30, "line": " ".join(pv)}], "depth": 20}],
+    }
+    path = _write(tmp_path / "dump.jsonl", [json.dumps(line)])
+
+    db = Database(":memory:", zobrist=zobrist)
+    try:
+        # posisi awal sudah dianalisa lebih dalam, posisi setelah 1. e4 belum
+        db.upsert(
+            STARTING_FEN, {"multipv": 1, "depth": 25, "score": 10, "pv": ["d2d4"]}
+        )
+        board = Position()
+        board.push_uci("e2e4")
+        db.upsert(board.fen(), {"multipv": 1, "depth": 5, "score": 0, "pv": ["c7c5"]})
+        db.select(STARTING_FEN, max_depth=2)
+
+        import_dump(path, db, workers=0)
+        results = db.select(STARTING_FEN, max_depth=2)
+        assert results[0]["depth"] == 25 and results[0]["pv"] == ["d2d4"]
+        assert db.select(board.fen(), only_best=True)[0]["depth"] == 19
+    finally:
+        db.close()
+
+
+def test_extract_dump(tmp_path):
+    path = _write(tmp_path / "dump.jsonl", _random_dump(seed=2, lines=10))
+    db = extract_dump(path, minimal_depth=3, maximum_depth=30)
+    try:
+        depths = [row["depth"] for row in _rows(db)]
+        assert depths and min(depths) >= 3 and max(depths) <= 30
+    finally:
+        db.close()
+
+
+def _old_extract_dump(filename, minimal_depth, maximum_depth):
+    # implementasi lama `extract_dump`: upsert setiap PV secara berurutan
+    db = Database(":memory:", minimal_depth=minimal_depth)
+    with open(filename) as f:
+        for line in f:
+            raw = json.loads(line)
+            for eval in raw["evals"]:
+                data = []
+                for pv in eval["pvs"]:
+                    if "cp" in pv:
+                        score = pv["cp"]
+                    elif pv["mate"] > 0:
+                        score = MATE_SCORE - pv["mate"]
+                    else:
+                        score = -MATE_SCORE - pv["mate"]
+                    data.append(
+                        {
+                            "fen": raw["fen"],
+                            "depth": eval["depth"],
+                            "score": score,
+                            "pv": pv["line"].split(" "),
+                        }
+                    )
+                data.sort(key=lambda d: d["score"], reverse=True)
+                for i, info in enumerate(data, start=1):
+                    info["multipv"] = i
+                    db.upsert(info["fen"], info)
+    db.normalize_old_data(cutoff_score=maximum_depth, new_score=maximum_depth - 2)
+    return db
+
+
+def test_extract_dump_same_as_old(tmp_path):
+    path = _write(tmp_path / "dump.jsonl", _random_dump(seed=4, lines=300))
+    expected = _old_extract_dump(path, minimal_depth=3, maximum_depth=30)
+    actual = extract_dump(path, minimal_depth=3, maximum_depth=30)
+    try:
+        assert _rows(actual) == _rows(expected)
+    finally:
+        expected.close()
+        actual.close()
+
+
+def _compress(data, method):
+    if method == "gzip":
+        return gzip.compress(data)
+    if method == "bzip2":
+        return bz2.compress(data)
+    if method == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+@pytest.mark.parametrize("method", ["plain", "gzip", "bzip2", "zstd"])
+def test_compressed_dump(tmp_path, method):
+    lines = _random_dump(seed=3, lines=10)
+    plain = _write(tmp_path / "dump.jsonl", lines)
+    with open(plain, "rb") as f:
+        data = _compress(f.read(), method)
+    path = tmp_path / f"dump.jsonl.{method}"
+    path.write_bytes(data)
+
+    # berkas unggahan milik pemanggil tidak ikut ditutup
+    upload = io.BytesIO(data)
+    with open_stream(upload) as f:
+        assert f.read().splitlines() == lines
+    assert not upload.closed
+
+    expected, db = Database(":memory:"), Database(":memory:")
+    try:
+        import_dump(plain, expected, workers=0)
+        assert import_dump(path, db, workers=0) > 0
+        assert _rows(db) == _rows(expected)
+    finally:
+        expected.close()
+        db.close()
+
+
+def test_extract_fens_stream():
+    pgn = '[Variant "Standard"]\n\n1. e4 e5 2. Nf3 Nc6 *\n'
+    with open_stream(io.BytesIO(gzip.compress(pgn.encode()))) as f:
+        assert extract_fens(f, max_depth=3) == extract_fens(pgn, max_depth=3)
+
+
+def _random_pgn(seed, games=30):
+    rng = random.Random(seed)
+    pgn = []
+    for _ in range(games):
+        game = chess.pgn.Game()
+        game.headers["Variant"] = rng.choice(["Standard", "Chess960"])
+        node, board = game, game.board()
+        for _ in range(rng.randint(1, 40)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            if len(moves) > 1 and rng.random() < 0.1:
+                node.add_variation(moves[1]).comment = "variasi (dilewati)"
+            move = rng.choice(moves)
+            node = node.add_main_variation(move)
+            node.comment = "[%clk 0:01:00]" if rng.random() < 0.2 else ""
+            board.push(move)
+        pgn.append(str(game))
+    return "\n\n".join(pgn) + "\n"
+
+
+def _old_extract_fens(pgn, max_depth):
+    # implementasi lama dengan `chess.pgn.read_game`, sebagai pembanding
+    fens, _pgn = {}, io.StringIO(pgn)
+    while (game := chess.pgn.read_game(_pgn)) is not None:
+        if game.headers.get("Variant") != "Standard":
+            continue
+        epds = [board.epd() for board in _boards(game)][:max_depth]
+        for epd in reversed(epds):
+            fens.setdefault(epd)
+    return list(fens)
+
+
+def _boards(game):
+    board = game.board()
+    for move in game.mainline_moves():
+        board.push(move)
+        yield board
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_iter_fens(tmp_path, workers):
+    pgn = _random_pgn(seed=4)
+    expected = _old_extract_fens(pgn, max_depth=12)
+    assert extract_fens(pgn, max_depth=12) == expected
+
+    path = tmp_path / "games.pgn.gz"
+    path.write_bytes(gzip.compress(pgn.encode()))
+    fens = list(iter_fens(path, 12, workers=workers, chunk=2000))
+    assert sorted(fens) == sorted(expected)
+
+    # penyaring duplikat yang kecil: mungkin berulang, tetapi tidak ada yang hilang
+    fens = list(iter_fens(path, 12, workers=workers, chunk=2000, seen=10))
+    assert set(fens) == set(expected) and len(fens) >= len(expected)
+
+
+def test_wrapped_comment(tmp_path):
+    # komentar yang terpotong: baris movetext diawali `[%clk`
+    game = (
+        '[Event "?"]\n[Variant "Standard"]\n\n'
+        "1. e4 {\n[%clk 0:01:00] } 1... e5 2. Nf3 {\n[%clk 0:00:59] } 2... Nc6 *\n"
+    )
+    pgn = game + "\n" + game.replace("Nc6", "Nf6")
+    expected = _old_extract_fens(pgn, max_depth=4)
+    assert len(expected) == 5
+    assert extract_fens(pgn, max_depth=4) == expected
+
+    path = tmp_path / "games.pgn"
+    path.write_text(pgn)
+    assert sorted(iter_fens(path, 4, workers=0, chunk=1)) == sorted(expected)
+
+
+@pytest.mark.parametrize("method", ["plain", "gzip", "zstd"])
+def test_import_job(tmp_path, method):
+    data = ("\n".join(_random_dump(seed=1)) + "\n").encode()
+    path = tmp_path / f"dump.jsonl.{method}"
+    path.write_bytes(_compress(data, method))
+
+    expected = Database(":memory:")
+    db = Database(f"{tmp_path}/cache.sqlite")
+    try:
+        total = import_dump(path, expected, workers=0, batch=7)
+        job = create_job(db, "dump", path)
+
+        # berhenti lewat Event, lalu lewat `stop_job` dari "proses lain"
+        stop = Event()
+        import_dump(
+            path,
+            db,
+            workers=0,
+            batch=7,
+            job=job,
+            stop=stop,
+            progress=lambda *_: stop.set(),
+        )
+        (row,) = list_jobs(db)
+        assert row["status"] == "stopped" and row["byte_offset"] > 0
+        first = row["byte_offset"]
+
+        import_dump(
+            path, db, workers=2, batch=7, job=job, progress=lambda *_: stop_job(db, job)
+        )
+        (row,) = list_jobs(db)
+        assert row["status"] == "stopped" and row["byte_offset"] > first
+
+        import_dump(path, db, workers=0, batch=7, job=job)
+        (row,) = list_jobs(db)
+        assert row["status"] == "done" and row["positions"] == total
+        assert _rows(db) == _rows(expected)
+    finally:
+        expected.close()
+        db.close()
+
+
+def test_import_job_claim(tmp_path):
+    path = tmp_path / "dump.jsonl"
+    path.write_text("\n".join(_random_dump(seed=2)) + "\n")
+    db = Database(f"{tmp_path}/cache.sqlite")
+    other = Database(f"{tmp_path}/cache.sqlite")  # "proses lain"
+    try:
+        job = create_job(db, "dump", path)
+
+        def claim(pid, status="running"):
+            db.sql.execute(
+                "UPDATE import_job SET status = ?, pid = ? WHERE id = ?",
+                (status, pid, job),
+            )
+
+        # pekerjaan yang sedang dijalankan proses lain yang masih hidup
+        for status in ("running", "stopping"):
+            claim(os.getppid(), status)
+            with pytest.raises(RuntimeError):
+                import_dump(path, other, workers=0, job=job)
+            (row,) = list_jobs(db)
+            assert row["status"] == status and row["pid"] == os.getppid()
+
+        # klaim dari proses yang sudah mati boleh diambil alih
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        claim(dead.pid)
+        assert import_dump(path, other, workers=0, job=job) > 0
+        (row,) = list_jobs(db)
+        assert row["status"] == "done" and row["pid"] == os.getpid()
+    finally:
+        other.close()
+        db.close()
+
+
+def _random_csv(seed, rows=300):
+    rng = random.Random(seed)
+    lines, board = ["FEN,Evaluation"], Position()
+    for _ in range(rows):
+        moves = list(board.legal_moves)
+        if not moves or rng.random() < 0.05:
+            board = Position()
+            continue
+        board.push(rng.choice(moves))
+        score = rng.choice([f"{rng.randint(-300, 300):+d}", "#+3", "#-2", "0"])
+        lines.append(f"{board.fen()},{score}")
+    return lines + ["bukan fen,+10", ","]
+
+
+def _csv_expected(fen, evaluation):
+    # score dari sudut pandang pihak yang melangkah
+    if evaluation.startswith("#"):
+        mate = int(evaluation[1:])
+        score = MATE_SCORE - mate if mate > 0 else -MATE_SCORE - mate
+    else:
+        score = int(evaluation)
+    return -score if " b " in fen else score
+
+
+@pytest.mark.parametrize("zobrist", [False, True])
+def test_load_csv(tmp_path, zobrist):
+    lines = _random_csv(seed=6)
+    path = tmp_path / "evals.csv.gz"
+    path.write_bytes(gzip.compress(("\n".join(lines) + "\n").encode()))
+    valid = [line.split(",") for line in lines[1:-2]]
+    fens = {}
+    for fen, evaluation in valid:
+        fens.setdefault(fen, evaluation)  # pada depth sama, baris pertama dipakai
+
+    deeper, shallower = list(fens)[:2]
+    db = Database(f"{tmp_path}/cache.sqlite", zobrist=zobrist, bloom=True)
+    single = Database(":memory:", zobrist=zobrist)
+    try:
+        for fen, depth in [(deeper, 30), (shallower, 5)]:
+            pv = [move_uci(next(Position(fen).legal_moves))]
+            db.upsert(fen, {"multipv": 1, "depth": depth, "score": 1, "pv": pv})
+        db.select(deeper)
+
+        progress = []
+        loaded = load_csv(
+            path,
+            db,
+            depth=22,
+            workers=2,
+            batch=40,
+            staging=100,
+            progress=lambda *_: progress.append(_),
+        )
+        assert loaded == len(valid) and progress[-1] == (len(lines) - 1, loaded)
+        assert load_csv(path, single, depth=22, workers=0) == loaded
+
+        # hanya depth yang lebih besar menimpa baris yang sudah ada
+        assert db.select(deeper, only_best=True)[0]["depth"] == 30
+        assert db.select(shallower, only_best=True)[0]["depth"] == 22
+        for fen, evaluation in fens.items():
+            info = {"depth": 22, "score": _csv_expected(fen, evaluation)}
+            assert single.select(fen, only_best=True) == [
+                info | {"pv": [], "multipv": 1}
+            ]
+            if fen != deeper:
+                assert db.select(fen, only_best=True, max_depth=0)[0]["depth"] == 22
+
+        # PRAGMA dikembalikan setelah pemuatan
+        assert db.sql.execute("PRAGMA wal_autocheckpoint").fetchone() == {
+            "wal_autocheckpoint": 1000
+        }
+    finally:
+        db.close()
+        single.close()
+
+
+def test_load_csv_missing_column(tmp_path):
+    path = tmp_path / "evals.csv"
+    path.write_text(f"FEN,Eval\n{STARTING_FEN},+10\n")
+    db = Database(":memory:")
+    try:
+        with pytest.raises(ValueError, match="'Evaluation'"):
+            load_csv(path, db, depth=22, workers=0)
+        assert load_csv(path, db, depth=22, workers=0, score_column="Eval") == 1
+    finally:
+        db.close()
@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+from chess_cache.core import Database, decode_fen
+from chess_cache.merge import merge_database
+from chess_cache.position import Position
+
+
+def _fill(db, seed, count):
+    # baris acak langsung ke tabel board; posisinya sama untuk semua seed,
+    # sehingga database yang berbeda punya posisi yang sama
+    games, rng = random.Random(0), random.Random(seed)
+    rows = {}
+    board = Position()
+    while len(rows) < count:
+        moves = list(board.legal_moves)
+        if not moves or games.random() < 0.05:
+            board = Position()
+            continue
+        board.push(games.choice(moves))
+        rows[board.encode()] = {
+            "depth": rng.randint(1, 30),
+            "score": rng.randint(-300, 300),
+            "move": 0,
+        }
+    db.write_rows(rows.items())
+    return rows
+
+
+def _table(db):
+    rows = db.sql.execute("SELECT fen, depth, score, move FROM board").fetchall()
+    return {row.pop("fen"): row for row in rows}
+
+
+@pytest.mark.parametrize("rule", ["deeper", "deeper_or_equal", "incoming", "missing"])
+@pytest.mark.parametrize("zobrist", [False, True])
+def test_merge_rules(tmp_path, rule, zobrist):
+    master = Database(f"{tmp_path}/master.sqlite", zobrist=zobrist)
+    incoming = Database(f"{tmp_path}/incoming.sqlite", zobrist=not zobrist)
+    old, new = _fill(master, 1, count=60), _fill(incoming, 2, count=90)
+    incoming.close()
+
+    expected = dict(old)
+    for efen, row in new.items():
+        if efen not in old:
+            expected[efen] = row
+        elif rule == "incoming":
+            expected[efen] = row
+        elif rule == "deeper" and row["depth"] > old[efen]["depth"]:
+            expected[efen] = row
+        elif rule == "deeper_or_equal" and row["depth"] >= old[efen]["depth"]:
+            expected[efen] = row
+    assert set(old) & set(new)  # ada konflik yang diuji
+
+    try:
+        assert merge_database(master, f"{tmp_path}/incoming.sqlite", rule, 7) == len(
+            new
+        )
+        assert _table(master) == expected
+    finally:
+        master.close()
+
+
+def test_merge_resume(tmp_path):
+    master = Database(f"{tmp_path}/master.sqlite")
+    incoming = Database(f"{tmp_path}/incoming.sqlite")
+    old, new = _fill(master, 3, count=60), _fill(incoming, 4, count=90)
+    incoming.close()
+    path = f"{tmp_path}/incoming.sqlite"
+
+    # hasil select yang sudah disinggah ikut diperbarui
+    efen = next(k for k in old if k in new and new[k]["depth"] > old[k]["depth"])
+    fen = decode_fen(efen)
+    assert master.select(fen, only_best=True)[0]["depth"] == old[efen]["depth"]
+
+    class Interrupted(Exception):
+        pass
+
+    def interrupt(rows, total):
+        if rows >= 20:
+            raise Interrupted
+
+    try:
+        with pytest.raises(Interrupted):
+            merge_database(master, path, chunk=10, progress=interrupt)
+        seen = []
+        processed = merge_database(
+            master, path, chunk=10, progress=lambda *_: seen.append(_)
+        )
+        assert processed == len(new) - 20
+        assert seen[-1] == (len(new), len(new))
+        assert merge_database(master, path, chunk=10) == 0
+
+        expected = dict(old)
+        for key, row in new.items():
+            if key not in old or row["depth"] > old[key]["depth"]:
+                expected[key] = row
+        assert _table(master) == expected
+        assert master.select(fen, only_best=True)[0]["depth"] == new[efen]["depth"]
+    finally:
+        master.close()
+
+
+def test_merge_refreshed(tmp_path):
+    master = Database(f"{tmp_path}/master.sqlite")
+    incoming = Database(f"{tmp_path}/incoming.sqlite")
+    new = _fill(incoming, 5, count=40)
+    incoming.close()
+    path = f"{tmp_path}/incoming.sqlite"
+
+    try:
+        assert merge_database(master, path, chunk=10) == len(new)
+        assert merge_database(master, path, chunk=10) == 0
+        assert merge_database(master, path, chunk=10, force=True) == len(new)
+
+        # berkas yang diperbarui di alamat yang sama digabungkan lagi dari awal
+        incoming = Database(path)
+        _fill(incoming, 6, count=70)
+        new = _table(incoming)
+        incoming.close()
+        assert merge_database(master, path, rule="incoming", chunk=10) == len(new)
+        assert _table(master) == new
+        assert merge_database(master, path, chunk=10) == 0
+    finally:
+        master.close()
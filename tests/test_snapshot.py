@@ -0,0 +1,102 @@
+import os
+import random
+
+import pytest
+
+from chess_cache.core import STARTING_FEN, Database
+from chess_cache import snapshot
+from chess_cache.position import Position, move_uci
+from chess_cache.snapshot import Snapshot, export_snapshot
+
+
+def _fens(db, seed, games=20):
+    # isi db dengan analisa acak; hasilkan semua posisi yang dilalui
+    rng = random.Random(seed)
+    fens = [STARTING_FEN]
+    for _ in range(games):
+        board = Position()
+        for _ in range(rng.randint(1, 15)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            pv = [move_uci(rng.choice(moves))]
+            info = {"multipv": 1, "depth": rng.randint(1, 25), "score": 0, "pv": pv}
+            info["score"] = rng.randint(-4000, 4000)
+            db.upsert(board.fen(), info)
+            board.push(rng.choice(moves))
+            fens.append(board.fen())
+    return fens
+
+
+@pytest.mark.parametrize("zobrist", [False, True])
+def test_snapshot(tmp_path, zobrist):
+    db = Database(":memory:", zobrist=zobrist)
+    path = f"{tmp_path}/cache.snapshot"
+    try:
+        fens = _fens(db, seed=1)
+        total = db.sql.execute("SELECT COUNT(*) AS n FROM board").fetchone()["n"]
+        assert export_snapshot(db, path, chunk=50) == total
+
+        snapshot = Snapshot(path)
+        try:
+            assert snapshot.count == total
+            for fen in fens:
+                for only_best in (True, False):
+                    expected = db.select(fen, only_best=only_best, max_depth=5)
+                    assert snapshot.select(fen, only_best, 5) == expected
+        finally:
+            snapshot.close()
+    finally:
+        db.close()
+
+
+def test_snapshot_empty(tmp_path):
+    db = Database(":memory:")
+    path = f"{tmp_path}/empty.snapshot"
+    assert export_snapshot(db, path) == 0
+    db.close()
+
+    snapshot = Snapshot(path)
+    assert snapshot.select(STARTING_FEN) == []
+    snapshot.close()
+
+    with open(path, "r+b") as f:
+        f.write(b"bukan")
+    with pytest.raises(ValueError):
+        Snapshot(path)
+
+
+def test_snapshot_external_sort(tmp_path, monkeypatch):
+    db = Database(f"{tmp_path}/cache.sqlite")
+    try:
+        _fens(db, seed=2, games=40)
+        total = export_snapshot(db, f"{tmp_path}/a.snapshot")
+
+        # potongan kecil dan penggabungan bertingkat menghasilkan berkas sama
+        monkeypatch.setattr(snapshot, "MERGE_FAN", 3)
+        assert export_snapshot(db, f"{tmp_path}/b.snapshot", chunk=7) == total
+        with open(f"{tmp_path}/a.snapshot", "rb") as a:
+            with open(f"{tmp_path}/b.snapshot", "rb") as b:
+                assert a.read() == b.read()
+        assert sorted(os.listdir(tmp_path)) == [
+            "a.snapshot",
+            "b.snapshot",
+            "cache.sqlite",
+            "cache.sqlite-shm",
+            "cache.sqlite-wal",
+        ]
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("column", ["depth", "score"])
+def test_snapshot_out_of_range(tmp_path, column):
+    db = Database(":memory:")
+    try:
+        row = {"depth": 10, "score": 0, "move": None}
+        row[column] = 2**15
+        db.write_rows([(Position().encode(), row)])
+        with pytest.raises(ValueError, match=column):
+            export_snapshot(db, f"{tmp_path}/cache.snapshot")
+    finally:
+        db.close()
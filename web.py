@@ -15,7 +15,7 @@ from starlette.staticfiles import StaticFiles
 from starlette.templating import Jinja2Templates
 
 from chess_cache import STARTING_FEN, Engine
-from chess_cache.core import decode_fen
+from chess_cache.core import QUIZ_DEPTH
 from chess_cache.env import (
     ANALYSIS_DEPTH,
     DATABASE_URI,
@@ -24,8 +24,9 @@ from chess_cache.env import (
     ENGINE_PATH,
     IMPORTER_PGN_DEPTH,
     MINIMAL_DEPTH,
+    QUIZ_REFRESH,
 )
-from chess_cache.importer import extract_fens
+from chess_cache.importer import iter_fens
 from chess_cache.logger import JSONFormatter
 
 ENGINE_CONFIG = ENGINE_BASE_CONFIG.copy()
@@ -35,6 +36,14 @@ engine = Engine(ENGINE_PATH, DATABASE_URI, minimal_depth=MINIMAL_DEPTH)
 templates = Jinja2Templates(directory="templates")
 
 
+async def refresh_quiz() -> None:
+    "Memperbarui sampel kuis secara berkala"
+
+    while True:
+        await asyncio.to_thread(engine.db.refresh_quiz, QUIZ_DEPTH)
+        await asyncio.sleep(QUIZ_REFRESH)
+
+
 @asynccontextmanager
 async def lifespan(app: Starlette) -> AsyncIterator[None]:
     # on start
@@ -46,16 +55,19 @@ async def lifespan(app: Starlette) -> AsyncIterator[None]:
     mimetypes.add_type("text/css", ".css")
     mimetypes.add_type("image/svg+xml", ".svg")
 
+    quiz = asyncio.create_task(refresh_quiz())
+
     yield None
 
     # on shutdown
+    quiz.cancel()
     engine.shutdown()
 
 
 async def stats(request: Request) -> JSONResponse:
     "Menghasilkan statistik mengenai program"
 
-    return JSONResponse({"queue": engine.heap.qsize()})
+    return JSONResponse({"queue": engine.heap.qsize(), "database": engine.db.stats()})
 
 
 async def evaluation(request: Request) -> JSONResponse:
@@ -142,45 +154,48 @@ async def parse_pgn(request: Request) -> JSONResponse:
         file = form.get("file")
         if not isinstance(file, UploadFile):
             return JSONResponse({"error": "No file"}, 400)
+
+        def extract() -> int:
+            # berkas (mungkin terkompresi) dibaca bertahap, tanpa salinan utuh;
+            # posisi yang sudah disinggah tidak dimasukkan ke antrian
+            fens = iter_fens(file.file, IMPORTER_PGN_DEPTH)
+            return engine.put_many(fens, ANALYSIS_DEPTH)
+
         try:
-            pgn = (await file.read()).decode("utf-8")
-        except:
+            skipped = await asyncio.to_thread(extract)
+        except Exception:
             return JSONResponse({"error": "unable to parse file"}, 415)
-
-        fens = await asyncio.to_thread(extract_fens, pgn, IMPORTER_PGN_DEPTH)
-        for fen in fens:
-            engine.put(fen, ANALYSIS_DEPTH)
-        return JSONResponse({"status": "OK"})
+        return JSONResponse({"status": "OK", "skipped": skipped})
 
 
 async def get_quiz(request: Request) -> JSONResponse:
     "Menghasilkan suatu posisi catur acak dan daftar solusi terbaiknya"
 
     try:
-        _depth = 35
+        _depth = QUIZ_DEPTH
         _min = int(request.query_params.get("min", 100))
         _max = int(request.query_params.get("max", 300))
         assert _min < _max
     except (AssertionError, ValueError):
         return JSONResponse({"error": "Invalid query param(s) usage"}, 400)
     else:
-        _fen = engine.db.sql.execute(
-            """
-            SELECT fen FROM board
-            WHERE depth=:depth AND score >= :min AND score <= :max
-            ORDER BY RANDOM() LIMIT 1
-            """,
-            {"min": _min, "max": _max, "depth": _depth},
-        ).fetchone()
-
-    if not _fen:
+        fen = engine.db.sample(_min, _max, depth=_depth)
+
+    # sampel bisa lebih lama dari isi tabel board
+    results = engine.info(fen, max_depth=1) if fen else []
+    if not results or results[0]["depth"] != _depth:
         # no eligible fen
         return JSONResponse({})
 
-    fen = decode_fen(_fen["fen"])
-    answers = [engine.info(fen, only_best=True)[0]["pv"][0]]
-    # TODO: urus kasus ada beberapa PV bagus
-    # TODO: urus kasus PV punya depth yang berbeda-beda
+    # semua move yang sama bagusnya dengan PV terbaik adalah jawaban benar
+    best = results[0]
+    answers = [
+        info["pv"][0]
+        for info in results
+        if info["pv"]
+        and info["depth"] >= best["depth"]
+        and info["score"] >= best["score"]
+    ]
 
     return JSONResponse({"fen": fen, "answers": answers})
 